@@ -3,14 +3,25 @@ ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The server-sent events stream (/api/stream/) only works through it; serve
+the project with an ASGI server like uvicorn:
+
+    uvicorn app.asgi:application --host 0.0.0.0 --port 8000
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # Static files, as served by runserver in development
+    application = ASGIStaticFilesHandler(application)
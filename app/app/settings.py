@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -46,9 +48,15 @@ INSTALLED_APPS = [
     'venue',
     'customer',
     'event',
+    'search',
+    'sync',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.QueryInspectionMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +100,155 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# Hosts of read replicas of the database (`host` or `host:port`), separated by
+# commas. Safe requests read from a replica, and clients stay on the primary
+# for REPLICA_PIN_SECONDS after writing, longer than the replication lag.
+# Tests run the replicas as mirrors of the test database.
+
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_table',
+    }
+}
+
+# Seconds the customer and venue statistics stay cached. They are also
+# invalidated whenever one of their events changes.
+STATS_CACHE_TIMEOUT = 600
+
+# Seconds a rendered calendar feed stays cached. Feeds are cached under their
+# ETag, so changes are served right away.
+CALENDAR_FEED_CACHE_TIMEOUT = 3600
+# Days of past events included in the calendar feeds.
+CALENDAR_FEED_PAST_DAYS = int(os.environ.get('CALENDAR_FEED_PAST_DAYS', 90))
+
+
+# Delta sync
+# Rows saved less than SYNC_SETTLE_SECONDS ago are left for the next sync, so
+# slow transactions committing late aren't skipped. Tombstones of deleted
+# rows are kept SYNC_TOMBSTONE_DAYS, older cursors must sync from scratch.
+
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', 2))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 90))
+
+
+# Event archive
+# Events ended more than EVENT_ARCHIVE_AFTER_DAYS ago are archived by
+# `manage.py archive_events`. Archived events are left out of the API, the
+# sync and the availability checks, but remain readable with ?history=true.
+
+EVENT_ARCHIVE_AFTER_DAYS = int(os.environ.get('EVENT_ARCHIVE_AFTER_DAYS', 365))
+
+
+# Change notifications
+# Pushed to the clients of /api/stream/. Notifications are delivered in
+# process unless BROADCAST_REDIS_URL is set, which is needed with several
+# workers.
+
+BROADCAST_REDIS_URL = os.environ.get('BROADCAST_REDIS_URL', '')
+BROADCAST_CHANNEL = 'avr-manage:changes'
+# Notifications queued per slow client before asking it to reload
+BROADCAST_QUEUE_SIZE = 100
+BROADCAST_HEARTBEAT_SECONDS = 15
+BROADCAST_RETRY_MS = 5000
+# Streams are closed after this long and reopened by the clients, which
+# frees the streams of the clients gone in the meantime
+BROADCAST_STREAM_SECONDS = 300
+
+
+# Background tasks
+# TASKS_BACKEND is `immediate` (run in the request), `thread` (thread pool of
+# the web process) or `database` (queue run by `manage.py run_tasks`).
+
+TASKS_BACKEND = os.environ.get('TASKS_BACKEND', 'immediate')
+TASKS_CONCURRENCY = int(os.environ.get('TASKS_CONCURRENCY', 4))
+# Seconds before the first retry of a failed task, doubled on every retry
+TASKS_RETRY_DELAY = 10
+# Seconds a worker can run a task before other workers claim it again
+TASKS_LEASE_SECONDS = 600
+
+
+# Request metrics
+# Addresses allowed to read the Prometheus metrics at /metrics, besides staff.
+
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', '127.0.0.1'
+).split(',')
+
+
+# Query inspection
+# Log the queries repeated (N+1) or slower than a threshold in every request,
+# with their EXPLAIN plans. Meant for development and staging.
+
+QUERY_INSPECTION = os.environ.get('QUERY_INSPECTION') == '1'
+QUERY_INSPECTION_REPEAT_THRESHOLD = int(
+    os.environ.get('QUERY_INSPECTION_REPEAT_THRESHOLD', 5)
+)
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'queries': {
+            'format': '{asctime} {levelname} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'query_log': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': os.environ.get(
+                'QUERY_LOG_FILE', BASE_DIR / 'queries.log'
+            ),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'queries',
+        },
+    },
+    'loggers': {
+        'core.queries': {
+            'handlers': ['query_log'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Sampling profiler
+# Fraction of the requests profiled per route name, like
+# {"event:event-list": 0.01}. "*" sets the rate of every other route.
+
+PROFILING_SAMPLE_RATES = json.loads(
+    os.environ.get('PROFILING_SAMPLE_RATES', '{}')
+)
+PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', BASE_DIR / 'profiles')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -133,6 +290,48 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Media storage
+# Media files are kept in MEDIA_ROOT unless S3_BUCKET is set, then in that
+# bucket of Amazon S3 or of the S3 compatible service at S3_ENDPOINT_URL
+# (needs boto3). S3_PUBLIC_ENDPOINT_URL is the address of the service for the
+# clients, when it differs.
+S3_BUCKET = os.environ.get('S3_BUCKET', '')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') or None
+S3_PUBLIC_ENDPOINT_URL = os.environ.get('S3_PUBLIC_ENDPOINT_URL') or None
+S3_ACCESS_KEY = os.environ.get('S3_ACCESS_KEY', '')
+S3_SECRET_KEY = os.environ.get('S3_SECRET_KEY', '')
+S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+# Seconds the presigned download and upload URLs are valid
+S3_URL_EXPIRE_SECONDS = int(os.environ.get('S3_URL_EXPIRE_SECONDS', 3600))
+# Files over this size are sent in parts of this size
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+# Largest file uploaded straight to the bucket, the limit of a single PUT
+DIRECT_UPLOAD_MAX_BYTES = 5 * 1024 ** 3
+
+STORAGES = {
+    'default': {
+        'BACKEND': (
+            'core.storage.S3Storage' if S3_BUCKET
+            else 'django.core.files.storage.FileSystemStorage'
+        ),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Photo uploads
+# Uploads over PHOTO_MAX_BYTES or PHOTO_MAX_PIXELS are rejected from their
+# headers, before decoding. Accepted photos are re-encoded without metadata,
+# scaled down to fit PHOTO_MAX_DIMENSION.
+PHOTO_MAX_BYTES = int(os.environ.get('PHOTO_MAX_BYTES', 25 * 1024 * 1024))
+PHOTO_MAX_PIXELS = int(os.environ.get('PHOTO_MAX_PIXELS', 50_000_000))
+PHOTO_MAX_DIMENSION = int(os.environ.get('PHOTO_MAX_DIMENSION', 2048))
+PHOTO_JPEG_QUALITY = 85
+# Files accepted by a batch photo upload
+PHOTO_BATCH_MAX_FILES = int(os.environ.get('PHOTO_BATCH_MAX_FILES', 200))
+DATA_UPLOAD_MAX_NUMBER_FILES = PHOTO_BATCH_MAX_FILES
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -148,4 +347,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'core.filters.RankedSearchFilter',
+    ],
 }
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from core import views as core_views
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -17,6 +18,14 @@ urlpatterns = [
     path('api/customer/', include('customer.urls')),
     path('api/inventory/', include('inventory.urls')),
     path('api/event/', include('event.urls')),
+    path('api/search/', include('search.urls')),
+    path('api/sync/', include('sync.urls')),
+    path('metrics', core_views.metrics, name='metrics'),
+    path('api/stream/', core_views.stream, name='stream'),
+    path('api/profiles/', core_views.ProfileListView.as_view(),
+         name='profile-list'),
+    path('api/profiles/<str:name>/', core_views.ProfileDownloadView.as_view(),
+         name='profile-download'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,248 @@
+'''
+API benchmark helpers used by the `benchmark` management command.
+'''
+
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import (
+    Customer,
+    Equipment,
+    EquipmentMovement,
+    Event,
+    EventPhoto,
+    Venue,
+)
+from tests.factories import DataFactory
+
+DEFAULT_VOLUMES = {
+    'employees': 200,
+    'customers': 1000,
+    'venues': 200,
+    'equipment': 50000,
+    'events': 10000,
+    'devices_per_event': 100,
+}
+
+# Events whose devices are scanned out and that get photos when seeding, so
+# the movement, status and photo lists have rows
+SCANNED_EVENTS = 100
+PHOTOS_PER_EVENT = 5
+
+
+class Rollback(Exception):
+    '''Raised to undo the changes made by a benchmarked write request.'''
+
+
+def seed(volumes, seed=0):
+    '''
+    Fill the database with a consistent data set.
+
+    Parameters
+    ----------
+    volumes : dict
+        Number of rows to create, with the keys of `DEFAULT_VOLUMES`.
+    seed : int
+        Seed of the data factory.
+    '''
+    events = DataFactory(seed).graph(**volumes)['events'][:SCANNED_EVENTS]
+
+    devices = {}
+    for event_id, equipment_id in Event.equipment.through.objects.filter(
+        event__in=events,
+    ).values_list('event_id', 'equipment_id'):
+        devices.setdefault(event_id, []).append(equipment_id)
+    for event in events:
+        EquipmentMovement.objects.record(
+            devices.get(event.id, []), 'out', event=event,
+        )
+
+    EventPhoto.objects.bulk_create([
+        EventPhoto(
+            event=event,
+            photo=f'uploads/events/photos/{event.id}-{index}.jpg',
+        )
+        for event in events
+        for index in range(PHOTOS_PER_EVENT)
+    ])
+
+
+def benchmark_cases():
+    '''
+    Return the requests to benchmark.
+
+    Returns
+    -------
+    list
+        Tuples of (name, http method, url, payload).
+    '''
+    event = Event.objects.order_by('id').first()
+    equipment = Equipment.objects.order_by('id').first()
+    customer = Customer.objects.order_by('id').first()
+    venue = Venue.objects.order_by('id').first()
+    uids = list(
+        Equipment.objects.order_by('id').values_list('uid', flat=True)[:200]
+    )
+
+    cases = [
+        ('venue-list', 'get', reverse('venue:venue-list'), None),
+        ('venue-detail', 'get',
+         reverse('venue:venue-detail', args=[venue.id]), None),
+        ('venue-stats', 'get',
+         reverse('venue:venue-stats', args=[venue.id]), None),
+        ('venue-search', 'get',
+         reverse('venue:venue-list') + '?search=City%201', None),
+        ('customer-list', 'get', reverse('customer:customer-list'), None),
+        ('customer-detail', 'get',
+         reverse('customer:customer-detail', args=[customer.id]), None),
+        ('customer-stats', 'get',
+         reverse('customer:customer-stats', args=[customer.id]), None),
+        ('equipmenttype-list', 'get',
+         reverse('inventory:equipmenttype-list'), None),
+        ('equipmentbrand-list', 'get',
+         reverse('inventory:equipmentbrand-list'), None),
+        ('equipmentmodel-list', 'get',
+         reverse('inventory:equipmentmodel-list'), None),
+        ('equipment-list', 'get', reverse('inventory:equipment-list'), None),
+        ('equipment-detail', 'get',
+         reverse('inventory:equipment-detail', args=[equipment.id]), None),
+        ('equipment-scan', 'post',
+         reverse('inventory:equipment-scan'), {'uids': uids}),
+        ('movement-list', 'get',
+         reverse('inventory:equipmentmovement-list'), None),
+        ('movement-device', 'get',
+         reverse('inventory:equipmentmovement-list')
+         + f'?equipment={uids[0]}', None),
+        ('equipmentstatus-list', 'get',
+         reverse('inventory:equipmentstatus-list') + '?kind=out', None),
+        ('utilization', 'get',
+         reverse('inventory:utilization') + '?group_by=type', None),
+        ('event-list', 'get', reverse('event:event-list'), None),
+        ('event-detail', 'get',
+         reverse('event:event-detail', args=[event.id]), None),
+        ('event-create', 'post', reverse('event:event-list'), {
+            'name': 'Benchmark Concert',
+            'load_in_date': '2023-01-01T08:30:00',
+            'load_out_date': '2023-01-03T09:30:00',
+            'start_date': '2023-01-02T08:00:00',
+            'end_date': '2023-01-02T14:30:00',
+            'venue': {'id': venue.id},
+            'customer': {'id': customer.id},
+            'equipment': [{'uid': uid} for uid in uids[:100]],
+            'crew': [{'username': event.leader.username}],
+            'leader': {'username': event.leader.username},
+            'comment': 'Benchmark',
+        }),
+        ('eventphoto-list', 'get', reverse('event:eventphoto-list'), None),
+        ('search', 'get', reverse('search:search') + '?q=Customer%201', None),
+    ]
+    return cases
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _request(client, method, url, payload):
+    '''Send a request, rolling back the changes of write requests.'''
+    try:
+        with transaction.atomic():
+            if method == 'get':
+                return client.get(url)
+            response = getattr(client, method)(url, payload, format='json')
+            raise Rollback
+    except Rollback:
+        pass
+    return response
+
+
+def run_case(client, method, url, payload, iterations):
+    '''
+    Time a request.
+
+    A first untimed request counts the queries and traces the peak memory,
+    since both slow the request down.
+
+    Returns
+    -------
+    dict
+        Latency percentiles in milliseconds, query count, peak traced memory
+        in bytes, response size and status code.
+    '''
+    reset_queries()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as captured:
+        response = _request(client, method, url, payload)
+    queries = len(captured)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _request(client, method, url, payload)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'status': response.status_code,
+        'iterations': iterations,
+        'p50_ms': _percentile(timings, 50),
+        'p90_ms': _percentile(timings, 90),
+        'p99_ms': _percentile(timings, 99),
+        'mean_ms': statistics.mean(timings),
+        'max_ms': max(timings),
+        'queries': queries,
+        'peak_memory_bytes': peak_memory,
+        'response_bytes': len(response.content),
+    }
+
+
+def run_benchmarks(user, iterations, only=None, stdout=None):
+    '''
+    Benchmark every API endpoint as `user`.
+
+    Parameters
+    ----------
+    user : Employee
+        Employee authenticated in the requests.
+    iterations : int
+        Number of times each request is timed.
+    only : list, optional
+        Names of the cases to run. All of them by default.
+    stdout : OutputWrapper, optional
+        Where to report progress.
+
+    Returns
+    -------
+    dict
+        Results by case name.
+    '''
+    client = APIClient()
+    client.force_authenticate(user)
+
+    results = {}
+    for name, method, url, payload in benchmark_cases():
+        if only and name not in only:
+            continue
+        results[name] = run_case(client, method, url, payload, iterations)
+        if stdout:
+            stdout.write(
+                f"{name}: p50 {results[name]['p50_ms']:.1f} ms, "
+                f"{results[name]['queries']} queries"
+            )
+    return results
+
+
+def write_results(path, results, meta):
+    '''Write the benchmark results to a JSON file.'''
+    with open(path, 'w') as output:
+        json.dump({'meta': meta, 'results': results}, output, indent=2)
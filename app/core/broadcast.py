@@ -0,0 +1,159 @@
+'''
+Broadcast of compact change notifications to the push clients.
+
+Model signals publish notifications like
+`{"model": "event", "action": "updated", "ids": [4]}` once their transaction
+commits, and the server-sent events stream (`core.views.stream`) forwards
+them to the dashboards. Notifications are delivered in process, or through
+Redis pub/sub when `BROADCAST_REDIS_URL` is set, so every worker of the ASGI
+server gets them. The `redis` package is only needed in that case.
+'''
+
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:
+    redis = None
+
+# Sent instead of the pending notifications of a client too slow to read
+# them, so it reloads everything.
+RESYNC = {'action': 'resync'}
+
+
+class LocalSubscription:
+    """Notifications queued for one client of a `LocalBroker`."""
+
+    def __init__(self, broker, size):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(size)
+
+    async def __aenter__(self):
+        with self.broker.lock:
+            self.broker.subscriptions.add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        with self.broker.lock:
+            self.broker.subscriptions.discard(self)
+
+    def deliver(self, message):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        '''Return the next notification, or None after `timeout` seconds.'''
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """Deliver notifications to the clients connected to this process."""
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def publish(self, message):
+        # Signals run in worker threads, subscriptions in the event loop
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(
+                subscription.deliver, message
+            )
+
+    def subscribe(self):
+        return LocalSubscription(self, self.queue_size)
+
+
+class RedisSubscription:
+    """Notifications of a Redis channel for one client."""
+
+    def __init__(self, url, channel):
+        self.client = redis.asyncio.from_url(url)
+        self.channel = channel
+        self.pubsub = self.client.pubsub()
+
+    async def __aenter__(self):
+        await self.pubsub.subscribe(self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.close()
+        await self.client.close()
+
+    async def get(self, timeout):
+        '''Return the next notification, or None after `timeout` seconds.'''
+        message = await self.pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout,
+        )
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+
+class RedisBroker:
+    """Deliver notifications to the clients of every process through Redis."""
+
+    def __init__(self, url, channel):
+        if redis is None:
+            raise ImproperlyConfigured(
+                'BROADCAST_REDIS_URL needs the redis package installed.'
+            )
+        self.url = url
+        self.channel = channel
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, message):
+        self.client.publish(self.channel, json.dumps(message))
+
+    def subscribe(self):
+        return RedisSubscription(self.url, self.channel)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    '''Return the broker set in the settings.'''
+    if settings.BROADCAST_REDIS_URL:
+        return RedisBroker(
+            settings.BROADCAST_REDIS_URL, settings.BROADCAST_CHANNEL,
+        )
+    return LocalBroker(settings.BROADCAST_QUEUE_SIZE)
+
+
+def broadcast(model, action, ids):
+    '''
+    Publish a change notification once the current transaction commits.
+
+    Parameters
+    ----------
+    model : str
+        Model name, like `event`.
+    action : str
+        `created`, `updated` or `deleted`.
+    ids : iterable
+        Ids of the changed rows.
+    '''
+    message = {'model': model, 'action': action, 'ids': sorted(ids)}
+    if message['ids']:
+        # A broker failure is logged without failing the committed request
+        transaction.on_commit(
+            lambda: get_broker().publish(message), robust=True,
+        )
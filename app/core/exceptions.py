@@ -0,0 +1,13 @@
+'''
+API exceptions shared by the whole project.
+'''
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    """The resource changed since the version the client sent."""
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource was modified since it was read.'
+    default_code = 'precondition_failed'
@@ -0,0 +1,89 @@
+'''
+Filters shared by the API views.
+'''
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from rest_framework.filters import BaseFilterBackend
+
+
+def search_queryset(queryset, query, search_fields):
+    """
+    Filter and rank a queryset by a free text query.
+
+    A row matches if its ``search_vector`` matches the query or if any of the
+    `search_fields` contains it. Every search field must have a trigram index
+    on ``UPPER(field)``, otherwise Postgres falls back to a sequential scan.
+    Rows are ordered by full text rank plus the best trigram similarity.
+
+    Parameters
+    ----------
+    queryset : QuerySet
+        Queryset of a model with a ``search_vector`` column.
+    query : str
+        Text typed by the user.
+    search_fields : list
+        Model field names (lookups across relations allowed) to match.
+
+    Returns
+    -------
+    QuerySet
+        Filtered queryset annotated with ``search_rank``.
+    """
+    search_query = SearchQuery(query, config='simple', search_type='websearch')
+
+    condition = Q(search_vector=search_query)
+    for field in search_fields:
+        condition |= Q(**{f'{field}__icontains': query})
+
+    similarities = [TrigramSimilarity(field, query) for field in search_fields]
+    if len(similarities) > 1:
+        similarity = Greatest(*similarities)
+    else:
+        similarity = similarities[0]
+
+    rank = (
+        Coalesce(SearchRank(F('search_vector'), search_query), Value(0.0))
+        + Coalesce(similarity, Value(0.0))
+    )
+
+    return queryset.filter(condition).annotate(
+        search_rank=rank,
+    ).order_by('-search_rank', 'pk')
+
+
+class RankedSearchFilter(BaseFilterBackend):
+    """
+    Filter list endpoints with the `search` query parameter.
+
+    Views enable it by defining a `search_fields` attribute.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        search_fields = getattr(view, 'search_fields', None)
+
+        if not query or not search_fields:
+            return queryset
+
+        return search_queryset(queryset, query, search_fields)
+
+    def get_schema_operation_parameters(self, view):
+        if not getattr(view, 'search_fields', None):
+            return []
+
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Text to search for. Results are ranked.',
+                'schema': {'type': 'string'},
+            },
+        ]
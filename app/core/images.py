@@ -0,0 +1,132 @@
+'''
+Validation and normalization of uploaded photos.
+
+Pillow decodes an image to `width * height * bands` bytes, so a phone
+panorama can take hundreds of megabytes of worker memory once loaded.
+Uploads are checked from their headers only (`Image.open` doesn't decode the
+pixels) against `PHOTO_MAX_BYTES` and `PHOTO_MAX_PIXELS`, then re-encoded:
+
+- JPEGs are decoded with `draft`, at the smallest 1/2, 1/4 or 1/8 scale still
+  larger than `PHOTO_MAX_DIMENSION`, so their memory doesn't grow with the
+  source resolution.
+- The EXIF orientation is applied to the pixels, and the EXIF, XMP and other
+  metadata (like GPS positions) are left out of the stored file.
+'''
+
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Accepted formats and the format they are stored in
+FORMATS = {
+    'JPEG': 'JPEG',
+    'PNG': 'PNG',
+    'WEBP': 'WEBP',
+    'GIF': 'PNG',
+}
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+class InvalidPhoto(ValueError):
+    """The upload isn't an accepted image or is over the limits."""
+
+
+def open_photo(file):
+    '''
+    Open an uploaded photo, reading only its header.
+
+    Parameters
+    ----------
+    file : File
+        Uploaded file.
+
+    Returns
+    -------
+    PIL.Image.Image
+        Image whose pixels aren't loaded yet.
+
+    Raises
+    ------
+    InvalidPhoto
+        If the file isn't an image of the accepted formats, or is over
+        `PHOTO_MAX_BYTES` or `PHOTO_MAX_PIXELS`.
+    '''
+    if file.size > settings.PHOTO_MAX_BYTES:
+        raise InvalidPhoto(
+            f'Photos must be at most {settings.PHOTO_MAX_BYTES} bytes.'
+        )
+
+    file.seek(0)
+    try:
+        image = Image.open(file, formats=list(FORMATS))
+    except Image.DecompressionBombError:
+        image = None
+    except (OSError, SyntaxError, ValueError):
+        raise InvalidPhoto(
+            f'Upload a valid image ({", ".join(FORMATS)}).'
+        ) from None
+
+    if image is None or image.width * image.height > settings.PHOTO_MAX_PIXELS:
+        raise InvalidPhoto(
+            f'Photos must be at most {settings.PHOTO_MAX_PIXELS} pixels.'
+        )
+    return image
+
+
+def normalize_photo(file):
+    '''
+    Validate an uploaded photo and re-encode it for storage.
+
+    The photo is scaled down to fit `PHOTO_MAX_DIMENSION`, turned upright
+    according to its EXIF orientation and stored without metadata.
+
+    Parameters
+    ----------
+    file : File
+        Uploaded file.
+
+    Returns
+    -------
+    ContentFile
+        Re-encoded photo, named after the upload.
+
+    Raises
+    ------
+    InvalidPhoto
+        If the upload isn't valid (see `open_photo`).
+    '''
+    image = open_photo(file)
+    source_format = image.format
+    size = (settings.PHOTO_MAX_DIMENSION, settings.PHOTO_MAX_DIMENSION)
+
+    try:
+        if source_format == 'JPEG':
+            image.draft('RGB', size)
+        image.thumbnail(size)
+        image = ImageOps.exif_transpose(image)
+    except (OSError, SyntaxError, ValueError):
+        raise InvalidPhoto('The image is corrupted.') from None
+
+    output_format = FORMATS[source_format]
+    if output_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif output_format == 'PNG' and image.mode not in ('1', 'L', 'LA', 'P',
+                                                       'RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    # Nothing of the source info is passed, so the metadata is dropped
+    buffer = BytesIO()
+    if output_format == 'JPEG':
+        image.save(
+            buffer, 'JPEG', quality=settings.PHOTO_JPEG_QUALITY, optimize=True,
+        )
+    else:
+        image.save(buffer, output_format)
+
+    name = os.path.splitext(os.path.basename(file.name or 'photo'))[0]
+    return ContentFile(
+        buffer.getvalue(), name=f'{name}{EXTENSIONS[output_format]}',
+    )
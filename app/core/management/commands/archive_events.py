@@ -0,0 +1,63 @@
+"""
+Django command to archive the events that ended long ago
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Event, Tombstone
+
+
+class Command(BaseCommand):
+    """
+    Django command to archive old events.
+
+    Events are archived in batches, each in its own short transaction, and
+    events being edited are left for the next run. Syncing clients get
+    tombstones for them, since the delta sync only covers the events not
+    archived.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.EVENT_ARCHIVE_AFTER_DAYS,
+            help='Archive the events ended more than these days ago.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Events archived per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        archived = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    Event.objects.filter(end_date__lt=cutoff).order_by(
+                        'end_date',
+                    ).select_for_update(
+                        skip_locked=True,
+                    ).values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                Event.all_objects.filter(id__in=ids).update(
+                    archived_at=timezone.now(),
+                )
+                Tombstone.objects.bulk_create(
+                    Tombstone(model='event', object_id=event_id)
+                    for event_id in ids
+                )
+            archived += len(ids)
+            self.stdout.write(f'Archived {archived} events')
+
+        self.stdout.write(self.style.SUCCESS(f'{archived} events archived!'))
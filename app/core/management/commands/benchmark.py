@@ -0,0 +1,117 @@
+"""
+Django command to benchmark the API against a large seeded data set
+"""
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.benchmark import DEFAULT_VOLUMES, run_benchmarks, seed, write_results
+from core.models import Event
+
+
+def git_revision():
+    '''Return the current git commit, if available.'''
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """
+    Django command to benchmark the API.
+
+    The data is seeded in a separate test database, the configured database
+    is never modified.
+    """
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(
+                f"--{name.replace('_', '-')}",
+                type=int,
+                default=default,
+                help=f'Rows to seed (default {default}).',
+            )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Multiply every seeded volume, e.g. 0.01 for a quick run.',
+        )
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--only',
+            nargs='*',
+            help='Names of the endpoints to benchmark, e.g. event-list.',
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark.json',
+            help='Where to write the JSON results.',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Keep the benchmark database and reuse its data next time.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        volumes = {
+            name: max(1, int(options[name] * options['scale']))
+            for name in DEFAULT_VOLUMES
+        }
+        volumes['devices_per_event'] = options['devices_per_event']
+
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            keepdb=options['keepdb'],
+        )
+
+        try:
+            if not Event.objects.exists():
+                self.stdout.write(f'Seeding {volumes}...')
+                seed(volumes, options['seed'])
+
+            user = Event.objects.order_by('id').first().leader
+            user.role = 'sales'
+            user.save()
+
+            results = run_benchmarks(
+                user,
+                options['iterations'],
+                only=options['only'],
+                stdout=self.stdout,
+            )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name,
+                verbosity=0,
+                keepdb=options['keepdb'],
+            )
+            teardown_test_environment()
+
+        write_results(options['output'], results, {
+            'revision': git_revision(),
+            'date': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'volumes': volumes,
+            'iterations': options['iterations'],
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f"Results written to {options['output']}"
+        ))
@@ -0,0 +1,27 @@
+"""
+Django command to rebuild the equipment utilization statistics
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from core.models import Event, EquipmentUtilization
+from core.utilization import months_between, refresh_utilization
+
+
+class Command(BaseCommand):
+    """Django command to rebuild equipment utilization."""
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        booking = Event.all_objects.aggregate(
+            start=Min('load_in_date'),
+            end=Max('load_out_date'),
+        )
+        months = months_between(booking['start'], booking['end'])
+
+        EquipmentUtilization.objects.exclude(month__in=months).delete()
+        for month in months:
+            refresh_utilization([month])
+            self.stdout.write(f'Refreshed {month:%Y-%m}')
+
+        self.stdout.write(self.style.SUCCESS('Utilization refreshed!'))
@@ -0,0 +1,72 @@
+"""
+Django command to run the tasks of the database queue
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.tasks import claim_tasks, execute
+
+
+def _execute(queued):
+    try:
+        return execute(queued)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    """Django command to run queued tasks."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.TASKS_CONCURRENCY,
+            help='Number of tasks run at the same time.',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=1,
+            help='Seconds to wait when the queue is empty.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        concurrency = options['concurrency']
+        running = {}
+        with ThreadPoolExecutor(concurrency) as executor:
+            while True:
+                # Tasks are claimed as slots free up, so a slow task doesn't
+                # hold back the others
+                tasks = claim_tasks(concurrency - len(running))
+                for queued in tasks:
+                    running[executor.submit(_execute, queued)] = queued
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                done, _ = wait(
+                    running,
+                    # With free slots, look for new tasks every poll
+                    timeout=(
+                        options['poll'] if len(running) < concurrency
+                        else None
+                    ),
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    queued = running.pop(future)
+                    status = 'done' if future.result() else 'failed'
+                    self.stdout.write(f'{queued.name}: {status}')
@@ -0,0 +1,315 @@
+'''
+Per-request performance metrics.
+
+`core.middleware.PerformanceMiddleware` measures every request (wall time,
+SQL queries, serialization, rendering and response size) and aggregates the
+measurements into histograms per route name, like `event:event-list`. The
+histograms live in the memory of each process and are exported in the
+Prometheus text format by `core.views.metrics`.
+'''
+
+import threading
+import time
+from contextvars import ContextVar
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (1000, 10000, 100000, 1000000, 10000000)
+
+
+class RequestMetrics:
+    """
+    Measurements of a single request.
+
+    Attributes
+    ----------
+    start : float
+        `time.perf_counter()` value when the request started.
+    queries : int
+        Number of SQL queries run.
+    db_time : float
+        Seconds spent running SQL queries.
+    serialize_time : float
+        Seconds spent in `TimedSerializerMixin` serializers.
+    render_time : float
+        Seconds spent rendering the response.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.serializing = False
+
+    def elapsed(self):
+        '''Return the seconds since the request started.'''
+        return time.perf_counter() - self.start
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        '''Database execute wrapper counting and timing the queries.'''
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def current_metrics():
+    '''Return the metrics of the request being handled, if any.'''
+    return _current_metrics.get()
+
+
+def start_request():
+    '''
+    Start measuring a request.
+
+    Returns
+    -------
+    tuple
+        The new `RequestMetrics` and the token to pass to `end_request`.
+    '''
+    metrics = RequestMetrics()
+    return metrics, _current_metrics.set(metrics)
+
+
+def end_request(token):
+    '''Stop measuring the request started with `token`.'''
+    _current_metrics.reset(token)
+
+
+class TimedSerializerMixin:
+    """
+    Add the time spent serializing objects to the request metrics.
+
+    Only the outermost serializer is timed, so nested serializers and the
+    items of a list aren't counted twice.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializing = False
+            metrics.serialize_time += time.perf_counter() - start
+
+
+def _format_labels(labels):
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Prometheus counter.
+
+    Parameters
+    ----------
+    name : str
+        Metric name.
+    documentation : str
+        Metric description.
+    label_names : tuple
+        Names of the labels of every sample.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        '''Increase the counter of the given label values.'''
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def clear(self):
+        '''Drop every sample.'''
+        with self._lock:
+            self._values = {}
+
+    def samples(self):
+        '''Yield the lines of the metric in the Prometheus text format.'''
+        with self._lock:
+            values = dict(self._values)
+
+        for labels, value in sorted(values.items()):
+            yield (
+                f'{self.name}_total'
+                f'{_format_labels(zip(self.label_names, labels))} '
+                f'{_format_value(value)}'
+            )
+
+
+class Histogram(Counter):
+    """
+    Prometheus histogram.
+
+    Parameters
+    ----------
+    name : str
+        Metric name.
+    documentation : str
+        Metric description.
+    label_names : tuple
+        Names of the labels of every sample.
+    buckets : tuple
+        Upper bounds of the buckets, in increasing order.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names, buckets):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        '''Add a measurement for the given label values.'''
+        with self._lock:
+            counts, total, count = self._values.get(
+                labels, ([0] * len(self.buckets), 0, 0)
+            )
+            counts = [
+                bucket_count + (value <= bound)
+                for bucket_count, bound in zip(counts, self.buckets)
+            ]
+            self._values[labels] = (counts, total + value, count + 1)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+
+        for labels, (counts, total, count) in sorted(values.items()):
+            pairs = list(zip(self.label_names, labels))
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield (
+                    f'{self.name}_bucket'
+                    f'{_format_labels(pairs + [("le", bound)])} {bucket_count}'
+                )
+            yield (
+                f'{self.name}_bucket'
+                f'{_format_labels(pairs + [("le", "+Inf")])} {count}'
+            )
+            yield f'{self.name}_sum{_format_labels(pairs)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(pairs)} {count}'
+
+
+LABELS = ('route', 'method')
+
+REQUESTS = Counter(
+    'http_requests',
+    'Requests handled.',
+    ('route', 'method', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Wall time of the requests.',
+    LABELS,
+    TIME_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries',
+    'SQL queries run per request.',
+    LABELS,
+    QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent running SQL queries per request.',
+    LABELS,
+    TIME_BUCKETS,
+)
+REQUEST_SERIALIZE_DURATION = Histogram(
+    'http_request_serialize_duration_seconds',
+    'Time spent serializing objects per request.',
+    LABELS,
+    TIME_BUCKETS,
+)
+REQUEST_RENDER_DURATION = Histogram(
+    'http_request_render_duration_seconds',
+    'Time spent rendering the response per request.',
+    LABELS,
+    TIME_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes',
+    'Size of the response bodies.',
+    LABELS,
+    SIZE_BUCKETS,
+)
+
+METRICS = [
+    REQUESTS,
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    REQUEST_DB_DURATION,
+    REQUEST_SERIALIZE_DURATION,
+    REQUEST_RENDER_DURATION,
+    RESPONSE_SIZE,
+]
+
+
+def observe_request(route, method, status, metrics, duration, size=None):
+    '''
+    Aggregate the measurements of a finished request.
+
+    Parameters
+    ----------
+    route : str
+        Route name of the request, like `event:event-list`.
+    method : str
+        HTTP method.
+    status : int
+        Response status code.
+    metrics : RequestMetrics
+        Measurements of the request.
+    duration : float
+        Wall time of the request in seconds.
+    size : int, optional
+        Size of the response body in bytes, if known.
+    '''
+    labels = (route, method)
+    REQUESTS.inc((route, method, str(status)))
+    REQUEST_DURATION.observe(labels, duration)
+    REQUEST_QUERIES.observe(labels, metrics.queries)
+    REQUEST_DB_DURATION.observe(labels, metrics.db_time)
+    REQUEST_SERIALIZE_DURATION.observe(labels, metrics.serialize_time)
+    REQUEST_RENDER_DURATION.observe(labels, metrics.render_time)
+    if size is not None:
+        RESPONSE_SIZE.observe(labels, size)
+
+
+def render_metrics():
+    '''Return every metric in the Prometheus text format.'''
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def clear_metrics():
+    '''Drop every aggregated measurement.'''
+    for metric in METRICS:
+        metric.clear()
@@ -0,0 +1,184 @@
+'''
+Middlewares shared by the whole project.
+'''
+
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from core import metrics as request_metrics
+from core.profiling import StackSampler, save_stacks
+from core.querylog import QueryInspector
+from core.routers import replica_reads
+
+# Cookie keeping the requests of a client on the primary database after it
+# wrote
+PRIMARY_PIN_COOKIE = 'primary_db'
+
+
+class PerformanceMiddleware:
+    """
+    Measure every request and report it in the `Server-Timing` header.
+
+    The wall time, the number and duration of SQL queries, the serialization
+    and rendering times and the response size are aggregated per route name
+    into the Prometheus metrics of `core.metrics`. It should be the first
+    middleware, so the measurements include every other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics, token = request_metrics.start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            request_metrics.end_request(token)
+
+        duration = metrics.elapsed()
+        response['Server-Timing'] = self.server_timing(metrics, duration)
+
+        match = getattr(request, 'resolver_match', None)
+        request_metrics.observe_request(
+            match.view_name if match else 'unmatched',
+            request.method,
+            response.status_code,
+            metrics,
+            duration,
+            None if response.streaming else len(response.content),
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        '''Time the rendering of DRF and template responses.'''
+        metrics = request_metrics.current_metrics()
+        start = time.perf_counter()
+
+        def rendered(response):
+            metrics.render_time += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def server_timing(metrics, duration):
+        '''Return the `Server-Timing` header value of a request.'''
+        return ', '.join([
+            f'total;dur={duration * 1000:.1f}',
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries"',
+            f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+            f'render;dur={metrics.render_time * 1000:.1f}',
+        ])
+
+
+class QueryInspectionMiddleware:
+    """
+    Log repeated (N+1) and slow queries of every request.
+
+    Meant for development and staging: it is only loaded when the
+    `QUERY_INSPECTION` setting is enabled, since finding the code running
+    every query and explaining slow queries is expensive. Thresholds come
+    from the `QUERY_INSPECTION_REPEAT_THRESHOLD` and `SLOW_QUERY_THRESHOLD_MS`
+    settings and reports go to the `core.queries` logger.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inspector = QueryInspector(
+            settings.QUERY_INSPECTION_REPEAT_THRESHOLD,
+            settings.SLOW_QUERY_THRESHOLD_MS,
+        )
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(inspector))
+            response = self.get_response(request)
+
+        inspector.report(request)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile a sample of the requests of every route.
+
+    `PROFILING_SAMPLE_RATES` maps route names (like `event:event-list`) to the
+    fraction of their requests to profile, `*` setting the rate of every
+    other route. Profiled requests have their stack sampled every
+    `PROFILING_INTERVAL_MS` and the samples are saved per route by
+    `core.profiling`. The middleware isn't loaded when no rate is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_SAMPLE_RATES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            route = resolve(request.path_info).view_name
+        except Resolver404:
+            return self.get_response(request)
+
+        rates = settings.PROFILING_SAMPLE_RATES
+        rate = rates.get(route, rates.get('*', 0))
+        if random.random() >= rate:
+            return self.get_response(request)
+
+        with StackSampler(
+            threading.get_ident(),
+            settings.PROFILING_INTERVAL_MS / 1000,
+        ) as sampler:
+            response = self.get_response(request)
+
+        save_stacks(route, sampler.stacks)
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Read from the database replicas in safe requests.
+
+    `GET`, `HEAD` and `OPTIONS` requests read from a replica (see
+    `core.routers`). Requests writing to the database, and every other
+    method, set a cookie keeping the next `REPLICA_PIN_SECONDS` of requests
+    of the client on the primary, so it reads its own writes. The middleware
+    isn't loaded without `DATABASE_REPLICAS`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        pinned = PRIMARY_PIN_COOKIE in request.COOKIES
+        with replica_reads(safe and not pinned) as routing:
+            response = self.get_response(request)
+
+        if routing.wrote or not safe:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,114 @@
+# Generated by Django 4.2.3 on 2026-10-19 18:19
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# The search vectors are kept up to date by the database itself so that rows
+# written through bulk_create()/update() are indexed as well.
+SEARCH_TRIGGERS = {
+    'core_venue': ['name', 'address', 'city', 'state'],
+    'core_customer': ['name', 'company', 'email'],
+    'core_equipment': ['uid', 'serial_number'],
+    'core_event': ['name', 'comment'],
+}
+
+
+def create_triggers_sql():
+    statements = []
+    for table, columns in SEARCH_TRIGGERS.items():
+        statements.append(
+            f"CREATE TRIGGER {table}_search_vector_update "
+            f"BEFORE INSERT OR UPDATE ON {table} FOR EACH ROW "
+            f"EXECUTE FUNCTION tsvector_update_trigger("
+            f"search_vector, 'pg_catalog.simple', {', '.join(columns)});"
+        )
+        # Fire the trigger once for existing rows.
+        statements.append(f"UPDATE {table} SET id = id;")
+    return statements
+
+
+def drop_triggers_sql():
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table};"
+        for table in SEARCH_TRIGGERS
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_rename_client_customer_rename_client_event_customer'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='customer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='customer_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='customer_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('company'), name='gin_trgm_ops'), name='customer_company_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='equipment_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('uid'), name='gin_trgm_ops'), name='equipment_uid_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('serial_number'), name='gin_trgm_ops'), name='equipment_serial_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='event_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='event_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='venue_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='venue_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city'), name='gin_trgm_ops'), name='venue_city_trgm_idx'),
+        ),
+        migrations.RunSQL(create_triggers_sql(), drop_triggers_sql()),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.3 on 2026-10-19 18:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('out', 'Salida'), ('in', 'Entrada'), ('damaged', 'Dañado')], max_length=10)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('employee', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.equipment')),
+                ('event', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.event')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EquipmentStatus',
+            fields=[
+                ('equipment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='status', serialize=False, to='core.equipment')),
+                ('kind', models.CharField(choices=[('out', 'Salida'), ('in', 'Entrada'), ('damaged', 'Dañado')], max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('event', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.event')),
+                ('movement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.equipmentmovement')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind'], name='status_kind_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='equipmentmovement',
+            index=models.Index(fields=['equipment', '-timestamp'], name='movement_equipment_time_idx'),
+        ),
+    ]
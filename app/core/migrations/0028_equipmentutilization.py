@@ -0,0 +1,30 @@
+# Generated by Django 4.2.3 on 2026-10-19 18:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_equipmentmovement_equipmentstatus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentUtilization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('booked_hours', models.FloatField()),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.equipment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='utilization_month_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentutilization',
+            constraint=models.UniqueConstraint(fields=('equipment', 'month'), name='utilization_equipment_month_unique'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.3 on 2026-10-19 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_event_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('event_name', models.CharField(max_length=50)),
+                ('comment', models.TextField(blank=True)),
+                ('load_in_before', models.DurationField()),
+                ('duration', models.DurationField()),
+                ('load_out_after', models.DurationField()),
+                ('crew', models.ManyToManyField(related_name='event_template_crew', to=settings.AUTH_USER_MODEL)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.customer')),
+                ('equipment', models.ManyToManyField(related_name='event_templates', to='core.equipment')),
+                ('leader', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='event_template_leader', to=settings.AUTH_USER_MODEL)),
+                ('venue', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.venue')),
+            ],
+        ),
+    ]
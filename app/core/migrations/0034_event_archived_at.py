@@ -0,0 +1,42 @@
+# Generated by Django 4.2.3 on 2026-10-19 19:16
+
+from django.db import migrations, models
+import django.db.models.manager
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_queuedtask'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='event',
+            options={'base_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelManagers(
+            name='event',
+            managers=[
+                ('objects', django.db.models.manager.Manager()),
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='archived_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['start_date'], name='event_hot_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['load_in_date', 'load_out_date'], name='event_hot_booking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('archived_at__isnull', False)), fields=['archived_at'], name='event_archived_at_idx'),
+        ),
+    ]
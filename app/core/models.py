@@ -1,7 +1,12 @@
 import uuid
 import os
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -98,6 +103,18 @@ class Venue(models.Model):
     address = models.CharField(max_length=255, null=False)
     city = models.CharField(max_length=255, null=False)
     state = models.CharField(max_length=255, null=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='venue_search_vector_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='venue_name_trgm_idx'),
+            GinIndex(OpClass(Upper('city'), name='gin_trgm_ops'),
+                     name='venue_city_trgm_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -108,6 +125,18 @@ class Customer(models.Model):
     phone = models.CharField(max_length=10, null=True)
     email = models.EmailField(null=True)
     company = models.CharField(max_length=50, null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='customer_search_vector_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='customer_name_trgm_idx'),
+            GinIndex(OpClass(Upper('company'), name='gin_trgm_ops'),
+                     name='customer_company_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -137,6 +166,28 @@ class EquipmentType(models.Model):
         return self.name
 
 
+class EquipmentQuerySet(models.QuerySet):
+    """Queryset building the uid of the devices saved in bulk."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for equipment in objs:
+            equipment.uid = equipment.build_uid()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        attnames = {self.model._meta.get_field(name).attname for name in fields}
+        if attnames & set(self.model.UID_FIELDS):
+            # Like `save`, since `auto_now` only applies to saved fields
+            now = timezone.now()
+            for equipment in objs:
+                equipment.uid = equipment.build_uid()
+                equipment.updated_at = now
+            fields = [*fields, *{'uid', 'updated_at'} - set(fields)]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Equipment(models.Model):
     """Device"""
     model = models.ForeignKey(EquipmentModel, on_delete=models.CASCADE) 
@@ -145,21 +196,113 @@ class Equipment(models.Model):
     number = models.IntegerField(null=False)
     uid = models.CharField(unique=True)
     serial_number = models.CharField(max_length=50, null=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='equipment_search_vector_idx'),
+            GinIndex(OpClass(Upper('uid'), name='gin_trgm_ops'),
+                     name='equipment_uid_trgm_idx'),
+            GinIndex(OpClass(Upper('serial_number'), name='gin_trgm_ops'),
+                     name='equipment_serial_trgm_idx'),
+        ]
+
+    objects = EquipmentQuerySet.as_manager()
+
+    # Fields the uid is built from, as stored in the database
+    UID_FIELDS = ('model_id', 'brand_id', 'type_id', 'number')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_uid_values()
+        return instance
+
+    def remember_uid_values(self):
+        self._uid_values = self.uid_values()
+
+    def uid_values(self):
+        # Deferred fields are left out instead of being fetched
+        return tuple(self.__dict__.get(name) for name in self.UID_FIELDS)
+
+    def build_uid(self, values=None):
+        '''
+        Return the uid of the device, from the ids of its catalog.
+
+        `values` are the `UID_FIELDS` to build it from, the current ones by
+        default.
+        '''
+        if values is None:
+            values = [getattr(self, name) for name in self.UID_FIELDS]
+        model_id, brand_id, type_id, number = values
+        return f'{model_id:02}{brand_id:02}{type_id:02}-{number}'
 
     def save(self, *args, **kwargs):
-        model_id = str(self.model.id).zfill(2)
-        brand_id = str(self.brand.id).zfill(2)
-        type_id = str(self.type.id).zfill(2)
-        number = str(self.number)
-        self.uid = f"{model_id}{brand_id}{type_id}-{number}"
-        super(Equipment, self).save(*args, **kwargs)
+        '''
+        Save the device, building its uid if new or if the saved fields change
+        its catalog.
+        '''
+        if self._state.adding:
+            self.uid = self.build_uid()
+            super().save(*args, **kwargs)
+            self.remember_uid_values()
+            return
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Deferred fields aren't saved either
+            saved = [name for name in self.UID_FIELDS if name in self.__dict__]
+        else:
+            attnames = {
+                self._meta.get_field(name).attname for name in update_fields
+            }
+            saved = [name for name in self.UID_FIELDS if name in attnames]
+        stored = dict(zip(
+            self.UID_FIELDS,
+            getattr(self, '_uid_values', (None,) * len(self.UID_FIELDS)),
+        ))
+
+        if any(getattr(self, name) != stored[name] for name in saved):
+            # Unsaved changes are left out, the row keeps their stored value
+            self.uid = self.build_uid([
+                getattr(self, name)
+                if name in saved or stored[name] is None else stored[name]
+                for name in self.UID_FIELDS
+            ])
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'uid', 'updated_at',
+                }
+        super().save(*args, **kwargs)
+        self._uid_values = tuple(
+            getattr(self, name) if name in saved else stored[name]
+            for name in self.UID_FIELDS
+        )
 
     def __str__(self):
         return self.uid
 
 
+class VersionConflict(Exception):
+    """Raised when saving an event changed since it was loaded."""
+
+
+class HotEventManager(models.Manager):
+    """Manager for the events not archived."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(archived_at__isnull=True)
+
+
 class Event(models.Model):
-    """Event or equipment loan."""
+    """
+    Event or equipment loan.
+
+    Old events are archived (see the `archive_events` command): `objects`
+    leaves them out, `all_objects` includes them.
+    """
 
     name = models.CharField(max_length=50)
     load_in_date = models.DateTimeField()
@@ -172,11 +315,151 @@ class Event(models.Model):
     crew = models.ManyToManyField(Employee, related_name="event_crew")
     leader = models.ForeignKey(Employee, on_delete=models.SET_NULL, related_name="event_leader", null=True)
     comment = models.TextField()
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Increased on every save, to detect concurrent updates.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Also touched when the equipment or crew change (see `core.signals`).
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    archived_at = models.DateTimeField(null=True, editable=False)
+
+    objects = HotEventManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        # Foreign keys to events and cascades still reach the archived
+        # events; related sets like `customer.event_set` use `objects` and
+        # leave them out unless called with `manager='all_objects'`
+        base_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['end_date'], name='event_end_date_idx'),
+            # Queries on the events not archived
+            models.Index(fields=['start_date'],
+                         condition=models.Q(archived_at__isnull=True),
+                         name='event_hot_start_date_idx'),
+            models.Index(fields=['load_in_date', 'load_out_date'],
+                         condition=models.Q(archived_at__isnull=True),
+                         name='event_hot_booking_idx'),
+            models.Index(fields=['archived_at'],
+                         condition=models.Q(archived_at__isnull=False),
+                         name='event_archived_at_idx'),
+            GinIndex(fields=['search_vector'], name='event_search_vector_idx'),
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='event_name_trgm_idx'),
+        ]
+
+    # Values as stored in the database, used to refresh the statistics the
+    # event is moved away from (see `core.signals`).
+    TRACKED_FIELDS = ('load_in_date', 'load_out_date', 'customer_id', 'venue_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self):
+        self._loaded_values = {
+            name: self.__dict__.get(name) for name in self.TRACKED_FIELDS
+        }
+
+    def save(self, *args, **kwargs):
+        '''
+        Save the event, increasing its version.
+
+        Existing events are only updated if their version in the database is
+        still the one of the instance, without locking the row.
+
+        Raises
+        ------
+        VersionConflict
+            If the event was updated or deleted since it was loaded.
+        '''
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {
+                *kwargs['update_fields'], 'version', 'updated_at',
+            }
+
+        self._expected_version = self.version
+        self.version += 1
+        try:
+            # A savepoint keeps the enclosing transaction usable on conflicts
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except VersionConflict:
+            self.version = self._expected_version
+            raise
+        finally:
+            del self._expected_version
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        expected_version = getattr(self, '_expected_version', None)
+        if expected_version is None:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+
+        updated = super()._do_update(
+            base_qs.filter(version=expected_version),
+            using,
+            pk_val,
+            values,
+            update_fields,
+            forced_update,
+        )
+        if not updated:
+            raise VersionConflict(
+                f'Event {pk_val} changed since version {expected_version}'
+            )
+        return updated
 
     def __str__(self):
         return self.name
 
 
+class Tombstone(models.Model):
+    """Deleted row, kept for the clients syncing changes (see `sync`)."""
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+
+class QueuedTask(models.Model):
+    """Task waiting in the database queue (see `core.tasks`)."""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='queued',
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    # When the task can run, or when the lease of a running task expires
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='queuedtask_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
 class EventPhoto(models.Model):
     """Photo of an event"""
     photo = models.ImageField(upload_to=event_photo_path)
@@ -187,3 +470,153 @@ class EventFile(models.Model):
     """File used for an event"""
     file = models.FileField(upload_to=event_file_path)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, null=False)
+
+
+class EventTemplate(models.Model):
+    """
+    Saved event used to create recurring events.
+
+    Dates are kept relative to the start of the event, so the template can be
+    placed at any start date.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    event_name = models.CharField(max_length=50)
+    venue = models.ForeignKey(Venue, on_delete=models.SET_NULL, null=True)
+    customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
+    leader = models.ForeignKey(
+        Employee,
+        on_delete=models.SET_NULL,
+        related_name='event_template_leader',
+        null=True,
+    )
+    equipment = models.ManyToManyField(Equipment, related_name='event_templates')
+    crew = models.ManyToManyField(Employee, related_name='event_template_crew')
+    comment = models.TextField(blank=True)
+    # Time from the load-in to the start of the event
+    load_in_before = models.DurationField()
+    # Time from the start to the end of the event
+    duration = models.DurationField()
+    # Time from the end of the event to the load-out
+    load_out_after = models.DurationField()
+
+    def __str__(self):
+        return self.name
+
+
+class EquipmentMovementManager(models.Manager):
+    """Manager for equipment movements."""
+
+    def record(self, equipment_ids, kind, employee=None, event=None):
+        '''
+        Append a movement for every device and update their current status.
+
+        Parameters
+        ----------
+        equipment_ids : list
+            Ids of the scanned devices.
+        kind : str
+            Movement kind, one of `EquipmentMovement.KIND_CHOICES`.
+        employee : Employee, optional
+            Employee that scanned the devices.
+        event : Event, optional
+            Event the devices are leaving for or returning from.
+
+        Returns
+        -------
+        list
+            Created `EquipmentMovement` instances.
+        '''
+        timestamp = timezone.now()
+
+        with transaction.atomic(using=self.db):
+            movements = self.bulk_create([
+                self.model(
+                    equipment_id=equipment_id,
+                    kind=kind,
+                    employee=employee,
+                    event=event,
+                    timestamp=timestamp,
+                )
+                for equipment_id in equipment_ids
+            ])
+            EquipmentStatus.objects.using(self.db).bulk_create(
+                [
+                    EquipmentStatus(
+                        equipment_id=movement.equipment_id,
+                        movement=movement,
+                        kind=movement.kind,
+                        event=movement.event,
+                        timestamp=movement.timestamp,
+                    )
+                    for movement in movements
+                ],
+                update_conflicts=True,
+                unique_fields=['equipment'],
+                update_fields=['movement', 'kind', 'event', 'timestamp'],
+            )
+
+        return movements
+
+
+class EquipmentMovement(models.Model):
+    """Check-in/check-out record of a device. Rows are append-only."""
+    KIND_CHOICES = (
+        ('out', 'Salida'),
+        ('in', 'Entrada'),
+        ('damaged', 'Dañado'),
+    )
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    timestamp = models.DateTimeField(default=timezone.now)
+    employee = models.ForeignKey(
+        Employee, on_delete=models.SET_NULL, null=True
+    )
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True)
+
+    objects = EquipmentMovementManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['equipment', '-timestamp'],
+                         name='movement_equipment_time_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Equipment movements cannot be modified')
+        super().save(*args, **kwargs)
+
+
+class EquipmentStatus(models.Model):
+    """Last movement of every device, kept up to date on each movement."""
+    equipment = models.OneToOneField(
+        Equipment, on_delete=models.CASCADE, primary_key=True,
+        related_name='status',
+    )
+    movement = models.ForeignKey(EquipmentMovement, on_delete=models.CASCADE)
+    kind = models.CharField(
+        max_length=10, choices=EquipmentMovement.KIND_CHOICES
+    )
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind'], name='status_kind_idx'),
+        ]
+
+
+class EquipmentUtilization(models.Model):
+    """Hours a device was booked by events during a month."""
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE)
+    month = models.DateField()
+    booked_hours = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['equipment', 'month'],
+                                    name='utilization_equipment_month_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='utilization_month_idx'),
+        ]
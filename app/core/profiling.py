@@ -0,0 +1,115 @@
+'''
+Sampling profiler of API requests.
+
+A fraction of the requests of every route, set in the
+`PROFILING_SAMPLE_RATES` setting, is profiled by sampling the stack of the
+thread handling it. Samples are appended to one file per route in
+`PROFILING_DIR`, in the collapsed stack format read by flamegraph.pl and
+speedscope.
+'''
+
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+_PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_DIR):
+        filename = filename[len(_PROJECT_DIR) + 1:]
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """
+    Sample the stack of a thread at regular intervals.
+
+    Parameters
+    ----------
+    thread_id : int
+        Identifier of the sampled thread.
+    interval : float
+        Seconds between samples.
+
+    Attributes
+    ----------
+    stacks : Counter
+        Number of samples by collapsed stack, outermost frame first.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+
+def profile_path(route):
+    '''Return the collapsed stacks file of a route.'''
+    name = re.sub(r'[^\w.-]', '_', route)
+    return Path(settings.PROFILING_DIR) / f'{name}.collapsed'
+
+
+def save_stacks(route, stacks):
+    '''Append collapsed stacks to the file of a route.'''
+    if not stacks:
+        return
+
+    path = profile_path(route)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as profile_file:
+        profile_file.writelines(
+            f'{stack} {count}\n' for stack, count in stacks.items()
+        )
+
+
+def load_stacks(path):
+    '''
+    Read a collapsed stacks file, merging the samples of the same stack.
+
+    Returns
+    -------
+    Counter
+        Number of samples by collapsed stack.
+    '''
+    stacks = Counter()
+    with open(path) as profile_file:
+        for line in profile_file:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def available_profiles():
+    '''Return the names of the routes with a profile.'''
+    directory = Path(settings.PROFILING_DIR)
+    if not directory.is_dir():
+        return []
+    return sorted(path.stem for path in directory.glob('*.collapsed'))
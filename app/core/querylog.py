@@ -0,0 +1,141 @@
+'''
+N+1 and slow query detection.
+
+`QueryInspector` records the queries of a request with the line of project
+code that ran them. Queries sharing a fingerprint (the SQL without its
+parameters) many times in one request are reported as N+1 candidates and
+queries slower than a threshold are reported with their EXPLAIN plan. Reports
+go to the `core.queries` logger.
+'''
+
+import logging
+import re
+import time
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger('core.queries')
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACES = re.compile(r'\s+')
+
+_PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+_IGNORED_FILES = (
+    str(Path(__file__).resolve()),
+    str(Path(__file__).resolve().with_name('middleware.py')),
+)
+
+
+def fingerprint(sql):
+    '''
+    Return the SQL of a query without its parameters.
+
+    Literals become `?` and lists of parameters become `(...)`, so the
+    queries fetching different rows the same way share a fingerprint.
+    '''
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _LITERALS.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def caller():
+    '''Return the innermost project code line of the current stack.'''
+    for frame in reversed(traceback.extract_stack()):
+        filename = str(Path(frame.filename).resolve())
+        if (filename.startswith(_PROJECT_DIR)
+                and filename not in _IGNORED_FILES):
+            location = Path(filename).relative_to(_PROJECT_DIR)
+            return f'{location}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryInspector:
+    """
+    Database execute wrapper recording the queries of a request.
+
+    Parameters
+    ----------
+    repeat_threshold : int
+        Number of runs of the same fingerprint reported as N+1.
+    slow_threshold : float
+        Duration in milliseconds from which a query is reported as slow.
+    """
+
+    def __init__(self, repeat_threshold, slow_threshold):
+        self.repeat_threshold = repeat_threshold
+        self.slow_threshold = slow_threshold
+        self.fingerprints = {}
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            location = caller()
+            key = fingerprint(sql)
+
+            count, locations = self.fingerprints.get(key, (0, set()))
+            locations.add(location)
+            self.fingerprints[key] = (count + 1, locations)
+
+            if duration >= self.slow_threshold:
+                self.slow_queries.append({
+                    'sql': sql,
+                    'params': params,
+                    'many': many,
+                    'duration': duration,
+                    'location': location,
+                    'connection': context['connection'],
+                })
+
+    def repeated(self):
+        '''
+        Return the fingerprints run at least `repeat_threshold` times.
+
+        Returns
+        -------
+        list
+            Tuples of (fingerprint, count, locations), most repeated first.
+        '''
+        repeated = [
+            (sql, count, sorted(locations))
+            for sql, (count, locations) in self.fingerprints.items()
+            if count >= self.repeat_threshold
+        ]
+        return sorted(repeated, key=lambda item: -item[1])
+
+    def report(self, request):
+        '''Log the N+1 candidates and slow queries of a finished request.'''
+        route = f'{request.method} {request.path}'
+
+        for sql, count, locations in self.repeated():
+            logger.warning(
+                'N+1: %s ran %d times at %s: %s',
+                route, count, ', '.join(locations), sql,
+            )
+
+        for query in self.slow_queries:
+            logger.warning(
+                'Slow query: %s took %.1f ms at %s: %s\n%s',
+                route, query['duration'], query['location'], query['sql'],
+                explain(query),
+            )
+
+
+def explain(query):
+    '''Return the EXPLAIN plan of a recorded SELECT query.'''
+    if query['many'] or not query['sql'].lstrip().upper().startswith('SELECT'):
+        return 'No plan for non SELECT queries'
+
+    try:
+        with query['connection'].cursor() as cursor:
+            cursor.execute(f"EXPLAIN {query['sql']}", query['params'])
+            return '\n'.join(row[0] for row in cursor.fetchall())
+    except DatabaseError as error:
+        return f'No plan: {error}'
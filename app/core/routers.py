@@ -0,0 +1,126 @@
+'''
+Routing of reads to the database replicas.
+
+`ReplicaRouter` sends reads to one of the `DATABASE_REPLICAS` only inside
+`replica_reads` blocks, which `core.middleware.ReplicaMiddleware` opens for
+safe requests. Everything else (writes, management commands, background
+tasks) uses the primary. Once a request writes, its remaining reads go to the
+primary as well, and the middleware keeps the next requests of the client on
+the primary for `REPLICA_PIN_SECONDS`, so clients read their own writes
+despite the replication lag.
+
+Reads inside a transaction of the primary also stay there, since the
+replicas can't see the uncommitted rows, and so do the reads of
+`primary_reads` blocks, for code that can't work with lagging rows.
+'''
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Routing of the current request, None outside `replica_reads`
+_routing = ContextVar('database_routing', default=None)
+
+# App of the rows of the database cache backend, kept on the primary since
+# stale entries would outlive their invalidation
+CACHE_APP_LABEL = 'django_cache'
+
+
+class Routing:
+    """
+    Database routing of one request.
+
+    Parameters
+    ----------
+    replica : str
+        Alias of the replica serving the reads, None to read from the
+        primary.
+    """
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(use_replicas=True):
+    '''
+    Route the reads of the block to a replica.
+
+    A single random replica serves the whole block, so its reads are
+    consistent with each other.
+
+    Parameters
+    ----------
+    use_replicas : bool
+        Whether to read from a replica, False only tracks the writes.
+
+    Yields
+    ------
+    Routing
+        Routing of the block, whose `wrote` tells if the block wrote.
+    '''
+    replicas = settings.DATABASE_REPLICAS
+    routing = Routing(
+        random.choice(replicas) if use_replicas and replicas else None
+    )
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    '''
+    Route the reads of the block to the primary, even in `replica_reads`
+    blocks.
+
+    For reads that must see every committed row, like the sync cursors, or
+    whose results outlive the request, like cached values.
+    '''
+    routing = _routing.get()
+    replica = routing.replica if routing is not None else None
+    if replica is not None:
+        routing.replica = None
+    try:
+        yield
+    finally:
+        # Blocks that wrote keep reading from the primary
+        if replica is not None and not routing.wrote:
+            routing.replica = replica
+
+
+class ReplicaRouter:
+    """Send the reads of `replica_reads` blocks to a replica."""
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if (
+            routing is None
+            or routing.replica is None
+            or model._meta.app_label == CACHE_APP_LABEL
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None and model._meta.app_label != CACHE_APP_LABEL:
+            routing.replica = None
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
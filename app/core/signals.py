@@ -0,0 +1,272 @@
+'''
+Signal handlers keeping derived data in sync with events.
+'''
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.broadcast import broadcast
+from core.models import (
+    Customer,
+    Employee,
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentType,
+    Event,
+    Tombstone,
+    Venue,
+)
+from core.stats import invalidate_event_stats
+from core.utilization import months_between, refresh_utilization_later
+
+# Fields of the employees shown with their events
+EMPLOYEE_EVENT_FIELDS = {'username', 'first_name', 'fathers_name'}
+# Fields of the devices pointing to each catalog model
+CATALOG_FIELDS = {
+    EquipmentModel: 'model',
+    EquipmentBrand: 'brand',
+    EquipmentType: 'type',
+}
+
+
+def _loaded_value(event, name):
+    return getattr(event, '_loaded_values', {}).get(name)
+
+
+def _booking_months(event):
+    '''Return the months of the current and previously stored booking.'''
+    months = set(months_between(event.load_in_date, event.load_out_date))
+    months.update(months_between(
+        _loaded_value(event, 'load_in_date'),
+        _loaded_value(event, 'load_out_date'),
+    ))
+    return months
+
+
+def _refresh_utilization(months, equipment_ids):
+    '''Refresh the utilization of devices through the task queue.'''
+    equipment_ids = sorted(set(equipment_ids))
+    if months and equipment_ids:
+        refresh_utilization_later.delay(
+            sorted(month.isoformat() for month in months), equipment_ids,
+        )
+
+
+def _invalidate_stats(events):
+    '''Invalidate the statistics of the customers and venues of events.'''
+    customer_ids = set()
+    venue_ids = set()
+    for event in events:
+        customer_ids.update([
+            event.customer_id, _loaded_value(event, 'customer_id')
+        ])
+        venue_ids.update([event.venue_id, _loaded_value(event, 'venue_id')])
+    invalidate_event_stats(customer_ids, venue_ids)
+
+
+def _touch_events(event_ids):
+    '''
+    Mark events as updated, for the calendar feeds and sync clients, and
+    notify the push clients.
+
+    Returns
+    -------
+    datetime
+        New `updated_at` of the events.
+    '''
+    now = timezone.now()
+    Event.objects.filter(id__in=event_ids).update(updated_at=now)
+    broadcast('event', 'updated', event_ids)
+    return now
+
+
+def _touch_equipment(equipment_ids):
+    '''Mark devices as updated, like `_touch_events`.'''
+    Equipment.objects.filter(id__in=equipment_ids).update(
+        updated_at=timezone.now(),
+    )
+    broadcast('equipment', 'updated', equipment_ids)
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, **kwargs):
+    # Devices of new events are added afterwards and handled by
+    # `event_equipment_changed`. Only the load dates affect the bookings.
+    if not created and (
+        instance.load_in_date != _loaded_value(instance, 'load_in_date')
+        or instance.load_out_date != _loaded_value(instance, 'load_out_date')
+    ):
+        equipment_ids = instance.equipment.values_list('id', flat=True)
+        _refresh_utilization(_booking_months(instance), equipment_ids)
+
+    _invalidate_stats([instance])
+    instance.remember_loaded_values()
+
+
+@receiver(pre_delete, sender=Event)
+def event_deleting(sender, instance, **kwargs):
+    instance._deleted_equipment_ids = list(
+        instance.equipment.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    _refresh_utilization(
+        _booking_months(instance),
+        getattr(instance, '_deleted_equipment_ids', []),
+    )
+    _invalidate_stats([instance])
+
+
+@receiver(m2m_changed, sender=Event.equipment.through)
+def event_equipment_changed(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_ids = list(
+                instance.event_set.values_list('id', flat=True)
+            )
+        else:
+            instance._cleared_ids = list(
+                instance.equipment.values_list('id', flat=True)
+            )
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    changed_ids = pk_set
+    if action == 'post_clear':
+        changed_ids = getattr(instance, '_cleared_ids', [])
+
+    if reverse:
+        # `instance` is a device and `changed_ids` are events
+        events = list(Event.objects.filter(id__in=changed_ids).only(
+            'load_in_date', 'load_out_date', 'customer_id', 'venue_id',
+        ))
+        months = set()
+        for event in events:
+            months.update(_booking_months(event))
+        _refresh_utilization(months, [instance.id])
+        _invalidate_stats(events)
+        _touch_events(changed_ids)
+    else:
+        _refresh_utilization(_booking_months(instance), changed_ids)
+        _invalidate_stats([instance])
+        instance.updated_at = _touch_events([instance.id])
+
+
+@receiver(m2m_changed, sender=Event.crew.through)
+def event_crew_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_ids = list(
+            instance.event_crew.values_list('id', flat=True)
+        )
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        instance.updated_at = _touch_events([instance.id])
+    elif action == 'post_clear':
+        _touch_events(getattr(instance, '_cleared_ids', []))
+    else:
+        # `instance` is an employee and `pk_set` are events
+        _touch_events(pk_set)
+
+
+def _employee_event_ids(employee):
+    return {
+        *Event.objects.filter(leader=employee).values_list('id', flat=True),
+        *Event.crew.through.objects.filter(
+            employee=employee,
+        ).values_list('event_id', flat=True),
+    }
+
+
+@receiver(post_save, sender=Venue)
+def venue_saved(sender, instance, created, **kwargs):
+    # Events show the name and address of their venue
+    if not created:
+        _touch_events(list(
+            Event.objects.filter(venue=instance).values_list('id', flat=True)
+        ))
+
+
+@receiver(post_save, sender=Employee)
+def employee_saved(sender, instance, created, update_fields, **kwargs):
+    # Events show the username of their crew, and the calendar of an employee
+    # their name. Logins only save `last_login`.
+    if created or (
+            update_fields is not None
+            and not EMPLOYEE_EVENT_FIELDS.intersection(update_fields)):
+        return
+    _touch_events(_employee_event_ids(instance))
+
+
+@receiver(post_save, sender=EquipmentModel)
+@receiver(post_save, sender=EquipmentBrand)
+@receiver(post_save, sender=EquipmentType)
+def catalog_saved(sender, instance, created, **kwargs):
+    # Devices show the names of their catalog
+    if not created:
+        _touch_equipment(list(Equipment.objects.filter(
+            **{CATALOG_FIELDS[sender]: instance},
+        ).values_list('id', flat=True)))
+
+
+@receiver(pre_delete, sender=Venue)
+def venue_deleting(sender, instance, **kwargs):
+    # Events lose their venue without being saved
+    _touch_events(list(
+        Event.objects.filter(venue=instance).values_list('id', flat=True)
+    ))
+
+
+@receiver(pre_delete, sender=Equipment)
+def equipment_deleting(sender, instance, **kwargs):
+    # Events lose the device without an m2m_changed signal
+    _touch_events(list(Event.equipment.through.objects.filter(
+        equipment=instance,
+    ).values_list('event_id', flat=True)))
+
+
+@receiver(pre_delete, sender=Employee)
+def employee_deleting(sender, instance, **kwargs):
+    _touch_events(_employee_event_ids(instance))
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Equipment)
+@receiver(post_delete, sender=Venue)
+@receiver(post_delete, sender=Customer)
+def synced_row_deleted(sender, instance, **kwargs):
+    # Tombstones tell the syncing clients to drop the row (see `sync`)
+    Tombstone.objects.create(
+        model=sender._meta.model_name, object_id=instance.pk,
+    )
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Equipment)
+def pushed_row_saved(sender, instance, created, **kwargs):
+    broadcast(
+        sender._meta.model_name,
+        'created' if created else 'updated',
+        [instance.pk],
+    )
+
+
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Equipment)
+def pushed_row_deleted(sender, instance, **kwargs):
+    broadcast(sender._meta.model_name, 'deleted', [instance.pk])
@@ -0,0 +1,130 @@
+'''
+Cached event statistics of customers and venues.
+
+Statistics are computed with a single query and cached until an event of the
+customer or venue changes (see `core.signals`).
+'''
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, JSONObject
+from django.utils import timezone
+
+from core.models import Customer, Event, Venue
+from core.routers import primary_reads
+
+
+def _cache_key(relation, pk):
+    return f'stats:{relation}:{pk}'
+
+
+def _stats(model, relation, pk):
+    '''
+    Aggregate the events of an instance related to `Event` by `relation`.
+
+    Parameters
+    ----------
+    model : class
+        Model of the instance (`Customer` or `Venue`).
+    relation : str
+        Name of the `Event` foreign key pointing to the model.
+    pk : int
+        Instance id.
+
+    Returns
+    -------
+    dict or None
+        Statistics, or None if the instance doesn't exist.
+    '''
+    now = timezone.now()
+    # The statistics cover the archived events too
+    events = Event.all_objects.filter(
+        **{relation: OuterRef('pk')}
+    ).order_by()
+    per_owner = events.values(relation)
+    equipment = Event.equipment.through.objects.filter(
+        **{f'event__{relation}': OuterRef('pk')}
+    ).order_by().values(f'event__{relation}')
+    event_summary = JSONObject(
+        id='id',
+        name='name',
+        start_date='start_date',
+        end_date='end_date',
+    )
+
+    return model.objects.filter(pk=pk).annotate(
+        event_count=Coalesce(
+            Subquery(per_owner.annotate(n=Count('id')).values('n')),
+            0,
+        ),
+        booked_time=Subquery(
+            per_owner.annotate(
+                booked=Sum(F('load_out_date') - F('load_in_date')),
+            ).values('booked')
+        ),
+        equipment_volume=Coalesce(
+            Subquery(
+                equipment.annotate(n=Count('id')).values('n'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+        last_event=Subquery(
+            events.filter(start_date__lte=now).order_by('-start_date').values(
+                data=event_summary,
+            )[:1]
+        ),
+        next_event=Subquery(
+            events.filter(start_date__gt=now).order_by('start_date').values(
+                data=event_summary,
+            )[:1]
+        ),
+    ).values(
+        'id',
+        'event_count',
+        'booked_time',
+        'equipment_volume',
+        'last_event',
+        'next_event',
+    ).first()
+
+
+def get_stats(model, relation, pk):
+    '''Return the cached statistics of an instance, computing them if needed.'''
+    key = _cache_key(relation, pk)
+    stats = cache.get(key)
+
+    if stats is None:
+        # Computed on the primary, since stale statistics of a replica would
+        # stay cached after their invalidation
+        with primary_reads():
+            stats = _stats(model, relation, pk)
+        if stats is None:
+            return None
+
+        booked_time = stats.pop('booked_time')
+        stats['booked_days'] = (
+            booked_time.total_seconds() / 86400 if booked_time else 0
+        )
+        cache.set(key, stats, settings.STATS_CACHE_TIMEOUT)
+
+    return stats
+
+
+def customer_stats(pk):
+    '''Return the event statistics of a customer.'''
+    return get_stats(Customer, 'customer', pk)
+
+
+def venue_stats(pk):
+    '''Return the event statistics of a venue.'''
+    return get_stats(Venue, 'venue', pk)
+
+
+def invalidate_event_stats(customer_ids=(), venue_ids=()):
+    '''Drop the cached statistics of customers and venues.'''
+    keys = [_cache_key('customer', pk) for pk in customer_ids if pk]
+    keys += [_cache_key('venue', pk) for pk in venue_ids if pk]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,239 @@
+'''
+Object storage for the media files.
+
+`S3Storage` keeps the event photos and files in a bucket of Amazon S3 or any
+S3 compatible service, like MinIO, so uploads aren't tied to the volume of
+one container. It is the default storage when `S3_BUCKET` is set and needs
+the `boto3` package installed.
+
+Files are downloaded through presigned URLs, and large files can be uploaded
+straight to the bucket: `direct_upload` returns a presigned URL for the
+client plus a signed token naming the uploaded object, which is sent back to
+register the file (see `load_upload`). Those files never go through the
+Django workers. Files saved by Django are sent in multipart uploads once
+they are over `S3_MULTIPART_THRESHOLD`.
+'''
+
+import mimetypes
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+# Salt of the direct upload tokens
+UPLOAD_SALT = 'core.storage.upload'
+# Seconds a direct upload can be registered, since large uploads can outlast
+# their presigned URL
+UPLOAD_TOKEN_MAX_AGE = 24 * 3600
+
+# Downloads kept in memory up to this size, then spooled to disk
+SPOOL_SIZE = 1024 * 1024
+
+
+@deconstructible
+class S3Storage(Storage):
+    """
+    Storage in a bucket of an S3 compatible service.
+
+    Parameters default to the `S3_*` settings.
+
+    Parameters
+    ----------
+    bucket : str
+        Bucket name.
+    endpoint_url : str
+        URL of the service, None for Amazon S3.
+    public_endpoint_url : str
+        URL of the service for the clients, used in the presigned URLs, when
+        the workers reach it by another address.
+    """
+
+    def __init__(self, bucket=None, endpoint_url=None,
+                 public_endpoint_url=None):
+        if boto3 is None:
+            raise ImproperlyConfigured(
+                'S3_BUCKET needs the boto3 package installed.'
+            )
+        self.bucket = bucket or settings.S3_BUCKET
+        self.endpoint_url = endpoint_url or settings.S3_ENDPOINT_URL
+        self.public_endpoint_url = (
+            public_endpoint_url or settings.S3_PUBLIC_ENDPOINT_URL
+            or self.endpoint_url
+        )
+
+    def _client(self, endpoint_url):
+        return boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            aws_access_key_id=settings.S3_ACCESS_KEY or None,
+            aws_secret_access_key=settings.S3_SECRET_KEY or None,
+            region_name=settings.S3_REGION,
+            config=Config(
+                signature_version='s3v4',
+                # MinIO and most compatible services don't use bucket
+                # subdomains
+                s3={'addressing_style': 'path'},
+            ),
+        )
+
+    @cached_property
+    def client(self):
+        return self._client(self.endpoint_url)
+
+    @cached_property
+    def signing_client(self):
+        '''Client signing the URLs given to the clients.'''
+        if self.public_endpoint_url == self.endpoint_url:
+            return self.client
+        return self._client(self.public_endpoint_url)
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode:
+            raise ValueError('S3 files can only be opened for reading.')
+        file = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.client.download_fileobj(self.bucket, name, file)
+        file.seek(0)
+        return File(file, name)
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        content_type = (
+            getattr(content, 'content_type', None)
+            or mimetypes.guess_type(name)[0]
+            or 'application/octet-stream'
+        )
+        self.client.upload_fileobj(
+            content,
+            self.bucket,
+            name,
+            ExtraArgs={'ContentType': content_type},
+            Config=TransferConfig(
+                multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=settings.S3_MULTIPART_THRESHOLD,
+            ),
+        )
+        return name
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=name)
+        except ClientError as error:
+            if error.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def size(self, name):
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+        return head['ContentLength']
+
+    def get_modified_time(self, name):
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+        return head['LastModified']
+
+    def url(self, name):
+        '''Return a presigned download URL, valid `S3_URL_EXPIRE_SECONDS`.'''
+        return self.signing_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': name},
+            ExpiresIn=settings.S3_URL_EXPIRE_SECONDS,
+        )
+
+    def presigned_upload(self, name, content_type, size):
+        '''
+        Return the request uploading a file straight to the bucket.
+
+        The content type and size are part of the signature, so the client
+        can't upload anything else.
+
+        Returns
+        -------
+        dict
+            `method`, `url` and `headers` of the request.
+        '''
+        url = self.signing_client.generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': name,
+                'ContentType': content_type,
+                'ContentLength': size,
+            },
+            ExpiresIn=settings.S3_URL_EXPIRE_SECONDS,
+        )
+        return {
+            'method': 'PUT',
+            'url': url,
+            'headers': {'Content-Type': content_type},
+        }
+
+
+def direct_upload(storage, name, content_type, size, **context):
+    '''
+    Prepare uploading a file straight to the storage.
+
+    Parameters
+    ----------
+    storage : Storage
+        Storage of the file. Only storages with a `presigned_upload` method,
+        like `S3Storage`, support direct uploads.
+    name : str
+        Name of the file in the storage.
+    content_type : str
+        MIME type of the file.
+    size : int
+        Size of the file in bytes.
+    **context
+        Values signed with the name, checked when registering the file.
+
+    Returns
+    -------
+    dict
+        Upload request (see `S3Storage.presigned_upload`) and the `upload`
+        token to send back once the file is uploaded, or None if the storage
+        doesn't support direct uploads.
+    '''
+    presigned_upload = getattr(storage, 'presigned_upload', None)
+    if presigned_upload is None:
+        return None
+    return {
+        'upload': signing.dumps({'name': name, **context}, salt=UPLOAD_SALT),
+        **presigned_upload(name, content_type, size),
+    }
+
+
+def load_upload(token):
+    '''
+    Return the name and context signed in a direct upload token.
+
+    Raises
+    ------
+    django.core.signing.BadSignature
+        If the token was tampered with or expired.
+    '''
+    return signing.loads(
+        token, salt=UPLOAD_SALT, max_age=UPLOAD_TOKEN_MAX_AGE,
+    )
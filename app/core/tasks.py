@@ -0,0 +1,232 @@
+'''
+Background tasks for slow side effects.
+
+Functions decorated with `task` run through the backend set in
+`TASKS_BACKEND` when called with `delay`:
+
+- `immediate` runs them right away in the caller, as a plain call.
+- `thread` runs them in a pool of `TASKS_CONCURRENCY` threads of the same
+  process once the current transaction commits.
+- `database` queues them in the `QueuedTask` table, in the current
+  transaction, for the `run_tasks` worker command. No broker is needed:
+  workers claim tasks with `SELECT ... FOR UPDATE SKIP LOCKED`.
+
+Failed tasks are retried up to their `retries`, waiting `retry_delay`
+seconds doubled on every attempt. Arguments must be JSON serializable for
+the database backend. Tasks are found in the `tasks` module of every app.
+'''
+
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import QueuedTask
+
+logger = logging.getLogger('core.tasks')
+
+# Registered tasks by name
+REGISTRY = {}
+
+
+class Task:
+    """
+    Function that can run in the background.
+
+    Parameters
+    ----------
+    func : callable
+        Task body.
+    name : str
+        Unique name, the dotted path of the function.
+    retries : int
+        Number of times the task is retried after failing.
+    retry_delay : float
+        Seconds before the first retry.
+    """
+
+    def __init__(self, func, name, retries, retry_delay):
+        self.func = func
+        self.name = name
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        '''Run the task through the configured backend.'''
+        get_backend().enqueue(self, args, kwargs)
+
+    def backoff(self, attempt):
+        '''Return the seconds to wait after failing `attempt` times.'''
+        return self.retry_delay * 2 ** (attempt - 1)
+
+
+def task(func=None, *, retries=0, retry_delay=None):
+    '''
+    Register a function as a task.
+
+    Can be used as `@task` or `@task(retries=3)`.
+    '''
+    def register(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        REGISTRY[name] = Task(
+            func,
+            name,
+            retries,
+            settings.TASKS_RETRY_DELAY if retry_delay is None else retry_delay,
+        )
+        return REGISTRY[name]
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+class ImmediateBackend:
+    """Run tasks in the caller."""
+
+    def enqueue(self, task, args, kwargs):
+        task.func(*args, **kwargs)
+
+
+class ThreadBackend:
+    """Run tasks in a pool of threads of the current process."""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            settings.TASKS_CONCURRENCY, thread_name_prefix='task',
+        )
+
+    def enqueue(self, task, args, kwargs):
+        transaction.on_commit(
+            lambda: self.executor.submit(self.run, task, args, kwargs)
+        )
+
+    def run(self, task, args, kwargs):
+        for attempt in range(1, task.retries + 2):
+            try:
+                return task.func(*args, **kwargs)
+            except Exception:
+                if attempt > task.retries:
+                    logger.exception('Task %s failed', task.name)
+                    return None
+                logger.warning(
+                    'Task %s failed, retrying', task.name, exc_info=True,
+                )
+                time.sleep(task.backoff(attempt))
+            finally:
+                close_old_connections()
+
+
+class DatabaseBackend:
+    """Queue tasks in the database for the `run_tasks` workers."""
+
+    def enqueue(self, task, args, kwargs):
+        QueuedTask.objects.create(
+            name=task.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=task.retries + 1,
+        )
+
+
+BACKENDS = {
+    'immediate': ImmediateBackend,
+    'thread': ThreadBackend,
+    'database': DatabaseBackend,
+}
+_backends = {}
+
+
+def get_backend():
+    '''Return the backend set in `TASKS_BACKEND`.'''
+    name = settings.TASKS_BACKEND
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(
+            f'TASKS_BACKEND must be one of {", ".join(BACKENDS)}.'
+        )
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+
+def claim_tasks(limit):
+    '''
+    Claim due tasks of the database queue.
+
+    Claimed tasks are leased for `TASKS_LEASE_SECONDS`: if their worker dies,
+    they are claimed again once the lease expires, or marked failed if that
+    was their last attempt. Tasks locked by other workers are skipped.
+
+    Returns
+    -------
+    list
+        Claimed `QueuedTask` instances.
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        QueuedTask.objects.filter(
+            status='running',
+            run_at__lte=now,
+            attempts__gte=F('max_attempts'),
+        ).update(
+            status='failed',
+            last_error='The lease expired before the task finished.',
+        )
+        ids = list(
+            QueuedTask.objects.filter(
+                status__in=['queued', 'running'], run_at__lte=now,
+            ).order_by('run_at').select_for_update(
+                skip_locked=True,
+            ).values_list('id', flat=True)[:limit]
+        )
+        QueuedTask.objects.filter(id__in=ids).update(
+            status='running',
+            attempts=F('attempts') + 1,
+            run_at=now + timedelta(seconds=settings.TASKS_LEASE_SECONDS),
+        )
+    return list(QueuedTask.objects.filter(id__in=ids).order_by('run_at'))
+
+
+def execute(queued):
+    '''
+    Run a claimed task, then delete it, queue it again or mark it failed.
+
+    Returns
+    -------
+    bool
+        Whether the task succeeded.
+    '''
+    task = REGISTRY.get(queued.name)
+    try:
+        if task is None:
+            raise LookupError(f'Unknown task {queued.name}')
+        task.func(*queued.args, **queued.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if task is not None and queued.attempts < queued.max_attempts:
+            logger.warning('Task %s failed, retrying', queued.name)
+            QueuedTask.objects.filter(id=queued.id).update(
+                status='queued',
+                run_at=timezone.now() + timedelta(
+                    seconds=task.backoff(queued.attempts)
+                ),
+                last_error=error,
+            )
+        else:
+            logger.error('Task %s failed', queued.name)
+            QueuedTask.objects.filter(id=queued.id).update(
+                status='failed', last_error=error,
+            )
+        return False
+    QueuedTask.objects.filter(id=queued.id).delete()
+    return True
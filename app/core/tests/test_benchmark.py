@@ -0,0 +1,91 @@
+"""
+Test the API benchmark helpers.
+"""
+import json
+import tempfile
+
+from django.test import TestCase
+
+from core import benchmark
+from core.models import (
+    Equipment,
+    EquipmentStatus,
+    Event,
+    EquipmentUtilization,
+    EventPhoto,
+)
+
+VOLUMES = {
+    'employees': 5,
+    'customers': 3,
+    'venues': 2,
+    'equipment': 30,
+    'events': 4,
+    'devices_per_event': 10,
+}
+
+
+class BenchmarkTests(TestCase):
+    """Test benchmark seeding and timing"""
+
+    def setUp(self):
+        benchmark.seed(VOLUMES, seed=1)
+
+
+    def test_seed(self):
+        '''Test seeding creates consistent data'''
+        self.assertEqual(Equipment.objects.count(), 30)
+        self.assertEqual(Event.objects.count(), 4)
+        self.assertEqual(Event.equipment.through.objects.count(), 40)
+        self.assertEqual(
+            Equipment.objects.values('uid').distinct().count(), 30
+        )
+        self.assertTrue(EquipmentUtilization.objects.exists())
+        self.assertEqual(
+            EquipmentStatus.objects.count(),
+            Equipment.objects.filter(event__isnull=False).distinct().count(),
+        )
+        self.assertEqual(
+            EventPhoto.objects.count(), 4 * benchmark.PHOTOS_PER_EVENT,
+        )
+
+
+    def test_read_cases(self):
+        '''Test every read case finds its rows'''
+        user = Event.objects.first().leader
+        user.role = 'sales'
+        user.save()
+        cases = [
+            name for name, method, _, _ in benchmark.benchmark_cases()
+            if method == 'get'
+        ]
+
+        results = benchmark.run_benchmarks(user, iterations=1, only=cases)
+
+        self.assertEqual(
+            {name: result['status'] for name, result in results.items()},
+            dict.fromkeys(cases, 200),
+        )
+
+
+    def test_run_benchmarks(self):
+        '''Test timing requests and writing the results'''
+        user = Event.objects.first().leader
+        user.role = 'sales'
+        user.save()
+
+        results = benchmark.run_benchmarks(
+            user, iterations=2, only=['event-list', 'event-create']
+        )
+
+        self.assertEqual(set(results), {'event-list', 'event-create'})
+        self.assertEqual(results['event-list']['status'], 200)
+        self.assertEqual(results['event-create']['status'], 201)
+        self.assertGreater(results['event-list']['queries'], 0)
+        self.assertEqual(Event.objects.count(), 4)
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            benchmark.write_results(output.name, results, {'revision': None})
+            with open(output.name) as written_file:
+                written = json.load(written_file)
+        self.assertEqual(written['results'], results)
@@ -0,0 +1,226 @@
+"""
+Test change notifications and the server-sent events stream.
+"""
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+from django.core.asgi import get_asgi_application
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.broadcast import RESYNC, LocalBroker, get_broker
+from core.models import Event
+from tests.factories import DataFactory, create_employees
+
+STREAM_URL = reverse('stream')
+
+
+class LocalBrokerTests(TestCase):
+    """Test delivering notifications in process"""
+
+    def test_publish_from_thread(self):
+        '''Test notifications published by worker threads are delivered'''
+        broker = LocalBroker(queue_size=10)
+
+        async def receive():
+            async with broker.subscribe() as subscription:
+                await asyncio.to_thread(broker.publish, {'model': 'event'})
+                return await subscription.get(timeout=1)
+
+        self.assertEqual(asyncio.run(receive()), {'model': 'event'})
+        self.assertEqual(broker.subscriptions, set())
+
+
+    def test_slow_client(self):
+        '''Test a client with a full queue is asked to reload'''
+        broker = LocalBroker(queue_size=2)
+
+        async def receive():
+            async with broker.subscribe() as subscription:
+                for index in range(3):
+                    subscription.deliver({'ids': [index]})
+                return [
+                    await subscription.get(timeout=0.1) for _ in range(2)
+                ]
+
+        self.assertEqual(asyncio.run(receive()), [RESYNC, None])
+
+
+class BroadcastSignalTests(TestCase):
+    """Test model changes are broadcast once committed"""
+
+    def setUp(self):
+        self.factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.data = self.factory.graph(events=1)
+        self.event = self.data['events'][0]
+
+
+    def _published(self, change):
+        with patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+        return [call.args[0] for call in publish.call_args_list]
+
+
+    def test_event_saved(self):
+        self.event.name = 'Renamed'
+
+        self.assertEqual(
+            self._published(self.event.save),
+            [{'model': 'event', 'action': 'updated', 'ids': [self.event.id]}],
+        )
+
+
+    def test_members_changed(self):
+        device = self.factory.equipment(1)[0]
+
+        self.assertEqual(
+            self._published(lambda: self.event.equipment.add(device)),
+            [{'model': 'event', 'action': 'updated', 'ids': [self.event.id]}],
+        )
+
+
+    def test_equipment_deleted(self):
+        device = self.event.equipment.first()
+        device_id = device.id
+
+        published = self._published(device.delete)
+
+        self.assertIn(
+            {'model': 'event', 'action': 'updated', 'ids': [self.event.id]},
+            published,
+        )
+        self.assertIn(
+            {'model': 'equipment', 'action': 'deleted', 'ids': [device_id]},
+            published,
+        )
+
+
+    def test_rolled_back(self):
+        '''Test changes of rolled back transactions aren't broadcast'''
+        event_id = self.event.id
+
+        def change():
+            with transaction.atomic():
+                self.event.delete()
+                transaction.set_rollback(True)
+
+        self.assertEqual(self._published(change), [])
+        self.assertTrue(Event.objects.filter(id=event_id).exists())
+
+
+class StreamTests(TestCase):
+    """Test the server-sent events stream"""
+
+    def setUp(self):
+        employee, = create_employees({
+            'username': 'tech',
+            'first_name': 'Tech',
+            'fathers_name': 'Employee',
+            'email': 'tech@example.com',
+            'role': 'tech',
+        })
+        self.token = Token.objects.create(user=employee)
+
+
+    async def _read(self, response, count):
+        return [
+            (await anext(response.streaming_content)).decode()
+            for _ in range(count)
+        ]
+
+
+    async def test_stream(self):
+        '''Test notifications of the selected models are streamed'''
+        response = await AsyncClient().get(
+            STREAM_URL,
+            {'models': 'event'},
+            AUTHORIZATION=f'Token {self.token.key}',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        retry, = await self._read(response, 1)
+        self.assertTrue(retry.startswith('retry:'))
+
+        message = {'model': 'event', 'action': 'created', 'ids': [1]}
+        get_broker().publish({'model': 'equipment', 'ids': [2]})
+        get_broker().publish(message)
+        data, = await self._read(response, 1)
+        self.assertEqual(data, f'data: {json.dumps(message)}\n\n')
+        await response.streaming_content.aclose()
+
+
+    @override_settings(BROADCAST_HEARTBEAT_SECONDS=0.01)
+    async def test_keepalive(self):
+        '''Test idle streams send comments'''
+        response = await AsyncClient().get(
+            STREAM_URL, {'token': self.token.key},
+        )
+
+        self.assertEqual(
+            await self._read(response, 2),
+            ['retry: 5000\n\n', ': keepalive\n\n'],
+        )
+        await response.streaming_content.aclose()
+
+
+    @override_settings(BROADCAST_STREAM_SECONDS=0.05)
+    async def test_client_disconnected(self):
+        '''Test streams of clients gone away end and unsubscribe'''
+        requests = [{'type': 'http.request', 'body': b''}]
+        sent = []
+
+        async def receive():
+            # The client hangs up once the request is sent
+            return requests.pop() if requests else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': STREAM_URL,
+            'query_string': f'token={self.token.key}'.encode(),
+            'headers': [],
+            'server': ('testserver', 80),
+        }
+        # Like the test client, keep the connection of the test transaction
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            await asyncio.wait_for(
+                get_asgi_application()(scope, receive, send), timeout=5,
+            )
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertFalse(sent[-1].get('more_body', False))
+        self.assertEqual(get_broker().subscriptions, set())
+
+
+    async def test_auth_required(self):
+        response = await AsyncClient().get(STREAM_URL, {'token': 'invalid'})
+
+        self.assertEqual(response.status_code, 401)
+
+
+    def test_asgi_required(self):
+        self.client.force_login(self.token.user)
+        response = self.client.get(STREAM_URL)
+
+        self.assertEqual(response.status_code, 501)
@@ -0,0 +1,73 @@
+"""
+Test the bulk data factories.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import (
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentType,
+    Event,
+)
+from tests.factories import DataFactory, create_employees
+
+
+class DataFactoryTests(TestCase):
+    """Test creating data in bulk"""
+
+    def test_create_employees(self):
+        '''Test employees are created in one query with a usable password'''
+        with CaptureQueriesContext(connection) as captured:
+            employees = create_employees(
+                {'username': 'a', 'email': 'a@example.com', 'role': 'tech'},
+                {'username': 'b', 'email': 'b@example.com', 'role': 'sales',
+                 'password': 'other123'},
+            )
+
+        self.assertEqual(len(captured), 1)
+        self.assertTrue(employees[0].check_password('test123'))
+        self.assertTrue(
+            get_user_model().objects.get(username='b').check_password('other123')
+        )
+
+
+    def test_graph_is_deterministic(self):
+        '''Test the same seed produces the same events'''
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        def snapshot():
+            return list(Event.objects.order_by('id').values_list(
+                'load_in_date', 'load_out_date', 'customer__name',
+                'venue__name', 'leader__username',
+            ))
+
+        DataFactory(seed=3, now=now).graph()
+        first = snapshot()
+        for model in (Event, Equipment, EquipmentType, EquipmentBrand,
+                      EquipmentModel, get_user_model()):
+            model.objects.all().delete()
+        DataFactory(seed=3, now=now).graph()
+
+        self.assertEqual(snapshot(), first)
+        self.assertEqual(Event.objects.count(), 4)
+
+
+    def test_equipment_numbering_continues(self):
+        '''Test devices are numbered after the existing ones of a model'''
+        factory = DataFactory()
+        catalog = factory.catalog(types=1, brands=1, models=1)
+        factory.equipment(3, catalog)
+        factory.equipment(2, catalog)
+
+        self.assertEqual(
+            list(Equipment.objects.order_by('number').values_list(
+                'number', flat=True
+            )),
+            [1, 2, 3, 4, 5],
+        )
+        self.assertEqual(Equipment.objects.values('uid').distinct().count(), 5)
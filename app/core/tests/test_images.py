@@ -0,0 +1,99 @@
+"""
+Test the validation and normalization of uploaded photos.
+"""
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image, ImageFile
+from PIL.JpegImagePlugin import JpegImageFile
+
+from core.images import InvalidPhoto, normalize_photo, open_photo
+
+
+def upload(size=(200, 100), format='JPEG', name='photo.jpg', **params):
+    '''Return an uploaded image file.'''
+    buffer = BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, format, **params)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(PHOTO_MAX_DIMENSION=64, PHOTO_MAX_PIXELS=1_000_000)
+class PhotoTests(SimpleTestCase):
+    """Test checking and re-encoding uploaded photos"""
+
+    def _open(self, file):
+        return Image.open(BytesIO(file.read()))
+
+
+    def test_scaled_down(self):
+        '''Test photos are scaled down to fit the maximum dimension'''
+        photo = normalize_photo(upload((300, 150)))
+
+        self.assertEqual(photo.name, 'photo.jpg')
+        image = self._open(photo)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (64, 32))
+
+
+    def test_jpeg_draft(self):
+        '''Test JPEGs are decoded at a reduced scale'''
+        draft = JpegImageFile.draft
+        sizes = []
+
+        def record(image, mode, size):
+            result = draft(image, mode, size)
+            sizes.append(image.size)
+            return result
+
+        with patch.object(JpegImageFile, 'draft', record):
+            photo = normalize_photo(upload((1000, 1000)))
+
+        self.assertEqual(sizes[0], (125, 125))
+        self.assertEqual(self._open(photo).size, (64, 64))
+
+
+    def test_exif_orientation(self):
+        '''Test the EXIF orientation is applied and the metadata removed'''
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees
+        exif[0x010f] = 'Camera'
+
+        photo = normalize_photo(upload((40, 20), exif=exif.tobytes()))
+
+        image = self._open(photo)
+        self.assertEqual(image.size, (20, 40))
+        self.assertNotIn('exif', image.info)
+        self.assertEqual(dict(image.getexif()), {})
+
+
+    def test_gif_stored_as_png(self):
+        photo = normalize_photo(upload((10, 10), 'GIF', 'photo.gif'))
+
+        self.assertEqual(photo.name, 'photo.png')
+        self.assertEqual(self._open(photo).format, 'PNG')
+
+
+    @override_settings(PHOTO_MAX_BYTES=100)
+    def test_too_many_bytes(self):
+        with self.assertRaisesMessage(InvalidPhoto, '100 bytes'):
+            normalize_photo(upload((50, 50)))
+
+
+    def test_too_many_pixels(self):
+        '''Test oversized photos are rejected without decoding them'''
+        with patch.object(ImageFile.ImageFile, 'load') as load:
+            with self.assertRaisesMessage(InvalidPhoto, 'pixels'):
+                open_photo(upload((1000, 1001)))
+
+        load.assert_not_called()
+
+
+    def test_invalid_image(self):
+        for file in [
+            SimpleUploadedFile('photo.jpg', b'not an image'),
+            upload((10, 10), 'BMP', 'photo.bmp'),
+        ]:
+            with self.assertRaises(InvalidPhoto):
+                normalize_photo(file)
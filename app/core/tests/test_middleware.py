@@ -0,0 +1,76 @@
+"""
+Test the request performance metrics.
+"""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core import metrics
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests
+
+
+class PerformanceMiddlewareTests(PrivateAPITests, TestCase):
+    """Test measuring requests"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.clear_metrics()
+        DataFactory().graph()
+
+
+    def test_server_timing_header(self):
+        '''Test responses report their timings'''
+        res = self._http_request('get', 'sales', url=reverse('event:event-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timings = dict(
+            entry.strip().split(';', 1)[0:2]
+            for entry in res['Server-Timing'].split(',')
+        )
+        self.assertEqual(
+            set(timings), {'total', 'db', 'serialize', 'render'}
+        )
+        self.assertIn('queries"', timings['db'])
+        self.assertNotEqual(timings['serialize'], 'dur=0.0')
+
+
+    def test_metrics_per_route(self):
+        '''Test requests are aggregated by route name'''
+        url = reverse('event:event-list')
+        self._http_request('get', 'sales', url=url)
+        self._http_request('get', 'sales', url=url)
+
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        content = res.content.decode()
+        self.assertIn(
+            'http_requests_total{route="event:event-list",method="GET",'
+            'status="200"} 2',
+            content,
+        )
+        self.assertIn(
+            'http_request_db_queries_count{route="event:event-list",'
+            'method="GET"} 2',
+            content,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="event:event-list",'
+            'method="GET",le="+Inf"} 2',
+            content,
+        )
+        self.assertIn('# TYPE http_response_size_bytes histogram', content)
+
+
+    def test_metrics_restricted(self):
+        '''Test only allowed addresses and staff can read the metrics'''
+        res = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.admin_employee.is_staff = True
+        self.admin_employee.save()
+        self.client.force_login(self.admin_employee)
+        res = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -2,7 +2,9 @@
 Test for Models
 """
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from core import models
 from datetime import datetime
@@ -238,6 +240,118 @@ class ModelTest(TestCase):
         self.assertNotEqual(saved_equipment_two.uid, saved_equipment_one.uid)
 
 
+    def _catalog(self):
+        return (
+            models.EquipmentType.objects.create(name="Microphone"),
+            models.EquipmentBrand.objects.create(name="Shure"),
+            models.EquipmentModel.objects.create(name="QLXD"),
+        )
+
+
+    def test_equipment_uid_from_ids(self):
+        """Test the uid is built from the ids without fetching the catalog"""
+        equipment_type, equipment_brand, equipment_model = self._catalog()
+        equipment = models.Equipment(
+            type_id=equipment_type.id,
+            brand_id=equipment_brand.id,
+            model_id=equipment_model.id,
+            number=7,
+        )
+
+        with CaptureQueriesContext(connection) as captured:
+            equipment.save()
+
+        self.assertEqual(
+            equipment.uid,
+            f"{equipment_model.id:02}{equipment_brand.id:02}"
+            f"{equipment_type.id:02}-7",
+        )
+        self.assertFalse([
+            query for query in captured
+            if query['sql'].startswith('SELECT')
+        ])
+
+
+    def test_equipment_uid_changes(self):
+        """Test the uid is only built again when its fields change"""
+        equipment_type, equipment_brand, equipment_model = self._catalog()
+        models.Equipment.objects.create(
+            type=equipment_type,
+            brand=equipment_brand,
+            model=equipment_model,
+            number=1,
+        )
+        equipment = models.Equipment.objects.get()
+
+        with patch.object(
+            models.Equipment, 'build_uid', autospec=True,
+        ) as build_uid:
+            equipment.serial_number = "A1234BW2"
+            equipment.save()
+        build_uid.assert_not_called()
+
+        equipment.number = 2
+        equipment.save(update_fields=['number'])
+        equipment.refresh_from_db()
+        self.assertTrue(equipment.uid.endswith('-2'))
+
+
+    def test_equipment_bulk_uids(self):
+        """Test bulk_create and bulk_update build the uids"""
+        equipment_type, equipment_brand, equipment_model = self._catalog()
+        created = models.Equipment.objects.bulk_create([
+            models.Equipment(
+                type=equipment_type,
+                brand=equipment_brand,
+                model=equipment_model,
+                number=number,
+            )
+            for number in (1, 2)
+        ])
+        self.assertEqual(
+            [equipment.uid[-2:] for equipment in created], ['-1', '-2'],
+        )
+
+        for equipment in created:
+            equipment.number += 10
+        models.Equipment.objects.bulk_update(created, ['number'])
+
+        self.assertEqual(
+            sorted(models.Equipment.objects.values_list('uid', flat=True)),
+            [equipment.uid for equipment in created],
+        )
+        self.assertTrue(created[0].uid.endswith('-11'))
+        self.assertEqual(
+            models.Equipment.objects.get(id=created[0].id).updated_at,
+            created[0].updated_at,
+        )
+
+
+    def test_equipment_uid_unsaved_fields(self):
+        """Test the uid only follows the uid fields being saved"""
+        equipment_type, equipment_brand, equipment_model = self._catalog()
+        equipment = models.Equipment.objects.create(
+            type=equipment_type,
+            brand=equipment_brand,
+            model=equipment_model,
+            number=1,
+        )
+        updated_at = equipment.updated_at
+
+        equipment.number = 2
+        equipment.serial_number = "A1234BW2"
+        equipment.save(update_fields=['serial_number'])
+        saved = models.Equipment.objects.get()
+        self.assertTrue(saved.uid.endswith('-1'))
+        self.assertEqual(saved.number, 1)
+
+        # The unsaved number still counts as changed
+        equipment.save(update_fields=['number'])
+        saved.refresh_from_db()
+        self.assertTrue(saved.uid.endswith('-2'))
+        self.assertGreater(saved.updated_at, updated_at)
+
+
     def test_create_event(self):
         """Test creating a event is sucessful"""
         user_one = create_employee()
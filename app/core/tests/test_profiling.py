@@ -0,0 +1,87 @@
+"""
+Test the sampling profiler.
+"""
+import tempfile
+import threading
+import time
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core.profiling import StackSampler, available_profiles, save_stacks
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class ProfilingTests(PrivateAPITests, TestCase):
+    """Test profiling a sample of the requests"""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.admin_employee.is_staff = True
+        self.admin_employee.save()
+
+
+    def test_stack_sampler(self):
+        '''Test sampling the stack of a thread'''
+        with StackSampler(threading.get_ident(), 0.001) as sampler:
+            busy_wait(0.05)
+
+        self.assertGreater(sum(sampler.stacks.values()), 0)
+        stack = next(iter(sampler.stacks))
+        self.assertIn('busy_wait (core/tests/test_profiling.py:', stack)
+
+
+    def test_sampled_route_profiled(self):
+        '''Test requests of a sampled route are profiled'''
+        DataFactory().graph(events=30)
+
+        with override_settings(
+            PROFILING_SAMPLE_RATES={'event:event-list': 1.0},
+            PROFILING_INTERVAL_MS=0.5,
+            PROFILING_DIR=self.directory.name,
+        ):
+            self.client.force_authenticate(self.sales_employee)
+            self.client.get(reverse('venue:venue-list'))
+            res = self.client.get(reverse('event:event-list'))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+            self.assertEqual(available_profiles(), ['event_event-list'])
+
+
+    def test_download_profile(self):
+        '''Test staff download the merged stacks of a route'''
+        with override_settings(PROFILING_DIR=self.directory.name):
+            save_stacks('event:event-list', {'a;b': 2, 'a;c': 1})
+            save_stacks('event:event-list', {'a;b': 3})
+
+            res = self._http_request(
+                'get', 'admin', url=reverse('profile-list')
+            )
+            self.assertEqual(res.data, {'profiles': ['event_event-list']})
+
+            res = self._http_request('get', 'admin', url=reverse(
+                'profile-download', args=['event_event-list']
+            ))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content.decode(), 'a;b 5\na;c 1\n')
+
+            res = self._http_request('get', 'admin', url=reverse(
+                'profile-download', args=['missing']
+            ))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_download_profile_staff_only(self):
+        '''Test employees who aren't staff can't read the profiles'''
+        res = self._http_request('get', 'sales', url=reverse('profile-list'))
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
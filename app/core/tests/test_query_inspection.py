@@ -0,0 +1,79 @@
+"""
+Test the N+1 and slow query detection.
+"""
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.middleware import QueryInspectionMiddleware
+from core.models import Venue
+from core.querylog import fingerprint
+from tests.factories import DataFactory
+
+
+def list_venues_one_by_one(request):
+    for venue_id in Venue.objects.values_list('id', flat=True):
+        Venue.objects.get(id=venue_id)
+    return HttpResponse()
+
+
+@override_settings(
+    QUERY_INSPECTION=True,
+    QUERY_INSPECTION_REPEAT_THRESHOLD=3,
+    SLOW_QUERY_THRESHOLD_MS=10000,
+)
+class QueryInspectionTests(TestCase):
+    """Test logging repeated and slow queries"""
+
+    def setUp(self):
+        DataFactory().venues(4)
+        self.request = RequestFactory().get('/api/venue/venue/')
+
+
+    def test_fingerprint(self):
+        '''Test queries differing only by their parameters match'''
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s) AND x = 3'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s) AND x = 14'),
+        )
+        self.assertNotEqual(
+            fingerprint('SELECT * FROM t WHERE id = %s'),
+            fingerprint('SELECT * FROM t WHERE name = %s'),
+        )
+
+
+    def test_repeated_queries_logged(self):
+        '''Test N+1 queries are logged with the code running them'''
+        middleware = QueryInspectionMiddleware(list_venues_one_by_one)
+
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            middleware(self.request)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('N+1: GET /api/venue/venue/ ran 4 times', logs.output[0])
+        self.assertIn(
+            'core/tests/test_query_inspection.py', logs.output[0]
+        )
+        self.assertIn('list_venues_one_by_one', logs.output[0])
+
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_explained(self):
+        '''Test slow queries are logged with their plan'''
+        middleware = QueryInspectionMiddleware(
+            lambda request: HttpResponse(Venue.objects.count())
+        )
+
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            middleware(self.request)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Slow query', logs.output[0])
+        self.assertIn('Aggregate', logs.output[0])
+
+
+    @override_settings(QUERY_INSPECTION=False)
+    def test_disabled(self):
+        '''Test the middleware isn't loaded when disabled'''
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryInspectionMiddleware(list_venues_one_by_one)
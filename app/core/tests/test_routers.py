@@ -0,0 +1,218 @@
+"""
+Test routing reads to the database replicas.
+"""
+import unittest
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.middleware import PRIMARY_PIN_COOKIE, ReplicaMiddleware
+from core.models import Event, Venue
+from core.routers import primary_reads, replica_reads
+from tests.factories import create_employees
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the database of reads and writes"""
+
+    def test_outside_requests(self):
+        '''Test reads outside replica blocks use the primary'''
+        self.assertEqual(router.db_for_read(Event), 'default')
+
+
+    def test_replica_reads(self):
+        with replica_reads() as routing:
+            self.assertEqual(router.db_for_read(Event), 'replica1')
+            self.assertEqual(router.db_for_write(Event), 'default')
+            self.assertEqual(router.db_for_read(Event), 'default')
+
+        self.assertTrue(routing.wrote)
+
+
+    def test_primary_reads(self):
+        with replica_reads(use_replicas=False) as routing:
+            self.assertEqual(router.db_for_read(Event), 'default')
+
+        self.assertFalse(routing.wrote)
+
+
+    def test_primary_block(self):
+        '''Test primary blocks read from the primary until they end'''
+        with replica_reads():
+            with primary_reads():
+                self.assertEqual(router.db_for_read(Event), 'default')
+            self.assertEqual(router.db_for_read(Event), 'replica1')
+
+            with primary_reads():
+                router.db_for_write(Event)
+            self.assertEqual(router.db_for_read(Event), 'default')
+
+
+    def test_cache_on_primary(self):
+        '''Test the database cache neither uses replicas nor pins writes'''
+        model = cache.cache_model_class
+
+        with replica_reads() as routing:
+            self.assertEqual(router.db_for_read(model), 'default')
+            router.db_for_write(model)
+
+        self.assertFalse(routing.wrote)
+
+
+    def test_migrations(self):
+        self.assertFalse(router.allow_migrate('replica1', 'core'))
+        self.assertTrue(router.allow_migrate('default', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaTransactionTests(TestCase):
+    """Test reads inside transactions"""
+
+    def test_transaction_on_primary(self):
+        '''Test replicas can't be read while a transaction is open'''
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Event), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=5)
+class ReplicaMiddlewareTests(SimpleTestCase):
+    """Test safe requests read from the replicas"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+
+    def _request(self, request, write=False):
+        databases = []
+
+        def view(request):
+            databases.append(router.db_for_read(Event))
+            if write:
+                router.db_for_write(Event)
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return databases[0], response.cookies.get(PRIMARY_PIN_COOKIE)
+
+
+    def test_safe_request(self):
+        database, cookie = self._request(self.factory.get('/'))
+
+        self.assertEqual(database, 'replica1')
+        self.assertIsNone(cookie)
+
+
+    def test_unsafe_request(self):
+        '''Test writes pin the next requests to the primary'''
+        database, cookie = self._request(self.factory.post('/'))
+
+        self.assertEqual(database, 'default')
+        self.assertEqual(cookie['max-age'], 5)
+
+
+    def test_writing_safe_request(self):
+        database, cookie = self._request(self.factory.get('/'), write=True)
+
+        self.assertEqual(database, 'replica1')
+        self.assertIsNotNone(cookie)
+
+
+    def test_pinned_client(self):
+        request = self.factory.get('/')
+        request.COOKIES[PRIMARY_PIN_COOKIE] = '1'
+
+        database, _ = self._request(request)
+
+        self.assertEqual(database, 'default')
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class NoReplicaTests(SimpleTestCase):
+    """Test running without replicas"""
+
+    def test_middleware_not_used(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaMiddleware(lambda request: HttpResponse())
+
+
+@unittest.skipUnless(settings.DATABASE_REPLICAS, 'DB_REPLICA_HOSTS not set')
+class ReplicaAPITests(TransactionTestCase):
+    """Test API requests against the replicas of DB_REPLICA_HOSTS"""
+    databases = {'default', *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        employee, = create_employees({
+            'username': 'sales',
+            'first_name': 'Sales',
+            'fathers_name': 'Employee',
+            'email': 'sales@example.com',
+            'role': 'sales',
+        })
+        token = Token.objects.create(user=employee)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+
+
+    def _replica_queries(self, request):
+        with ExitStack() as stack:
+            captured = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in settings.DATABASE_REPLICAS
+            ]
+            response = request()
+        return response, [
+            query['sql'] for queries in captured for query in queries
+        ]
+
+
+    def test_read_your_writes(self):
+        '''Test reads use a replica until the client writes'''
+        url = reverse('venue:venue-list')
+
+        response, queries = self._replica_queries(lambda: self.client.get(url))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries)
+
+        response = self.client.post(url, {
+            'name': 'Hall', 'address': 'Foo #1', 'city': 'Barr', 'state': 'Ham',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+        response, queries = self._replica_queries(lambda: self.client.get(url))
+        self.assertEqual(queries, [])
+        self.assertEqual(len(response.data), 1)
+
+
+    def test_primary_views(self):
+        '''Test sync pages and cached statistics are read from the primary'''
+        venue = Venue.objects.create(
+            name='Hall', address='Foo #1', city='Barr', state='Ham',
+        )
+
+        for url in [
+            reverse('sync:sync'),
+            reverse('venue:venue-stats', args=[venue.id]),
+        ]:
+            response, queries = self._replica_queries(
+                lambda: self.client.get(url)
+            )
+            self.assertEqual(response.status_code, 200)
+            # Only the authentication reads from the replica
+            self.assertFalse([
+                sql for sql in queries if 'core_venue' in sql
+            ])
@@ -0,0 +1,75 @@
+"""
+Test the S3 media storage.
+
+Needs an S3 compatible service, like the MinIO service of docker-compose:
+set S3_TEST_BUCKET to an existing bucket, plus S3_ENDPOINT_URL and the
+S3_ACCESS_KEY and S3_SECRET_KEY settings.
+"""
+import os
+import unittest
+import uuid
+from urllib.request import Request, urlopen
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from core import storage
+from core.storage import S3Storage, direct_upload, load_upload
+
+S3_TEST_BUCKET = os.environ.get('S3_TEST_BUCKET')
+
+
+@unittest.skipUnless(
+    S3_TEST_BUCKET and storage.boto3, 'S3_TEST_BUCKET and boto3 needed',
+)
+class S3StorageTests(SimpleTestCase):
+    """Test storing files in an S3 bucket"""
+
+    def setUp(self):
+        self.storage = S3Storage(bucket=S3_TEST_BUCKET)
+        self.name = f'tests/{uuid.uuid4()}.txt'
+        self.addCleanup(self.storage.delete, self.name)
+
+
+    def test_save_and_open(self):
+        name = self.storage.save(self.name, ContentFile(b'rider'))
+
+        self.assertEqual(name, self.name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 5)
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'rider')
+        with urlopen(self.storage.url(name)) as response:
+            self.assertEqual(response.read(), b'rider')
+
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+
+
+    @override_settings(S3_MULTIPART_THRESHOLD=5 * 1024 * 1024)
+    def test_multipart_upload(self):
+        content = os.urandom(11 * 1024 * 1024)
+
+        self.storage.save(self.name, ContentFile(content))
+
+        with self.storage.open(self.name) as file:
+            self.assertEqual(file.read(), content)
+
+
+    def test_direct_upload(self):
+        '''Test uploading with the presigned request'''
+        upload = direct_upload(
+            self.storage, self.name, 'text/plain', 5, event=1,
+        )
+        self.assertEqual(load_upload(upload['upload'])['name'], self.name)
+
+        request = Request(
+            upload['url'],
+            data=b'rider',
+            headers=upload['headers'],
+            method=upload['method'],
+        )
+        with urlopen(request):
+            pass
+
+        self.assertEqual(self.storage.size(self.name), 5)
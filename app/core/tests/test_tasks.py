@@ -0,0 +1,212 @@
+"""
+Test the background task backends and worker.
+"""
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import QueuedTask
+from core.tasks import (
+    REGISTRY,
+    claim_tasks,
+    execute,
+    get_backend,
+    task,
+)
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(retries=1, retry_delay=60)
+def fail(message):
+    raise ValueError(message)
+
+
+class TaskBackendTests(TestCase):
+    """Test running tasks through every backend"""
+
+    def setUp(self):
+        calls.clear()
+
+
+    def test_register(self):
+        '''Test tasks are registered by dotted path'''
+        self.assertIs(REGISTRY[f'{__name__}.record'], record)
+        self.assertEqual(fail.retries, 1)
+        record('direct')
+        self.assertEqual(calls, ['direct'])
+
+
+    @override_settings(TASKS_BACKEND='immediate')
+    def test_immediate(self):
+        record.delay('now')
+
+        self.assertEqual(calls, ['now'])
+
+
+    @override_settings(TASKS_BACKEND='thread')
+    def test_thread(self):
+        '''Test threads run tasks once the transaction commits'''
+        done = threading.Event()
+
+        @task
+        def notify(value):
+            calls.append(value)
+            done.set()
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            notify.delay('later')
+        self.assertEqual(calls, [])
+
+        callbacks[0]()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(calls, ['later'])
+
+
+    @override_settings(TASKS_BACKEND='database')
+    def test_database(self):
+        '''Test tasks are queued and run by the worker functions'''
+        record.delay('queued')
+
+        queued, = QueuedTask.objects.all()
+        self.assertEqual(queued.name, f'{__name__}.record')
+        self.assertEqual(queued.args, ['queued'])
+        self.assertEqual(calls, [])
+
+        claimed, = claim_tasks(10)
+        self.assertEqual(claimed.status, 'running')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(claim_tasks(10), [])
+
+        self.assertTrue(execute(claimed))
+        self.assertEqual(calls, ['queued'])
+        self.assertFalse(QueuedTask.objects.exists())
+
+
+    @override_settings(TASKS_BACKEND='database')
+    def test_retries(self):
+        '''Test failed tasks are retried later, then marked failed'''
+        fail.delay('boom')
+
+        claimed, = claim_tasks(1)
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertFalse(execute(claimed))
+        queued = QueuedTask.objects.get()
+        self.assertEqual(queued.status, 'queued')
+        self.assertGreater(
+            queued.run_at, timezone.now() + timedelta(seconds=50),
+        )
+        self.assertIn('ValueError: boom', queued.last_error)
+        self.assertEqual(claim_tasks(1), [])
+
+        queued.run_at = timezone.now()
+        queued.save()
+        claimed, = claim_tasks(1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertFalse(execute(claimed))
+        self.assertEqual(QueuedTask.objects.get().status, 'failed')
+
+
+    def test_expired_lease(self):
+        '''Test tasks of dead workers are claimed again'''
+        QueuedTask.objects.create(
+            name=record.name,
+            args=['retry'],
+            status='running',
+            attempts=1,
+            max_attempts=2,
+            run_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        claimed, = claim_tasks(1)
+        self.assertEqual(claimed.attempts, 2)
+
+
+    def test_expired_last_attempt(self):
+        '''Test tasks whose last attempt outlived its lease are failed'''
+        queued = QueuedTask.objects.create(
+            name=record.name,
+            args=['stuck'],
+            status='running',
+            attempts=1,
+            run_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.assertEqual(claim_tasks(1), [])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+        self.assertEqual(queued.attempts, 1)
+
+
+    def test_unknown_task(self):
+        queued = QueuedTask.objects.create(name='missing.task', max_attempts=3)
+
+        claimed, = claim_tasks(1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertFalse(execute(claimed))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+
+
+    @override_settings(TASKS_BACKEND='celery')
+    def test_invalid_backend(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_backend()
+
+
+@override_settings(TASKS_BACKEND='database')
+class RunTasksCommandTests(TransactionTestCase):
+    """Test the worker command"""
+
+    def setUp(self):
+        calls.clear()
+
+
+    def test_run_tasks(self):
+        for value in range(5):
+            record.delay(value)
+        fail.delay('boom')
+
+        out = StringIO()
+        with self.assertLogs('core.tasks', 'WARNING'):
+            call_command(
+                'run_tasks', '--once', '--concurrency', '2', stdout=out,
+            )
+
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertEqual(QueuedTask.objects.get().status, 'queued')
+        self.assertIn(f'{fail.name}: failed', out.getvalue())
+
+
+    def test_slots_refilled(self):
+        '''Test tasks start as soon as a slot frees up'''
+        release = threading.Event()
+
+        @task
+        def wait_release():
+            calls.append(release.wait(5))
+
+        @task
+        def set_release():
+            release.set()
+
+        wait_release.delay()
+        record.delay('quick')
+        # Only starts once the quick task is done, the slow task waits for it
+        set_release.delay()
+
+        call_command(
+            'run_tasks', '--once', '--concurrency', '2', stdout=StringIO(),
+        )
+
+        self.assertEqual(calls, ['quick', True])
@@ -0,0 +1,145 @@
+'''
+Pre-aggregated equipment utilization.
+
+`EquipmentUtilization` keeps the hours each device was booked per month. A
+device is booked from the load-in to the load-out of every event it belongs
+to. The table is refreshed incrementally for the devices and months touched
+by an event change (see `core.signals`).
+'''
+
+import calendar
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest, Least
+
+from core.models import Event, EquipmentUtilization
+from core.tasks import task
+
+
+def month_start(value):
+    '''Return the first day of the month of a date or datetime.'''
+    return date(value.year, value.month, 1)
+
+
+def next_month(month):
+    '''Return the first day of the month following `month`.'''
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
+
+
+def month_hours(month):
+    '''Return the number of hours in a month.'''
+    return calendar.monthrange(month.year, month.month)[1] * 24
+
+
+def months_between(start, end):
+    '''
+    Return the first day of every month touched by the range [start, end].
+    '''
+    if start is None or end is None:
+        return []
+
+    start = start.astimezone(dt_timezone.utc)
+    end = end.astimezone(dt_timezone.utc)
+    months = []
+    month = month_start(start)
+    while month <= end.date():
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def _as_datetime(month):
+    return datetime.combine(month, time.min, tzinfo=dt_timezone.utc)
+
+
+def booked_hours(month, equipment_ids=None):
+    '''
+    Aggregate the booked hours of every device during a month.
+
+    Parameters
+    ----------
+    month : date
+        First day of the month.
+    equipment_ids : iterable, optional
+        Restrict the aggregation to these devices. All devices by default.
+
+    Returns
+    -------
+    dict
+        Booked hours by equipment id. Devices without bookings are omitted.
+    '''
+    start = _as_datetime(month)
+    end = _as_datetime(next_month(month))
+
+    bookings = Event.equipment.through.objects.filter(
+        event__load_in_date__lt=end,
+        event__load_out_date__gt=start,
+    )
+    if equipment_ids is not None:
+        bookings = bookings.filter(equipment_id__in=equipment_ids)
+
+    totals = bookings.values('equipment_id').annotate(
+        booked=Sum(
+            Least(F('event__load_out_date'), Value(end))
+            - Greatest(F('event__load_in_date'), Value(start))
+        ),
+    )
+
+    return {
+        row['equipment_id']: row['booked'].total_seconds() / 3600
+        for row in totals
+    }
+
+
+def refresh_utilization(months, equipment_ids=None):
+    '''
+    Recompute the utilization rows of the given months and devices.
+
+    Parameters
+    ----------
+    months : iterable
+        First day of every month to refresh.
+    equipment_ids : iterable, optional
+        Devices to refresh. All devices by default.
+    '''
+    if equipment_ids is not None:
+        equipment_ids = set(equipment_ids)
+        if not equipment_ids:
+            return
+
+    for month in sorted(set(months)):
+        hours = booked_hours(month, equipment_ids)
+
+        with transaction.atomic():
+            stale = EquipmentUtilization.objects.filter(month=month)
+            if equipment_ids is not None:
+                stale = stale.filter(equipment_id__in=equipment_ids)
+            stale.exclude(equipment_id__in=hours.keys()).delete()
+
+            EquipmentUtilization.objects.bulk_create(
+                [
+                    EquipmentUtilization(
+                        equipment_id=equipment_id,
+                        month=month,
+                        booked_hours=booked,
+                    )
+                    for equipment_id, booked in hours.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['equipment', 'month'],
+                update_fields=['booked_hours'],
+            )
+
+
+@task(retries=3)
+def refresh_utilization_later(months, equipment_ids=None):
+    '''
+    Task refreshing the utilization, with the months as ISO dates.
+    '''
+    refresh_utilization(
+        [date.fromisoformat(month) for month in months], equipment_ids,
+    )
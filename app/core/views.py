@@ -0,0 +1,148 @@
+'''
+Views shared by the whole project.
+'''
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.broadcast import get_broker
+from core.metrics import render_metrics
+from core.profiling import available_profiles, load_stacks, profile_path
+
+
+def metrics(request):
+    """
+    Export the request metrics in the Prometheus text format.
+
+    Only staff and the addresses in `METRICS_ALLOWED_IPS` can read them.
+    """
+    allowed = (
+        request.user.is_staff
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+class ProfileListView(APIView):
+    """List the routes with a sampling profile"""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'profiles': available_profiles()})
+
+
+class ProfileDownloadView(APIView):
+    """Download the collapsed stacks of a route, for flame graph tools"""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        if name not in available_profiles():
+            raise Http404
+
+        stacks = load_stacks(profile_path(name))
+        response = HttpResponse(
+            ''.join(
+                f'{stack} {count}\n' for stack, count in sorted(stacks.items())
+            ),
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{name}.collapsed"'
+        )
+        return response
+
+
+async def _stream_user(request):
+    '''Return the active user of a token or session, or None.'''
+    key = request.GET.get('token')
+    authorization = request.headers.get('Authorization', '').split()
+    if len(authorization) == 2 and authorization[0] == 'Token':
+        key = authorization[1]
+
+    if key:
+        token = await Token.objects.select_related('user').filter(
+            key=key, user__is_active=True,
+        ).afirst()
+        return token.user if token else None
+
+    def session_user():
+        return request.user if request.user.is_authenticated else None
+
+    return await sync_to_async(session_user)()
+
+
+async def _notifications(models):
+    '''
+    Yield the notifications of the broker as server-sent events.
+
+    The stream ends after `BROADCAST_STREAM_SECONDS`, and the client
+    reconnects after `BROADCAST_RETRY_MS`. The ASGI handler doesn't tell the
+    view when the client goes away, so this is what frees the subscription
+    of a closed connection.
+    '''
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.BROADCAST_STREAM_SECONDS
+    async with get_broker().subscribe() as subscription:
+        yield f'retry: {settings.BROADCAST_RETRY_MS}\n\n'
+        while (remaining := deadline - loop.time()) > 0:
+            message = await subscription.get(
+                min(settings.BROADCAST_HEARTBEAT_SECONDS, remaining)
+            )
+            if message is None:
+                # Keeps proxies from closing idle connections
+                yield ': keepalive\n\n'
+            elif 'model' not in message or not models or (
+                    message['model'] in models):
+                yield f'data: {json.dumps(message)}\n\n'
+
+
+async def stream(request):
+    """
+    Stream change notifications of events and equipment as server-sent
+    events (see `core.broadcast`).
+
+    `models` filters the notifications by model name, like `models=event`.
+    Clients authenticate with a token header, a `token` query parameter
+    (`EventSource` can't send headers) or a session. The stream needs the
+    ASGI server (`app.asgi`), since it holds the connection open.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            'Streaming needs the ASGI server.',
+            status=501,
+            content_type='text/plain',
+        )
+
+    if await _stream_user(request) is None:
+        return HttpResponse(status=401)
+
+    models = set(filter(None, request.GET.get('models', '').split(',')))
+    response = StreamingHttpResponse(
+        _notifications(models), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
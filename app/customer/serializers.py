@@ -3,12 +3,13 @@ Serializers for customer APIs
 """
 
 from rest_framework import serializers
+from core.metrics import TimedSerializerMixin
 from core.models import Customer
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for client instances."""
 
     class Meta:
         model = Customer
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['id']
@@ -0,0 +1,42 @@
+"""
+Test the query budgets of the customer API.
+"""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+class CustomerQueryBudgetTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test the number of queries run by the customer API"""
+    data_url = 'customer:customer-list'
+    data_detail_url = 'customer:customer-detail'
+
+    def setUp(self):
+        super().setUp()
+        self.factory = DataFactory()
+
+
+    def test_list_queries_constant(self):
+        '''Test listing customers doesn't run a query per customer'''
+        self.assertConstantQueries(
+            reverse(self.data_url), 'tech', self.factory.customers
+        )
+
+
+    def test_list_budget(self):
+        '''Test listing customers stays within its query budget'''
+        self.factory.customers(10)
+        with self.assertQueryBudget('customer:customer-list'):
+            res = self._http_request('get', 'tech')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_retrieve_budget(self):
+        '''Test retrieving a customer stays within its query budget'''
+        customer = self.factory.customers(1)[0]
+        with self.assertQueryBudget('customer:customer-detail'):
+            res = self._http_request('get', 'tech', url=self._detail_url(customer.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
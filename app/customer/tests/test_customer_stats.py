@@ -0,0 +1,131 @@
+"""
+Test for customer statistics API.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import (
+    Customer,
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentType,
+    Event,
+)
+from tests.mixin_tests import PrivateAPITests
+
+
+def stats_url(customer_id):
+    '''Return the statistics url of a customer'''
+    return reverse('customer:customer-stats', args=[customer_id])
+
+
+class PrivateCustomerStatsAPITests(PrivateAPITests, TestCase):
+    """Test authenticated API requests"""
+
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(
+            name="Naomi Nagata",
+            phone="3356748592",
+            email="naomi@example.com",
+            company="Foo Inc."
+        )
+        equipment_model = EquipmentModel.objects.create(name="qlxd")
+        equipment_brand = EquipmentBrand.objects.create(name="shure")
+        equipment_type = EquipmentType.objects.create(name="microphone")
+        self.equipment_list = [
+            Equipment.objects.create(
+                model=equipment_model,
+                brand=equipment_brand,
+                type=equipment_type,
+                number=number,
+            )
+            for number in range(1, 4)
+        ]
+
+
+    def _create_event(self, starts_in, equipment, customer=None):
+        '''Create an event starting `starts_in` from now lasting two days'''
+        start_date = timezone.now() + starts_in
+        event = Event.objects.create(
+            name="Foo Concert",
+            load_in_date=start_date,
+            load_out_date=start_date + timedelta(days=2),
+            start_date=start_date,
+            end_date=start_date + timedelta(days=1),
+            customer=customer or self.customer,
+            comment="",
+        )
+        event.equipment.set(equipment)
+        return event
+
+
+    def test_customer_stats(self):
+        '''Test retrieving the event statistics of a customer'''
+        past = self._create_event(timedelta(days=-10), self.equipment_list)
+        upcoming = self._create_event(
+            timedelta(days=5), self.equipment_list[:1]
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self._http_request(
+                'get', 'sales', url=stats_url(self.customer.id)
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        stats_queries = [
+            q for q in queries if 'cache_table' not in q['sql']
+            and 'SAVEPOINT' not in q['sql']
+        ]
+        self.assertEqual(len(stats_queries), 1)
+        self.assertEqual(res.data['event_count'], 2)
+        self.assertAlmostEqual(res.data['booked_days'], 4)
+        self.assertEqual(res.data['equipment_volume'], 4)
+        self.assertEqual(res.data['last_event']['id'], past.id)
+        self.assertEqual(res.data['next_event']['id'], upcoming.id)
+
+
+    def test_customer_stats_cached(self):
+        '''Test statistics are cached and invalidated when events change'''
+        event = self._create_event(timedelta(days=5), self.equipment_list)
+        url = stats_url(self.customer.id)
+        self._http_request('get', 'sales', url=url)
+
+        with self.assertNumQueries(1):
+            res = self._http_request('get', 'sales', url=url)
+        self.assertEqual(res.data['equipment_volume'], 3)
+
+        event.equipment.remove(self.equipment_list[0])
+        res = self._http_request('get', 'sales', url=url)
+        self.assertEqual(res.data['equipment_volume'], 2)
+
+        other_customer = Customer.objects.create(name="James Holden")
+        event.customer = other_customer
+        event.save()
+        res = self._http_request('get', 'sales', url=url)
+        self.assertEqual(res.data['event_count'], 0)
+        self.assertIsNone(res.data['next_event'])
+
+
+    def test_customer_without_events(self):
+        '''Test statistics of a customer without events'''
+        res = self._http_request('get', 'tech', url=stats_url(self.customer.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['event_count'], 0)
+        self.assertEqual(res.data['booked_days'], 0)
+        self.assertEqual(res.data['equipment_volume'], 0)
+
+
+    def test_customer_stats_not_found(self):
+        '''Test statistics of a missing customer'''
+        res = self._http_request('get', 'tech', url=stats_url(999))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
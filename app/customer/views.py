@@ -2,11 +2,15 @@
 Views for the customers API.
 '''
 
+from django.http import Http404
 from rest_framework import viewsets
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from core.models import Customer
+from core.stats import customer_stats
 from customer.permissions import CustomerPermissions
 
 from customer import serializers
@@ -15,8 +19,17 @@ class CustomerViewSet(viewsets.ModelViewSet):
     """View for manage client APIs"""
     serializer_class = serializers.CustomerSerializer
     queryset = Customer.objects.all()
+    search_fields = ['name', 'company']
     authentication_classes = [TokenAuthentication]
     permission_classes = [
         IsAuthenticated,
         CustomerPermissions
     ]
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """Event statistics of the customer"""
+        stats = customer_stats(pk) if pk.isdigit() else None
+        if stats is None:
+            raise Http404
+        return Response(stats)
@@ -0,0 +1,183 @@
+'''
+iCalendar (RFC 5545) feeds of the events of an employee or venue.
+
+Feeds include the events that ended at most `CALENDAR_FEED_PAST_DAYS` ago,
+found through the `end_date` index. Their ETag and Last-Modified come from a
+single aggregate of the `updated_at` of the events, so polling clients get a
+304 without rendering anything. Renaming a venue or employee touches their
+events (see `core.signals`), so it changes the ETag as well. Rendered feeds
+are cached under their ETag, so clients without a cached copy don't render
+them again either.
+'''
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from core.models import Event
+
+PRODID = '-//avr-manage//Events//EN'
+
+
+def _window(events):
+    since = timezone.now() - timedelta(days=settings.CALENDAR_FEED_PAST_DAYS)
+    return events.filter(end_date__gte=since)
+
+
+def employee_events(employee):
+    '''Return the events an employee is crew or leader of.'''
+    crew_events = Event.crew.through.objects.filter(
+        employee=employee,
+    ).values('event_id')
+    return _window(Event.objects.filter(
+        Q(leader=employee) | Q(id__in=crew_events)
+    ))
+
+
+def venue_events(venue):
+    '''Return the events of a venue.'''
+    return _window(Event.objects.filter(venue=venue))
+
+
+def feed_state(events):
+    '''
+    Return the validators of a feed.
+
+    Parameters
+    ----------
+    events : QuerySet
+        Events of the feed.
+
+    Returns
+    -------
+    tuple
+        ETag and last update of the events, None if there are none. The
+        number of events is part of the ETag, since removing an event from a
+        feed doesn't change the last update of the rest.
+    '''
+    state = events.order_by().aggregate(
+        last_modified=Max('updated_at'),
+        count=Count('id'),
+    )
+    last_modified = state['last_modified']
+    version = int(last_modified.timestamp() * 1e6) if last_modified else 0
+    return f'"{state["count"]}-{version}"', last_modified
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    '''Split a content line in lines of at most 75 octets.'''
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+
+    lines = []
+    while encoded:
+        size = 75 if not lines else 74
+        # Don't split multibyte characters
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        lines.append(encoded[:size].decode())
+        encoded = encoded[size:]
+    return '\r\n '.join(lines)
+
+
+def _format_date(date):
+    return date.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(date):
+    return timezone.localtime(date).strftime('%Y-%m-%d %H:%M')
+
+
+def render_event(event):
+    '''Return the VEVENT component of an event.'''
+    description = (
+        f'Load in: {_local(event.load_in_date)}\n'
+        f'Load out: {_local(event.load_out_date)}'
+    )
+    if event.comment:
+        description += f'\n\n{event.comment}'
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.id}@avr-manage',
+        f'DTSTAMP:{_format_date(event.updated_at)}',
+        f'LAST-MODIFIED:{_format_date(event.updated_at)}',
+        f'SEQUENCE:{event.version}',
+        f'DTSTART:{_format_date(event.start_date)}',
+        f'DTEND:{_format_date(event.end_date)}',
+        f'SUMMARY:{_escape(event.name)}',
+        f'DESCRIPTION:{_escape(description)}',
+    ]
+    if event.venue is not None:
+        location = ', '.join([
+            event.venue.name, event.venue.address, event.venue.city,
+        ])
+        lines.append(f'LOCATION:{_escape(location)}')
+    lines.append('END:VEVENT')
+    return '\r\n'.join(_fold(line) for line in lines)
+
+
+def render_calendar(name, events):
+    '''
+    Render a feed.
+
+    Parameters
+    ----------
+    name : str
+        Name of the calendar.
+    events : QuerySet
+        Events of the feed.
+
+    Returns
+    -------
+    str
+        iCalendar document.
+    '''
+    events = events.select_related('venue').order_by('start_date')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        _fold(f'X-WR-CALNAME:{_escape(name)}'),
+        *(render_event(event) for event in events),
+        'END:VCALENDAR',
+    ]
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def cached_calendar(key, etag, name, events):
+    '''
+    Return a rendered feed, rendering it only if it changed.
+
+    Parameters
+    ----------
+    key : str
+        Identifier of the feed.
+    etag : str
+        Current ETag of the feed, from `feed_state`.
+    name : str
+        Name of the calendar.
+    events : QuerySet
+        Events of the feed.
+    '''
+    cache_key = f'calendar:{key}:{etag}'
+    calendar = cache.get(cache_key)
+    if calendar is None:
+        calendar = render_calendar(name, events)
+        cache.set(cache_key, calendar, settings.CALENDAR_FEED_CACHE_TIMEOUT)
+    return calendar
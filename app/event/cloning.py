@@ -0,0 +1,210 @@
+'''
+Bulk creation of events from an existing event or a saved template.
+
+Events and their equipment and crew through-table rows are inserted with
+`bulk_create` inside one transaction, without resolving the members again.
+Bulk inserts skip the model signals, so the equipment utilization and the
+customer and venue statistics are refreshed, and the push clients notified,
+here.
+'''
+
+from django.db import transaction
+
+from core.broadcast import broadcast
+from core.models import Event, EventTemplate
+from core.stats import invalidate_event_stats
+from core.utilization import months_between, refresh_utilization_later
+
+
+def event_timing(event):
+    '''
+    Return the dates of an event relative to its start.
+
+    Returns
+    -------
+    dict
+        `load_in_before`, `duration` and `load_out_after` durations.
+    '''
+    return {
+        'load_in_before': event.start_date - event.load_in_date,
+        'duration': event.end_date - event.start_date,
+        'load_out_after': event.load_out_date - event.end_date,
+    }
+
+
+def build_events(template, start_dates):
+    '''
+    Return unsaved events placed at every start date.
+
+    Parameters
+    ----------
+    template : EventTemplate
+        Template of the events. It doesn't need to be saved.
+    start_dates : list
+        Start date of every event.
+
+    Returns
+    -------
+    list
+        Unsaved `Event` instances, in the order of `start_dates`.
+    '''
+    events = []
+    for start_date in start_dates:
+        end_date = start_date + template.duration
+        events.append(Event(
+            name=template.event_name,
+            load_in_date=start_date - template.load_in_before,
+            load_out_date=end_date + template.load_out_after,
+            start_date=start_date,
+            end_date=end_date,
+            venue_id=template.venue_id,
+            customer_id=template.customer_id,
+            leader_id=template.leader_id,
+            comment=template.comment,
+        ))
+    return events
+
+
+def create_events(events, equipment_ids, crew_ids):
+    '''
+    Insert events sharing the same equipment and crew.
+
+    Parameters
+    ----------
+    events : list
+        Unsaved `Event` instances.
+    equipment_ids : list
+        Ids of the devices of every event.
+    crew_ids : list
+        Ids of the crew members of every event.
+
+    Returns
+    -------
+    list
+        Created events.
+    '''
+    if not events:
+        return []
+
+    EventEquipment = Event.equipment.through
+    EventCrew = Event.crew.through
+
+    with transaction.atomic():
+        events = Event.objects.bulk_create(events)
+        EventEquipment.objects.bulk_create([
+            EventEquipment(event_id=event.id, equipment_id=equipment_id)
+            for event in events
+            for equipment_id in equipment_ids
+        ])
+        EventCrew.objects.bulk_create([
+            EventCrew(event_id=event.id, employee_id=employee_id)
+            for event in events
+            for employee_id in crew_ids
+        ])
+
+        # Copies can span many months, so this can run in the background
+        refresh_utilization_later.delay(
+            sorted({
+                month.isoformat()
+                for event in events
+                for month in months_between(
+                    event.load_in_date, event.load_out_date
+                )
+            }),
+            list(equipment_ids),
+        )
+        invalidate_event_stats(
+            {event.customer_id for event in events},
+            {event.venue_id for event in events},
+        )
+        broadcast('event', 'created', [event.id for event in events])
+    return events
+
+
+def template_from_event(event, name=None):
+    '''
+    Return an unsaved template copying an event.
+
+    Parameters
+    ----------
+    event : Event
+        Event to copy.
+    name : str, optional
+        Template name. The event name by default.
+    '''
+    return EventTemplate(
+        name=name or event.name,
+        event_name=event.name,
+        venue_id=event.venue_id,
+        customer_id=event.customer_id,
+        leader_id=event.leader_id,
+        comment=event.comment,
+        **event_timing(event),
+    )
+
+
+def _member_ids(instance):
+    '''Return the equipment and crew ids of an event or template.'''
+    return (
+        list(instance.equipment.values_list('id', flat=True)),
+        list(instance.crew.values_list('id', flat=True)),
+    )
+
+
+def clone_event(event, start_dates, name=None):
+    '''
+    Copy an event, with its equipment and crew, to every start date.
+
+    Parameters
+    ----------
+    event : Event
+        Event to copy.
+    start_dates : list
+        Start date of every copy.
+    name : str, optional
+        Name of the copies. The event name by default.
+
+    Returns
+    -------
+    list
+        Created events.
+    '''
+    template = template_from_event(event)
+    if name:
+        template.event_name = name
+    return create_events(
+        build_events(template, start_dates), *_member_ids(event)
+    )
+
+
+def save_template(event, name=None):
+    '''
+    Save an event, with its equipment and crew, as a template.
+
+    Returns
+    -------
+    EventTemplate
+        Created template.
+    '''
+    equipment_ids, crew_ids = _member_ids(event)
+
+    with transaction.atomic():
+        template = template_from_event(event, name)
+        template.save()
+        template.equipment.add(*equipment_ids)
+        template.crew.add(*crew_ids)
+    return template
+
+
+def instantiate_template(template, start_dates):
+    '''
+    Create an event from a template at every start date.
+
+    Returns
+    -------
+    list
+        Created events.
+    '''
+    return create_events(
+        build_events(template, start_dates), *_member_ids(template)
+    )
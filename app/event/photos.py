@@ -0,0 +1,74 @@
+'''
+Batch upload of event photos.
+
+Uploads are only checked from their headers in the request (see
+`core.images.open_photo`), which is cheap. Decoding, re-encoding and
+stripping the metadata take most of the CPU time and memory of an upload, so
+the accepted files are stored under `PENDING_DIR` and re-encoded by the
+`normalize_photos` task. Pending files aren't linked from the API: the rows
+have no photo until their task ran, so the original metadata is never served.
+The rows are inserted in a single query, and invalid files are reported
+without failing the rest of the batch.
+'''
+
+import os
+import uuid
+
+from core.images import InvalidPhoto, open_photo
+from core.models import EventPhoto
+from event.tasks import normalize_photos
+
+# Storage directory of the uploads waiting to be re-encoded
+PENDING_DIR = 'uploads/events/pending'
+
+
+def save_photos(event, files):
+    '''
+    Store uploaded photos of an event.
+
+    Parameters
+    ----------
+    event : Event
+        Event of the photos.
+    files : list
+        Uploaded files.
+
+    Returns
+    -------
+    list
+        One `(name, photo, error)` tuple per file, in upload order. `photo`
+        is the created `EventPhoto`, without file until it is re-encoded, or
+        None when the file was rejected with the `error` message.
+    '''
+    storage = EventPhoto._meta.get_field('photo').storage
+    results = []
+    photos = []
+    pending = []
+    for file in files:
+        try:
+            open_photo(file)
+        except InvalidPhoto as error:
+            results.append((file.name, None, str(error)))
+            continue
+
+        file.seek(0)
+        pending.append(storage.save(
+            os.path.join(PENDING_DIR, uuid.uuid4().hex), file,
+        ))
+        photo = EventPhoto(event=event)
+        photos.append(photo)
+        results.append((file.name, photo, None))
+
+    try:
+        EventPhoto.objects.bulk_create(photos)
+    except Exception:
+        # Don't leave files without rows behind
+        for name in pending:
+            storage.delete(name)
+        raise
+
+    if photos:
+        normalize_photos.delay([
+            [photo.id, name] for photo, name in zip(photos, pending)
+        ])
+    return results
@@ -0,0 +1,320 @@
+'''
+Recurring event series.
+
+Series are described with a subset of the iCalendar RRULE syntax (RFC 5545):
+`FREQ` (DAILY, WEEKLY or MONTHLY), `INTERVAL`, `COUNT`, `UNTIL` and, for
+weekly series, `BYDAY`. For example `FREQ=WEEKLY;BYDAY=FR;COUNT=12`.
+Occurrences are generated for up to a year after the base event, checked for
+equipment and crew conflicts all at once and the free ones are created in
+bulk by `event.cloning`.
+'''
+
+import calendar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.utils import timezone
+
+from core.models import Equipment, Event
+from event.cloning import build_events, create_events, template_from_event
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+# Occurrences are only generated this long after the base event
+HORIZON = timedelta(days=366)
+MAX_OCCURRENCES = 366
+
+
+def _parse_until(value):
+    for date_format in ('%Y%m%dT%H%M%SZ', '%Y%m%dT%H%M%S', '%Y%m%d'):
+        try:
+            until = datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        if date_format == '%Y%m%d':
+            until = until.replace(hour=23, minute=59, second=59)
+        if value.endswith('Z'):
+            return until.replace(tzinfo=dt_timezone.utc)
+        return timezone.make_aware(until)
+    raise ValueError(f'Invalid UNTIL date: {value}')
+
+
+def parse_rrule(text):
+    '''
+    Parse a recurrence rule.
+
+    Parameters
+    ----------
+    text : str
+        Rule like `FREQ=WEEKLY;INTERVAL=2;COUNT=10`, with or without the
+        `RRULE:` prefix.
+
+    Returns
+    -------
+    dict
+        `freq`, `interval`, `count`, `until` and `byday` (weekday numbers,
+        Monday being 0) of the rule.
+
+    Raises
+    ------
+    ValueError
+        If the rule is invalid or uses unsupported parts.
+    '''
+    text = text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+
+    parts = {}
+    for part in filter(None, text.split(';')):
+        name, sep, value = part.partition('=')
+        if not sep or not value:
+            raise ValueError(f'Invalid rule part: {part}')
+        parts[name.strip().upper()] = value.strip().upper()
+
+    unsupported = set(parts) - {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY'}
+    if unsupported:
+        raise ValueError(
+            f'Unsupported rule parts: {", ".join(sorted(unsupported))}'
+        )
+
+    freq = parts.get('FREQ')
+    if freq not in FREQUENCIES:
+        raise ValueError(f'FREQ must be one of {", ".join(FREQUENCIES)}')
+
+    rule = {'freq': freq, 'interval': 1, 'count': None, 'until': None,
+            'byday': None}
+
+    for name in ('INTERVAL', 'COUNT'):
+        if name in parts:
+            if not parts[name].isdigit() or int(parts[name]) < 1:
+                raise ValueError(f'{name} must be a positive integer')
+            rule[name.lower()] = int(parts[name])
+
+    if 'UNTIL' in parts:
+        rule['until'] = _parse_until(parts['UNTIL'])
+
+    if 'BYDAY' in parts:
+        if freq != 'WEEKLY':
+            raise ValueError('BYDAY is only supported in weekly rules')
+        days = parts['BYDAY'].split(',')
+        if not all(day in WEEKDAYS for day in days):
+            raise ValueError(f'BYDAY days must be in {", ".join(WEEKDAYS)}')
+        rule['byday'] = sorted({WEEKDAYS.index(day) for day in days})
+
+    return rule
+
+
+def _candidates(start, rule):
+    '''Yield the local dates of the rule from `start`, unbounded.'''
+    interval = rule['interval']
+
+    if rule['freq'] == 'DAILY':
+        step = 0
+        while True:
+            yield start + timedelta(days=step)
+            step += interval
+
+    elif rule['freq'] == 'WEEKLY':
+        days = rule['byday'] or [start.weekday()]
+        week_start = start - timedelta(days=start.weekday())
+        while True:
+            for day in days:
+                date = week_start + timedelta(days=day)
+                if date >= start:
+                    yield date
+            week_start += timedelta(weeks=interval)
+
+    else:
+        year, month = start.year, start.month
+        while True:
+            # Months without the day of the start are skipped, as in RFC 5545
+            if start.day <= calendar.monthrange(year, month)[1]:
+                yield start.replace(year=year, month=month)
+            month += interval
+            year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+
+
+def occurrences(start, rule):
+    '''
+    Return the start dates of the occurrences following `start`.
+
+    The base event counts as the first occurrence of `COUNT`, as in
+    RFC 5545, but isn't returned, even when its date doesn't match the rule.
+
+    Parameters
+    ----------
+    start : datetime
+        Start date of the base event.
+    rule : dict
+        Rule returned by `parse_rrule`.
+
+    Returns
+    -------
+    list
+        Start dates, at most `MAX_OCCURRENCES` within `HORIZON` of `start`.
+    '''
+    local_start = timezone.localtime(start).replace(tzinfo=None)
+    end = start + HORIZON
+    if rule['until'] is not None:
+        end = min(end, rule['until'])
+
+    # The base event takes one occurrence of the count
+    limit = MAX_OCCURRENCES
+    if rule['count']:
+        limit = min(limit, rule['count'] - 1)
+
+    dates = []
+    for local_date in _candidates(local_start, rule):
+        if len(dates) >= limit:
+            break
+        date = timezone.make_aware(local_date)
+        if date > end:
+            break
+        if local_date != local_start:
+            dates.append(date)
+    return dates
+
+
+def find_conflicts(events, equipment_ids, crew_ids):
+    '''
+    Find the bookings of the equipment and crew overlapping the events.
+
+    Every event is checked in a single query.
+
+    Parameters
+    ----------
+    events : list
+        Unsaved events.
+    equipment_ids : list
+        Devices the events need.
+    crew_ids : list
+        Crew members the events need.
+
+    Returns
+    -------
+    list
+        For every event, in order, the list of conflicting bookings as dicts
+        with the `event` id and its `equipment` uid or `crew` username.
+    '''
+    conflicts = [[] for _ in events]
+    if not events or not (equipment_ids or crew_ids):
+        return conflicts
+
+    # Archived events ended long ago, skipping them uses the hot indexes
+    overlaps = Q()
+    for event in events:
+        overlaps |= Q(
+            event__load_in_date__lt=event.load_out_date,
+            event__load_out_date__gt=event.load_in_date,
+        )
+
+    equipment = Event.equipment.through.objects.filter(
+        overlaps, equipment_id__in=equipment_ids,
+        event__archived_at__isnull=True,
+    ).values('event_id').annotate(
+        kind=Value('equipment'),
+        member=F('equipment__uid'),
+        load_in=F('event__load_in_date'),
+        load_out=F('event__load_out_date'),
+    )
+    crew = Event.crew.through.objects.filter(
+        overlaps, employee_id__in=crew_ids,
+        event__archived_at__isnull=True,
+    ).values('event_id').annotate(
+        kind=Value('crew'),
+        member=F('employee__username'),
+        load_in=F('event__load_in_date'),
+        load_out=F('event__load_out_date'),
+    )
+
+    for booking in equipment.union(crew, all=True):
+        for index, event in enumerate(events):
+            if (booking['load_in'] < event.load_out_date
+                    and booking['load_out'] > event.load_in_date):
+                conflicts[index].append({
+                    'event': booking['event_id'],
+                    booking['kind']: booking['member'],
+                })
+    return conflicts
+
+
+def create_series(event, rule, dry_run=False):
+    '''
+    Create the occurrences of a recurring event without conflicts.
+
+    Occurrences needing equipment or crew booked by another event, or
+    overlapping an earlier occurrence of the series, aren't created.
+
+    Parameters
+    ----------
+    event : Event
+        Base event, copied with its equipment and crew.
+    rule : dict
+        Rule returned by `parse_rrule`.
+    dry_run : bool
+        Only report the conflicts, without creating anything.
+
+    Returns
+    -------
+    tuple
+        Created events and the conflicts, as a list of dicts with the
+        `start_date` of the occurrence and its `bookings`.
+    '''
+    equipment_ids = list(event.equipment.values_list('id', flat=True))
+    crew_ids = list(event.crew.values_list('id', flat=True))
+
+    candidates = build_events(
+        template_from_event(event), occurrences(event.start_date, rule)
+    )
+
+    if dry_run:
+        return [], check_series(candidates, equipment_ids, crew_ids)[1]
+
+    with transaction.atomic():
+        # Concurrent series booking the same members wait for this one, so
+        # they see its events when checking their conflicts
+        lock_members(equipment_ids, crew_ids)
+        free, conflicts = check_series(candidates, equipment_ids, crew_ids)
+        return create_events(free, equipment_ids, crew_ids), conflicts
+
+
+def lock_members(equipment_ids, crew_ids):
+    '''Lock the rows of the devices and employees, in id order.'''
+    for model, ids in [
+        (Equipment, equipment_ids),
+        (get_user_model(), crew_ids),
+    ]:
+        if ids:
+            list(model.objects.select_for_update().filter(
+                id__in=ids,
+            ).order_by('id').values_list('id', flat=True))
+
+
+def check_series(candidates, equipment_ids, crew_ids):
+    '''
+    Split the occurrences of a series into free and conflicting ones.
+
+    Returns
+    -------
+    tuple
+        Free occurrences and the conflicts, as a list of dicts with the
+        `start_date` of the occurrence and its `bookings`.
+    '''
+    free = []
+    conflicts = []
+    bookings = find_conflicts(candidates, equipment_ids, crew_ids)
+    for candidate, candidate_bookings in zip(candidates, bookings):
+        if not candidate_bookings and free and (
+                free[-1].load_out_date > candidate.load_in_date):
+            candidate_bookings = [{'occurrence': free[-1].start_date}]
+
+        if candidate_bookings:
+            conflicts.append({
+                'start_date': candidate.start_date,
+                'bookings': candidate_bookings,
+            })
+        else:
+            free.append(candidate)
+    return free, conflicts
@@ -0,0 +1,17 @@
+'''
+Renderers for Event API
+'''
+
+from rest_framework.renderers import BaseRenderer
+
+
+class CalendarRenderer(BaseRenderer):
+    """Render iCalendar documents, and errors as plain text"""
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = str(data.get('detail', data))
+        return data.encode(self.charset)
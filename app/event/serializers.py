@@ -1,12 +1,26 @@
 from rest_framework import serializers
+from core.images import InvalidPhoto, normalize_photo
+from core.storage import load_upload
+from core.metrics import TimedSerializerMixin
 from core.models import (
     Event, 
     Venue,
     Customer,
     Equipment,
+    EventFile,
     EventPhoto,
+    EventTemplate,
 )
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.db import transaction
+from event.cloning import save_template
+from event.recurrence import parse_rrule
+
+# Maximum number of events created by a single clone request
+MAX_COPIES = 366
 
 class VenueSerializer(serializers.Serializer):
     '''Venue model serializer for Event model'''
@@ -38,7 +52,7 @@ class CrewSerializer(serializers.ListSerializer):
     child = CrewMemberSerializer()
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     '''Serializer for Event model'''
     venue = VenueSerializer()
     equipment = EquipmentListSerializer()
@@ -48,7 +62,7 @@ class EventSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['id']
 
     def create(self, validated_data):
@@ -58,8 +72,13 @@ class EventSerializer(serializers.ModelSerializer):
         equipment_data = validated_data.pop('equipment')
         crew_data = validated_data.pop('crew')
 
-        equipment_list = [Equipment.objects.get(**e) for e in equipment_data]
-        crew_list = [get_user_model().objects.get(**c) for c in crew_data]
+        equipment_ids = resolve_members(
+            Equipment, 'uid', [e['uid'] for e in equipment_data], 'equipment'
+        )
+        crew_ids = resolve_members(
+            get_user_model(), 'username', [c['username'] for c in crew_data],
+            'crew',
+        )
 
         leader = get_user_model().objects.get(**leader_data)
         venue = Venue.objects.get(**venue_data)
@@ -71,8 +90,8 @@ class EventSerializer(serializers.ModelSerializer):
             customer=customer,
             **validated_data
         )
-        event.equipment.set(equipment_list)
-        event.crew.set(crew_list)
+        event.equipment.add(*equipment_ids)
+        event.crew.add(*crew_ids)
         return event
 
 
@@ -93,15 +112,8 @@ class EventSerializer(serializers.ModelSerializer):
             customer = Customer.objects.get(**customer_data)
             instance.customer = customer
 
-        if 'crew' in validated_data:
-            crew_data = validated_data.pop('crew')
-            crew_list = [get_user_model().objects.get(**c) for c in crew_data]
-            instance.crew.set(crew_list)
-
-        if 'equipment' in validated_data:
-            equipment_data = validated_data.pop('equipment')
-            equipment_list = [Equipment.objects.get(**e) for e in equipment_data]
-            instance.equipment.set(equipment_list)
+        crew_data = validated_data.pop('crew', None)
+        equipment_data = validated_data.pop('equipment', None)
 
         instance.name = validated_data.get('name', instance.name)
         instance.comment = validated_data.get('comment', instance.comment)
@@ -109,17 +121,270 @@ class EventSerializer(serializers.ModelSerializer):
         instance.load_out_date = validated_data.get('load_out_date', instance.load_out_date)
         instance.start_date = validated_data.get('start_date', instance.start_date)
         instance.end_date = validated_data.get('end_date', instance.end_date)
-        instance.save()
+
+        # Saving first fails on a concurrent update before touching the lists
+        with transaction.atomic():
+            instance.save()
+
+            if crew_data is not None and not _same_members(
+                instance.crew.all(), crew_data, 'username'
+            ):
+                instance.crew.set(resolve_members(
+                    get_user_model(),
+                    'username',
+                    [c['username'] for c in crew_data],
+                    'crew',
+                ))
+
+            if equipment_data is not None and not _same_members(
+                instance.equipment.all(), equipment_data, 'uid'
+            ):
+                instance.equipment.set(resolve_members(
+                    Equipment,
+                    'uid',
+                    [e['uid'] for e in equipment_data],
+                    'equipment',
+                ))
 
         return instance
 
 
+def resolve_members(model, field, values, name):
+    """
+    Return the ids of the instances identified by `values` in one query.
+
+    Parameters
+    ----------
+    model : class
+        Model of the members.
+    field : str
+        Unique field identifying the members.
+    values : list
+        Values of `field` of the requested members.
+    name : str
+        Name of the field reported in validation errors.
+
+    Returns
+    -------
+    list
+        Ids of the members, in the order of `values` and without duplicates.
+
+    Raises
+    ------
+    ValidationError
+        If some of the members don't exist.
+    """
+    ids = dict(
+        model.objects.filter(**{f'{field}__in': values}).values_list(field, 'id')
+    )
+    missing = [value for value in dict.fromkeys(values) if value not in ids]
+    if missing:
+        raise serializers.ValidationError({
+            name: [f'{value} does not exist.' for value in missing],
+        })
+    return [ids[value] for value in dict.fromkeys(values)]
+
+
+def _same_members(current, requested, field):
+    """
+    Tell if a list of related objects already has the requested members.
+
+    Parameters
+    ----------
+    current : QuerySet
+        Current members. Prefetched members don't need a query.
+    requested : list
+        Validated member data, identified by `field`.
+    field : str
+        Field identifying the members.
+
+    Returns
+    -------
+    bool
+        True if both lists hold the same members.
+    """
+    return (
+        {getattr(member, field) for member in current}
+        == {data[field] for data in requested}
+    )
+
+
+class EventMembersSerializer(serializers.Serializer):
+    '''Members to add to and remove from an event list'''
+    add = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+        default=list,
+        max_length=1000,
+    )
+    remove = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+        default=list,
+        max_length=1000,
+    )
+
+    def validate(self, data):
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError('Nothing to add or remove.')
+
+        both = set(data['add']) & set(data['remove'])
+        if both:
+            raise serializers.ValidationError(
+                f'Can\'t add and remove {", ".join(sorted(both))}.'
+            )
+        return data
+
+
+class EventStartDatesSerializer(serializers.Serializer):
+    '''Start dates of the events to create from an event or template'''
+    start_dates = serializers.ListField(
+        child=serializers.DateTimeField(),
+        min_length=1,
+        max_length=MAX_COPIES,
+    )
+
+
+class EventCloneSerializer(EventStartDatesSerializer):
+    '''Start dates and name of the copies of an event'''
+    name = serializers.CharField(max_length=50, required=False)
+
+
+class EventRecurrenceSerializer(serializers.Serializer):
+    '''Recurrence rule of the series to create from an event'''
+    rrule = serializers.CharField(max_length=200)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_rrule(self, value):
+        try:
+            return parse_rrule(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+
+
+class EventPhotoUploadSerializer(serializers.Serializer):
+    '''Photos uploaded at once to an event'''
+    photos = serializers.ListField(
+        child=serializers.FileField(allow_empty_file=True),
+        allow_empty=False,
+    )
+
+    def validate_photos(self, value):
+        if len(value) > settings.PHOTO_BATCH_MAX_FILES:
+            raise serializers.ValidationError(
+                f'Upload at most {settings.PHOTO_BATCH_MAX_FILES} photos at '
+                'once.'
+            )
+        return value
+
+
+class EventFileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    '''
+    Serializer for EventFile model.
+
+    Files are sent in the request, or uploaded straight to the storage first
+    and registered with the `upload` token of their direct upload.
+    '''
+    file = serializers.FileField(required=False)
+    upload = serializers.CharField(write_only=True, required=False)
+
+    class Meta:
+        model = EventFile
+        fields = ['id', 'event', 'file', 'upload']
+        read_only_fields = ['id']
+
+    def validate(self, attrs):
+        upload = attrs.pop('upload', None)
+        if upload is None:
+            if 'file' not in attrs and not self.partial:
+                raise serializers.ValidationError(
+                    'Send the file or the upload token of a direct upload.'
+                )
+            return attrs
+
+        try:
+            signed = load_upload(upload)
+        except signing.BadSignature:
+            raise serializers.ValidationError(
+                {'upload': 'Invalid or expired upload.'}
+            )
+        event = attrs.get('event') or self.instance.event
+        if signed['event'] != event.id:
+            raise serializers.ValidationError(
+                {'upload': 'The upload belongs to another event.'}
+            )
+        if not default_storage.exists(signed['name']):
+            raise serializers.ValidationError(
+                {'upload': 'The file was not uploaded.'}
+            )
+        attrs['file'] = signed['name']
+        return attrs
+
+
+class EventFileUploadSerializer(serializers.Serializer):
+    '''File to upload straight to the storage'''
+    event = serializers.PrimaryKeyRelatedField(queryset=Event.objects.all())
+    filename = serializers.CharField(max_length=200)
+    content_type = serializers.CharField(
+        max_length=100, default='application/octet-stream',
+    )
+    size = serializers.IntegerField(
+        min_value=1, max_value=settings.DIRECT_UPLOAD_MAX_BYTES,
+    )
+
+
+class EventTemplateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    '''Serializer for EventTemplate model, created from an event'''
+    event = serializers.PrimaryKeyRelatedField(
+        queryset=Event.objects.all(),
+        write_only=True,
+    )
+    equipment = serializers.SlugRelatedField(
+        slug_field='uid', many=True, read_only=True,
+    )
+    crew = serializers.SlugRelatedField(
+        slug_field='username', many=True, read_only=True,
+    )
+
+    class Meta:
+        model = EventTemplate
+        fields = [
+            'id',
+            'name',
+            'event',
+            'event_name',
+            'venue',
+            'customer',
+            'leader',
+            'comment',
+            'load_in_before',
+            'duration',
+            'load_out_after',
+            'equipment',
+            'crew',
+        ]
+        read_only_fields = [
+            'id',
+            'event_name',
+            'venue',
+            'customer',
+            'leader',
+            'comment',
+            'load_in_before',
+            'duration',
+            'load_out_after',
+        ]
+
+    def create(self, validated_data):
+        return save_template(validated_data['event'], validated_data['name'])
+
+
 # TODO: There must be a better way to do this
 class EventDataSerializer(serializers.Serializer):
     '''Customer model serializer for Event model'''
     id = serializers.IntegerField()
 
-class EventPhotoSerializer(serializers.ModelSerializer):
+class EventPhotoSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     '''Serializer for Event model'''
     event = EventDataSerializer()
 
@@ -128,6 +393,12 @@ class EventPhotoSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['id']
 
+    def validate_photo(self, value):
+        try:
+            return normalize_photo(value)
+        except InvalidPhoto as error:
+            raise serializers.ValidationError(str(error))
+
     def create(self, validated_data):
         event_data = validated_data.pop('event')
         event = Event.objects.get(**event_data)
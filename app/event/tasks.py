@@ -0,0 +1,50 @@
+'''
+Background tasks of the event app.
+'''
+
+import logging
+
+from django.core.files import File
+
+from core.images import InvalidPhoto, normalize_photo
+from core.models import EventPhoto
+from core.tasks import task
+
+logger = logging.getLogger('event.tasks')
+
+
+@task(retries=3)
+def normalize_photos(pending):
+    '''
+    Re-encode uploaded photos and store them as the files of their rows.
+
+    Parameters
+    ----------
+    pending : list
+        `[photo id, name]` pairs of the uploads waiting in the storage (see
+        `event.photos.save_photos`).
+    '''
+    storage = EventPhoto._meta.get_field('photo').storage
+    photos = EventPhoto.objects.in_bulk([photo_id for photo_id, _ in pending])
+    processed = []
+    for photo_id, name in pending:
+        photo = photos.get(photo_id)
+        if photo is None or not storage.exists(name):
+            # Deleted meanwhile, or handled by a previous attempt
+            continue
+
+        with storage.open(name) as upload:
+            try:
+                content = normalize_photo(File(upload, name))
+            except InvalidPhoto as error:
+                logger.warning('Photo %s rejected: %s', photo_id, error)
+                content = None
+
+        if content is None:
+            photo.delete()
+        else:
+            photo.photo.save(content.name, content, save=False)
+            processed.append(photo)
+        storage.delete(name)
+
+    EventPhoto.objects.bulk_update(processed, ['photo'])
@@ -0,0 +1,113 @@
+"""
+Test archiving old events.
+"""
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import Event, Tombstone
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests
+
+EVENT_URL = reverse('event:event-list')
+
+
+def detail_url(event_id):
+    return reverse('event:event-detail', args=[event_id])
+
+
+class EventArchiveTests(PrivateAPITests, TestCase):
+    """Test archiving events and reading their history"""
+
+    def setUp(self):
+        super().setUp()
+        factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.events = factory.graph(events=4)['events']
+        self.recent = self.events[0]
+        Event.objects.filter(id=self.recent.id).update(
+            end_date=timezone.now(),
+        )
+        self.client.force_authenticate(self.sales_employee)
+
+
+    def _archive(self, *args):
+        out = StringIO()
+        call_command('archive_events', '--days', '30', *args, stdout=out)
+        return out.getvalue()
+
+
+    def test_archive_events(self):
+        '''Test old events are archived in batches'''
+        out = self._archive('--batch-size', '2')
+
+        self.assertIn('Archived 2 events', out)
+        self.assertIn('3 events archived!', out)
+        self.assertEqual(list(Event.objects.all()), [self.recent])
+        self.assertEqual(Event.all_objects.count(), 4)
+        self.assertEqual(
+            sorted(Tombstone.objects.values_list('object_id', flat=True)),
+            sorted(event.id for event in self.events[1:]),
+        )
+
+        self.assertIn('0 events archived!', self._archive())
+
+
+    def test_list_hides_archived(self):
+        self._archive()
+
+        res = self.client.get(EVENT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in res.data], [self.recent.id])
+
+
+    def test_history(self):
+        '''Test archived events are read with the history parameter'''
+        self._archive()
+        archived = self.events[1]
+
+        res = self.client.get(EVENT_URL, {'history': 'true'})
+        self.assertEqual(len(res.data), 4)
+
+        res = self.client.get(detail_url(archived.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.get(detail_url(archived.id), {'history': '1'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(res.data['archived_at'])
+
+
+    def test_archived_read_only(self):
+        '''Test the history parameter doesn't allow editing archived events'''
+        self._archive()
+        archived = self.events[1]
+
+        res = self.client.patch(
+            f'{detail_url(archived.id)}?history=true',
+            {'name': 'Renamed'},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_related_objects(self):
+        '''Test related sets hide archived events, foreign keys reach them'''
+        self._archive()
+        archived = Event.all_objects.get(id=self.events[1].id)
+
+        self.assertNotIn(archived, archived.customer.event_set.all())
+        self.assertIn(
+            archived,
+            archived.customer.event_set(manager='all_objects').all(),
+        )
+        photo = archived.eventphoto_set.create(photo='photo.jpg')
+        photo.refresh_from_db()
+        self.assertEqual(photo.event, archived)
@@ -0,0 +1,206 @@
+"""
+Test the iCalendar feeds of employees and venues.
+"""
+import base64
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import Customer, Event, Venue
+from event.calendar import render_event
+from tests.mixin_tests import PrivateAPITests
+
+
+class CalendarFeedTests(PrivateAPITests, TestCase):
+    """Test the employee and venue calendar feeds"""
+
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(name='Customer')
+        self.venue = Venue.objects.create(
+            name='Main hall',
+            address='Street 1',
+            city='City',
+            state='State',
+        )
+        self.crew_event = self._event('Crew event', days=3)
+        self.crew_event.crew.add(self.tech_employee)
+        self.leader_event = self._event('Led event', days=10)
+        self.leader_event.leader = self.tech_employee
+        self.leader_event.save()
+        self.other_event = self._event('Other event', days=5, venue=None)
+        self.old_event = self._event('Old event', days=-200)
+        self.old_event.crew.add(self.tech_employee)
+
+        self.employee_url = reverse(
+            'event:employee-calendar', args=[self.tech_employee.username],
+        )
+        self.venue_url = reverse('event:venue-calendar', args=[self.venue.id])
+        self.client.force_authenticate(self.tech_employee)
+
+
+    def _event(self, name, days, venue=True):
+        start_date = timezone.now() + timedelta(days=days)
+        return Event.objects.create(
+            name=name,
+            load_in_date=start_date - timedelta(hours=4),
+            load_out_date=start_date + timedelta(hours=10),
+            start_date=start_date,
+            end_date=start_date + timedelta(hours=6),
+            customer=self.customer,
+            venue=self.venue if venue else None,
+            comment='',
+        )
+
+
+    def test_employee_feed(self):
+        '''Test the feed has the recent events of the crew member or leader'''
+        res = self.client.get(self.employee_url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/calendar; charset=utf-8')
+        body = res.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn(f'UID:event-{self.crew_event.id}@avr-manage', body)
+        self.assertIn(f'UID:event-{self.leader_event.id}@avr-manage', body)
+        self.assertNotIn('Other event', body)
+        self.assertNotIn('Old event', body)
+        self.assertLess(
+            body.index('Crew event'), body.index('Led event'),
+        )
+
+
+    def test_venue_feed(self):
+        '''Test the feed has the events of the venue'''
+        res = self.client.get(self.venue_url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = res.content.decode()
+        self.assertIn('Crew event', body)
+        self.assertIn('Led event', body)
+        self.assertNotIn('Other event', body)
+        self.assertIn('LOCATION:Main hall\\, Street 1\\, City', body)
+
+
+    def test_not_modified(self):
+        '''Test unchanged feeds return 304'''
+        res = self.client.get(self.employee_url)
+        etag = res['ETag']
+
+        res = self.client.get(self.employee_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+        res = self.client.get(
+            self.employee_url,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+    def test_crew_changes_update_feed(self):
+        '''Test adding and removing crew members change the feed ETag'''
+        etag = self.client.get(self.employee_url)['ETag']
+
+        self.other_event.crew.add(self.tech_employee)
+        res = self.client.get(self.employee_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Other event', res.content.decode())
+
+        etag = res['ETag']
+        self.tech_employee.event_crew.remove(self.other_event)
+        res = self.client.get(self.employee_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Other event', res.content.decode())
+
+
+    def test_member_changes_touch_event(self):
+        '''Test equipment and crew changes update the event timestamp'''
+        updated_at = self.other_event.updated_at
+
+        self.other_event.crew.add(self.sales_employee)
+        self.other_event.refresh_from_db()
+        self.assertGreater(self.other_event.updated_at, updated_at)
+
+
+    def test_event_changes_update_feed(self):
+        '''Test editing an event changes the feed'''
+        etag = self.client.get(self.venue_url)['ETag']
+
+        self.crew_event.name = 'Renamed event'
+        self.crew_event.save()
+
+        res = self.client.get(self.venue_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Renamed event', res.content.decode())
+
+
+    def test_renames_update_feed(self):
+        '''Test renaming the venue or employee of a feed changes it'''
+        etag = self.client.get(self.venue_url)['ETag']
+
+        self.venue.address = 'Street 2'
+        self.venue.save()
+
+        res = self.client.get(self.venue_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Street 2', res.content.decode())
+
+        etag = self.client.get(self.employee_url)['ETag']
+        self.tech_employee.first_name = 'Renamed'
+        self.tech_employee.save(update_fields=['first_name'])
+
+        res = self.client.get(self.employee_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Renamed', res.content.decode())
+
+
+    def test_login_keeps_feed(self):
+        '''Test saving the last login of an employee doesn't change feeds'''
+        etag = self.client.get(self.employee_url)['ETag']
+
+        self.tech_employee.last_login = timezone.now()
+        self.tech_employee.save(update_fields=['last_login'])
+
+        res = self.client.get(self.employee_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+    def test_basic_authentication(self):
+        '''Test calendar apps subscribe with HTTP basic authentication'''
+        self.client.force_authenticate(None)
+        res = self.client.get(self.employee_url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        credentials = base64.b64encode(b'foo_barr:test123').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        res = self.client.get(self.employee_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_unknown_feed(self):
+        '''Test feeds of missing employees and venues'''
+        res = self.client.get(
+            reverse('event:employee-calendar', args=['nobody']),
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        res = self.client.get(reverse('event:venue-calendar', args=[0]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_render_event(self):
+        '''Test event text is escaped and long lines are folded'''
+        self.crew_event.name = 'Show; part 1, 2'
+        self.crew_event.comment = 'Bring cables\n' + 'x' * 100
+
+        component = render_event(self.crew_event)
+
+        self.assertIn('SUMMARY:Show\\; part 1\\, 2', component)
+        unfolded = component.replace('\r\n ', '')
+        self.assertIn('\\n\\nBring cables\\n' + 'x' * 100, unfolded)
+        for line in component.split('\r\n'):
+            self.assertLessEqual(len(line.encode()), 75)
@@ -0,0 +1,145 @@
+"""
+Test cloning events and event templates.
+"""
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+
+from core.models import Event, EventTemplate, EquipmentUtilization
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+class EventCloneTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test creating events from existing ones"""
+
+    def setUp(self):
+        super().setUp()
+        self.factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.data = self.factory.graph(events=1)
+        self.event = self.data['events'][0]
+        self.clone_url = reverse('event:event-clone', args=[self.event.id])
+        self.client.force_authenticate(self.sales_employee)
+
+
+    def _weekly(self, count):
+        return [
+            self.event.start_date + timedelta(weeks=week + 1)
+            for week in range(count)
+        ]
+
+
+    def assertCopy(self, copy, start_date):
+        '''Check an event is a copy of the source event at `start_date`'''
+        shift = start_date - self.event.start_date
+        self.assertEqual(copy.start_date, start_date)
+        self.assertEqual(copy.end_date, self.event.end_date + shift)
+        self.assertEqual(copy.load_in_date, self.event.load_in_date + shift)
+        self.assertEqual(copy.load_out_date, self.event.load_out_date + shift)
+        self.assertEqual(copy.customer_id, self.event.customer_id)
+        self.assertEqual(copy.venue_id, self.event.venue_id)
+        self.assertEqual(copy.leader_id, self.event.leader_id)
+        self.assertEqual(
+            set(copy.equipment.values_list('id', flat=True)),
+            set(self.event.equipment.values_list('id', flat=True)),
+        )
+        self.assertEqual(
+            set(copy.crew.values_list('id', flat=True)),
+            set(self.event.crew.values_list('id', flat=True)),
+        )
+
+
+    def test_clone_series(self):
+        '''Test copying an event to several start dates'''
+        start_dates = self._weekly(3)
+
+        res = self.client.post(self.clone_url, {
+            'start_dates': [date.isoformat() for date in start_dates],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        for data, start_date in zip(res.data, start_dates):
+            self.assertCopy(Event.objects.get(id=data['id']), start_date)
+            self.assertEqual(data['name'], self.event.name)
+
+
+    def test_clone_refreshes_utilization(self):
+        '''Test the utilization includes the copies'''
+        start_date = self.event.start_date + timedelta(days=400)
+        self.client.post(self.clone_url, {
+            'start_dates': [start_date.isoformat()],
+            'name': 'Copy',
+        }, format='json')
+
+        copy = Event.objects.get(name='Copy')
+        self.assertTrue(EquipmentUtilization.objects.filter(
+            month__year=copy.load_in_date.year,
+            month__month=copy.load_in_date.month,
+        ).exists())
+
+
+    def test_clone_invalid(self):
+        '''Test copying needs at least one start date'''
+        res = self.client.post(self.clone_url, {'start_dates': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Event.objects.count(), 1)
+
+
+    def test_clone_permissions(self):
+        '''Test only sales employees copy events'''
+        self.client.force_authenticate(self.tech_employee)
+        res = self.client.post(self.clone_url, {
+            'start_dates': [self._weekly(1)[0].isoformat()],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    def test_clone_budget(self):
+        '''Test copying doesn't run queries per device or copy'''
+        self.event.equipment.add(*self.factory.equipment(200))
+
+        with self.assertQueryBudget('event:event-clone'):
+            res = self.client.post(self.clone_url, {
+                'start_dates': [d.isoformat() for d in self._weekly(4)],
+            }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+
+    def test_template(self):
+        '''Test saving an event as template and creating events from it'''
+        res = self.client.post(reverse('event:eventtemplate-list'), {
+            'name': 'Friday residency',
+            'event': self.event.id,
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        template = EventTemplate.objects.get(id=res.data['id'])
+        self.assertEqual(template.event_name, self.event.name)
+        self.assertEqual(len(res.data['equipment']), 10)
+        self.assertEqual(len(res.data['crew']), 5)
+
+        self.event.equipment.clear()
+        start_dates = self._weekly(2)
+        res = self.client.post(
+            reverse('event:eventtemplate-instantiate', args=[template.id]),
+            {'start_dates': [date.isoformat() for date in start_dates]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        for data in res.data:
+            self.assertEqual(len(data['equipment']), 10)
+            self.assertEqual(len(data['crew']), 5)
+        self.assertEqual(
+            [parse_datetime(data['start_date']) for data in res.data],
+            start_dates,
+        )
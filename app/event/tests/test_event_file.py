@@ -0,0 +1,122 @@
+"""
+Test the event file API and direct uploads.
+"""
+import shutil
+import tempfile
+from datetime import datetime
+
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import EventFile
+from core.storage import UPLOAD_SALT
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests
+
+FILE_URL = reverse('event:eventfile-list')
+PRESIGN_URL = reverse('event:eventfile-presign')
+
+
+class EventFileAPITests(PrivateAPITests, TestCase):
+    """Test uploading event files"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = self.settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.event, self.other_event = factory.graph(events=2)['events']
+        self.client.force_authenticate(self.sales_employee)
+
+
+    def _token(self, name, event):
+        return signing.dumps({'name': name, 'event': event.id}, salt=UPLOAD_SALT)
+
+
+    def test_upload_file(self):
+        '''Test uploading a file through the API'''
+        res = self.client.post(FILE_URL, {
+            'event': self.event.id,
+            'file': SimpleUploadedFile('rider.pdf', b'%PDF-1.4'),
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        event_file = EventFile.objects.get(id=res.data['id'])
+        self.assertEqual(event_file.event, self.event)
+        self.assertTrue(event_file.file.name.endswith('.pdf'))
+        self.assertEqual(event_file.file.read(), b'%PDF-1.4')
+
+
+    def test_register_direct_upload(self):
+        '''Test registering a file uploaded straight to the storage'''
+        name = default_storage.save(
+            'uploads/events/files/rider.pdf', ContentFile(b'%PDF-1.4'),
+        )
+
+        res = self.client.post(FILE_URL, {
+            'event': self.event.id,
+            'upload': self._token(name, self.event),
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(EventFile.objects.get().file.name, name)
+
+
+    def test_invalid_direct_upload(self):
+        '''Test tampered, foreign and missing uploads are rejected'''
+        name = default_storage.save(
+            'uploads/events/files/rider.pdf', ContentFile(b'%PDF-1.4'),
+        )
+        for upload in [
+            self._token(name, self.event) + 'x',
+            self._token(name, self.other_event),
+            self._token('uploads/events/files/missing.pdf', self.event),
+        ]:
+            res = self.client.post(FILE_URL, {
+                'event': self.event.id, 'upload': upload,
+            }, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('upload', res.data)
+        self.assertFalse(EventFile.objects.exists())
+
+
+    def test_file_required(self):
+        res = self.client.post(FILE_URL, {'event': self.event.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_presign_needs_object_storage(self):
+        '''Test direct uploads are refused with local storage'''
+        res = self.client.post(PRESIGN_URL, {
+            'event': self.event.id,
+            'filename': 'video.mp4',
+            'content_type': 'video/mp4',
+            'size': 1024,
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+
+    def test_permissions(self):
+        '''Test only sales employees upload files'''
+        self.client.force_authenticate(self.tech_employee)
+        res = self.client.post(FILE_URL, {
+            'event': self.event.id,
+            'file': SimpleUploadedFile('rider.pdf', b'%PDF-1.4'),
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,138 @@
+"""
+Test adding and removing event equipment and crew.
+"""
+from datetime import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import EquipmentUtilization
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+class EventMembersTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test incremental updates of the event lists"""
+
+    def setUp(self):
+        super().setUp()
+        self.factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.data = self.factory.graph(
+            equipment=20, events=1, devices_per_event=5, crew_size=2,
+        )
+        self.event = self.data['events'][0]
+        self.equipment_url = reverse('event:event-equipment', args=[self.event.id])
+        self.crew_url = reverse('event:event-crew', args=[self.event.id])
+        self.client.force_authenticate(self.sales_employee)
+
+
+    def _free_equipment(self, count):
+        booked = set(self.event.equipment.values_list('id', flat=True))
+        return [e for e in self.data['equipment'] if e.id not in booked][:count]
+
+
+    def test_add_and_remove_equipment(self):
+        '''Test adding and removing devices of an event'''
+        added = self._free_equipment(2)
+        removed = self.event.equipment.first()
+
+        res = self.client.patch(self.equipment_url, {
+            'add': [e.uid for e in added],
+            'remove': [removed.uid],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['version'], 2)
+        self.assertEqual(res['ETag'], '"2"')
+        uids = set(self.event.equipment.values_list('uid', flat=True))
+        self.assertEqual(len(uids), 6)
+        self.assertTrue({e.uid for e in added} <= uids)
+        self.assertNotIn(removed.uid, uids)
+        self.assertTrue(
+            EquipmentUtilization.objects.filter(equipment=added[0]).exists()
+        )
+
+
+    def test_add_existing_equipment(self):
+        '''Test adding devices already in the event keeps a single row'''
+        current = self.event.equipment.first()
+
+        res = self.client.patch(
+            self.equipment_url, {'add': [current.uid]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.event.equipment.count(), 5)
+
+
+    def test_unknown_equipment(self):
+        '''Test unknown uids are rejected without changing the event'''
+        res = self.client.patch(self.equipment_url, {
+            'add': [self._free_equipment(1)[0].uid, 'missing'],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['equipment'], ['missing does not exist.'])
+        self.assertEqual(self.event.equipment.count(), 5)
+
+
+    def test_invalid_members(self):
+        '''Test empty requests and members both added and removed fail'''
+        uid = self.event.equipment.first().uid
+
+        for payload in [{}, {'add': [uid], 'remove': [uid]}]:
+            res = self.client.patch(self.equipment_url, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_update_crew(self):
+        '''Test adding and removing crew members'''
+        removed = self.event.crew.first()
+
+        res = self.client.patch(self.crew_url, {
+            'add': [self.tech_employee.username],
+            'remove': [removed.username],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        crew = set(self.event.crew.values_list('username', flat=True))
+        self.assertIn(self.tech_employee.username, crew)
+        self.assertNotIn(removed.username, crew)
+
+
+    def test_stale_version(self):
+        '''Test updating the lists of a changed event fails'''
+        res = self.client.patch(
+            self.crew_url, {'add': [self.tech_employee.username]},
+            format='json', HTTP_IF_MATCH='"3"',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertFalse(self.event.crew.filter(id=self.tech_employee.id).exists())
+
+
+    def test_permissions(self):
+        '''Test only sales employees update the lists'''
+        self.client.force_authenticate(self.tech_employee)
+        res = self.client.patch(
+            self.crew_url, {'add': [self.tech_employee.username]}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    def test_add_to_large_event_budget(self):
+        '''Test adding a device doesn't depend on the size of the event'''
+        equipment = self.factory.equipment(401)
+        self.event.equipment.add(*equipment[:400])
+
+        with self.assertQueryBudget('event:event-equipment'):
+            res = self.client.patch(
+                self.equipment_url, {'add': [equipment[400].uid]},
+                format='json',
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.event.equipment.count(), 406)
@@ -1,7 +1,7 @@
 """
 Test for event photo API.
 """
-from django.test import TestCase, RequestFactory
+from django.test import TestCase, RequestFactory, override_settings
 from tests.mixin_tests import PublicAPITests, PrivateAPITests
 
 from core.models import (
@@ -206,6 +206,40 @@ class PrivatEventPhotoAPITests(PrivateAPITests, TestCase):
         # self.assertCountEqual(data.crew.all(), crew_objects)
 
 
+    @override_settings(PHOTO_MAX_DIMENSION=100)
+    def test_photo_normalized(self):
+        '''
+        Test uploaded photos are scaled down before being stored
+        '''
+        upload = SimpleUploadedFile('photo.jpg', self.tmpfile.read())
+        serializer = self.serializer(
+            data={'event': {'id': self.event.id}, 'photo': upload},
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                event_photo = serializer.save()
+                self.assertEqual(
+                    (event_photo.photo.width, event_photo.photo.height),
+                    (100, 100),
+                )
+
+
+    @override_settings(PHOTO_MAX_PIXELS=1000)
+    def test_photo_too_large(self):
+        '''
+        Test photos over the pixel limit are rejected
+        '''
+        upload = SimpleUploadedFile('photo.jpg', self.tmpfile.read())
+        serializer = self.serializer(
+            data={'event': {'id': self.event.id}, 'photo': upload},
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('photo', serializer.errors)
+
+
     def test_delete_event_photo(self):
         """
         Test deleting event photo instance successfully.
@@ -0,0 +1,145 @@
+"""
+Test uploading several event photos at once.
+"""
+import shutil
+import tempfile
+from datetime import datetime
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+
+from core.models import EventPhoto, QueuedTask
+from core.tasks import claim_tasks, execute
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+def upload(name='photo.jpg', size=(60, 40)):
+    '''Return an uploaded JPEG file.'''
+    buffer = BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class EventPhotoUploadTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test the batch photo upload of an event"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = self.settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.event = self.factory.graph(events=1)['events'][0]
+        self.url = reverse('event:event-photos', args=[self.event.id])
+        self.client.force_authenticate(self.sales_employee)
+
+
+    def test_upload_photos(self):
+        '''Test every photo is stored and returned'''
+        res = self.client.post(self.url, {
+            'photos': [upload('one.jpg'), upload('two.jpg')],
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result['file'] for result in res.data['results']],
+            ['one.jpg', 'two.jpg'],
+        )
+        photos = EventPhoto.objects.filter(event=self.event).order_by('id')
+        self.assertEqual(
+            [result['id'] for result in res.data['results']],
+            [photo.id for photo in photos],
+        )
+        for photo in photos:
+            self.assertEqual(photo.photo.width, 60)
+
+
+    @override_settings(TASKS_BACKEND='database')
+    def test_normalized_later(self):
+        '''Test photos are re-encoded by a task, after the request'''
+        res = self.client.post(self.url, {
+            'photos': [upload('one.jpg', size=(200, 100))],
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(res.data['results'][0]['photo'])
+        photo = EventPhoto.objects.get()
+        self.assertFalse(photo.photo)
+
+        queued, = claim_tasks(1)
+        self.assertTrue(execute(queued))
+        photo.refresh_from_db()
+        self.assertEqual(photo.photo.width, 200)
+        self.assertTrue(photo.photo.name.endswith('.jpg'))
+        storage = photo.photo.storage
+        self.assertEqual(storage.listdir('uploads/events/pending')[1], [])
+        self.assertFalse(QueuedTask.objects.exists())
+
+
+    def test_partial_failure(self):
+        '''Test invalid files are reported without failing the batch'''
+        res = self.client.post(self.url, {
+            'photos': [
+                upload('good.jpg'),
+                SimpleUploadedFile('bad.jpg', b'not an image'),
+            ],
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        good, bad = res.data['results']
+        self.assertIn('id', good)
+        self.assertEqual(bad['file'], 'bad.jpg')
+        self.assertIn('errors', bad)
+        self.assertEqual(EventPhoto.objects.count(), 1)
+
+
+    def test_all_invalid(self):
+        res = self.client.post(self.url, {
+            'photos': [SimpleUploadedFile('bad.jpg', b'not an image')],
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(EventPhoto.objects.exists())
+
+
+    @override_settings(PHOTO_BATCH_MAX_FILES=1)
+    def test_too_many_files(self):
+        res = self.client.post(self.url, {
+            'photos': [upload('one.jpg'), upload('two.jpg')],
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('photos', res.data)
+        self.assertFalse(EventPhoto.objects.exists())
+
+
+    def test_permissions(self):
+        '''Test only sales employees upload photos'''
+        self.client.force_authenticate(self.finance_employee)
+        res = self.client.post(self.url, {
+            'photos': [upload()],
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    def test_upload_budget(self):
+        '''Test the photo rows are inserted at once'''
+        photos = [upload(f'{index}.jpg') for index in range(20)]
+
+        with self.assertQueryBudget('event:event-photos'):
+            res = self.client.post(
+                self.url, {'photos': photos}, format='multipart',
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,191 @@
+"""
+Test the query budgets of the event API.
+"""
+from datetime import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import Event, EventPhoto
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+class EventQueryBudgetTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test the number of queries run by the event API"""
+    data_url = 'event:event-list'
+    data_detail_url = 'event:event-detail'
+
+    def setUp(self):
+        super().setUp()
+        # A fixed date keeps the months touched by the events, and the
+        # utilization queries run to refresh them, the same on every run
+        self.factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.data = self.factory.graph(events=0)
+
+
+    def _create_events(self, count):
+        return self.factory.events(
+            count,
+            customers=self.data['customers'],
+            venues=self.data['venues'],
+            employees=self.data['employees'],
+            equipment=self.data['equipment'],
+        )
+
+
+    def _payload(self, members=None, first=0):
+        '''
+        Return an event payload, with `members` devices and crew from the
+        `first` ones of the data set.
+        '''
+        if members is None:
+            crew = [self.tech_employee]
+            equipment = self.data['equipment'][:5]
+        else:
+            crew = self.data['employees'][first:first + members]
+            equipment = self.data['equipment'][first:first + members]
+        return {
+            'name': 'Budget Concert',
+            'load_in_date': '2023-07-18T13:00:00',
+            'load_out_date': '2023-07-20T13:00:00',
+            'start_date': '2023-07-18T18:00:00',
+            'end_date': '2023-07-18T23:00:00',
+            'venue': {'id': self.data['venues'][0].id},
+            'customer': {'id': self.data['customers'][0].id},
+            'leader': {'username': self.tech_employee.username},
+            'crew': [{'username': employee.username} for employee in crew],
+            'equipment': [{'uid': device.uid} for device in equipment],
+            'comment': 'Query budget',
+        }
+
+
+    def test_list_queries_constant(self):
+        '''Test listing events doesn't run a query per event'''
+        self.assertConstantQueries(
+            reverse(self.data_url), 'sales', self._create_events
+        )
+
+
+    def _write(self, method, payload, url=None):
+        res = self._http_request(method, 'sales', payload, url)
+        self.assertLess(res.status_code, 300, res.data)
+        return res
+
+
+    def test_create_queries_constant(self):
+        '''Test creating events doesn't run a query per member'''
+        self.assertSameQueries({
+            f'Creating with {members} members': (
+                lambda members=members: self._write(
+                    'post', self._payload(members),
+                )
+            )
+            for members in (1, 5)
+        })
+
+
+    def test_update_queries_constant(self):
+        '''Test updating events doesn't run a query per member'''
+        # The third event keeps the removed device booked, so its utilization
+        # is refreshed the same way by both updates
+        urls = [
+            self._detail_url(self._write('post', self._payload(1)).data['id'])
+            for _ in range(3)
+        ]
+
+        # Every update replaces the members of the event with new ones
+        self.assertSameQueries({
+            f'Updating with {members} members': (
+                lambda url=url, members=members: self._write(
+                    'put', self._payload(members, first=1), url,
+                )
+            )
+            for url, members in zip(urls, (1, 4))
+        })
+
+
+    def test_list_budget(self):
+        '''Test listing events stays within its query budget'''
+        self._create_events(5)
+        with self.assertQueryBudget('event:event-list'):
+            res = self._http_request('get', 'sales')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_retrieve_budget(self):
+        '''Test retrieving an event stays within its query budget'''
+        event = self._create_events(1)[0]
+        with self.assertQueryBudget('event:event-detail'):
+            res = self._http_request(
+                'get', 'sales', url=self._detail_url(event.id)
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_create_budget(self):
+        '''Test creating an event stays within its query budget'''
+        with self.assertQueryBudget('event:event-create'):
+            res = self._http_request('post', 'sales', self._payload())
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+
+    def test_update_budget(self):
+        '''Test updating an event stays within its query budget'''
+        event = self._create_events(1)[0]
+        with self.assertQueryBudget('event:event-update'):
+            res = self._http_request(
+                'put', 'sales', self._payload(), self._detail_url(event.id)
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_partial_update_budget(self):
+        '''Test partially updating an event stays within its query budget'''
+        event = self._create_events(1)[0]
+        with self.assertQueryBudget('event:event-partial-update'):
+            res = self._http_request(
+                'patch', 'sales', {'comment': 'Moved'},
+                self._detail_url(event.id),
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_delete_budget(self):
+        '''Test deleting an event stays within its query budget'''
+        event = self._create_events(1)[0]
+        with self.assertQueryBudget('event:event-delete'):
+            res = self._http_request(
+                'delete', 'sales', url=self._detail_url(event.id)
+            )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Event.objects.filter(id=event.id).exists())
+
+
+class EventPhotoQueryBudgetTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test the number of queries run by the event photo API"""
+
+    def setUp(self):
+        super().setUp()
+        self.events = DataFactory().graph()['events']
+
+
+    def _create_photos(self, count):
+        EventPhoto.objects.bulk_create([
+            EventPhoto(
+                event=self.events[i % len(self.events)],
+                photo=f'uploads/events/photos/{i}.jpg',
+            )
+            for i in range(count)
+        ])
+
+
+    def test_list_queries_constant(self):
+        '''Test listing photos doesn't run a query per photo'''
+        self.assertConstantQueries(
+            reverse('event:eventphoto-list'), 'tech', self._create_photos
+        )
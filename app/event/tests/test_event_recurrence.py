@@ -0,0 +1,275 @@
+"""
+Test recurring event series.
+"""
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+
+from core.models import Event
+from event.recurrence import MAX_OCCURRENCES, occurrences, parse_rrule
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+class RecurrenceRuleTests(TestCase):
+    """Test parsing recurrence rules and generating occurrences"""
+
+    def setUp(self):
+        # Monday
+        self.start = timezone.make_aware(datetime(2023, 7, 3, 20))
+
+
+    def test_parse(self):
+        '''Test parsing a rule with every supported part'''
+        rule = parse_rrule('RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=5;BYDAY=FR,MO')
+
+        self.assertEqual(rule['freq'], 'WEEKLY')
+        self.assertEqual(rule['interval'], 2)
+        self.assertEqual(rule['count'], 5)
+        self.assertEqual(rule['byday'], [0, 4])
+        self.assertIsNone(rule['until'])
+
+
+    def test_parse_invalid(self):
+        '''Test invalid and unsupported rules are rejected'''
+        for text in (
+            '',
+            'FREQ=YEARLY',
+            'FREQ=DAILY;COUNT=0',
+            'FREQ=DAILY;INTERVAL=two',
+            'FREQ=DAILY;BYDAY=MO',
+            'FREQ=WEEKLY;BYDAY=XX',
+            'FREQ=WEEKLY;BYMONTH=1',
+            'FREQ=WEEKLY;UNTIL=tomorrow',
+            'FREQ',
+        ):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                parse_rrule(text)
+
+
+    def test_weekly_count(self):
+        '''Test the base event counts as the first occurrence'''
+        dates = occurrences(self.start, parse_rrule('FREQ=WEEKLY;COUNT=4'))
+
+        self.assertEqual(dates, [
+            self.start + timedelta(weeks=week) for week in (1, 2, 3)
+        ])
+
+
+    def test_weekly_byday(self):
+        '''Test weekly occurrences on several days'''
+        dates = occurrences(
+            self.start, parse_rrule('FREQ=WEEKLY;BYDAY=MO,TH;COUNT=4')
+        )
+
+        self.assertEqual([date.day for date in dates], [6, 10, 13])
+        self.assertTrue(all(date.hour == 20 for date in dates))
+
+
+    def test_weekly_byday_without_start(self):
+        '''Test rules not matching the base date keep their first day'''
+        dates = occurrences(
+            self.start, parse_rrule('FREQ=WEEKLY;BYDAY=FR;COUNT=3')
+        )
+
+        self.assertEqual([date.day for date in dates], [7, 14])
+
+
+    def test_monthly_skips_short_months(self):
+        '''Test monthly occurrences skip months without the start day'''
+        start = timezone.make_aware(datetime(2023, 1, 31, 20))
+        dates = occurrences(start, parse_rrule('FREQ=MONTHLY;COUNT=4'))
+
+        self.assertEqual(
+            [(date.month, date.day) for date in dates],
+            [(3, 31), (5, 31), (7, 31)],
+        )
+
+
+    def test_until_and_horizon(self):
+        '''Test occurrences stop at UNTIL and a year after the start'''
+        dates = occurrences(
+            self.start, parse_rrule('FREQ=DAILY;UNTIL=20230706')
+        )
+        self.assertEqual([date.day for date in dates], [4, 5, 6])
+
+        dates = occurrences(self.start, parse_rrule('FREQ=WEEKLY'))
+        self.assertEqual(len(dates), 52)
+        self.assertLessEqual(dates[-1], self.start + timedelta(days=366))
+
+        dates = occurrences(self.start, parse_rrule('FREQ=DAILY'))
+        self.assertEqual(len(dates), MAX_OCCURRENCES)
+
+
+class EventRecurrenceTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test creating series of events from an existing one"""
+
+    def setUp(self):
+        super().setUp()
+        self.factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.data = self.factory.graph(events=1)
+        self.event = self.data['events'][0]
+        self.url = reverse('event:event-recurrence', args=[self.event.id])
+        self.client.force_authenticate(self.sales_employee)
+
+
+    def _book(self, start_date, equipment=(), crew=()):
+        '''Create another event booking members at `start_date`'''
+        event = Event.objects.create(
+            name='Blocking',
+            load_in_date=start_date - timedelta(hours=2),
+            load_out_date=start_date + timedelta(hours=2),
+            start_date=start_date,
+            end_date=start_date + timedelta(hours=1),
+            customer=self.event.customer,
+        )
+        event.equipment.add(*equipment)
+        event.crew.add(*crew)
+        return event
+
+
+    def test_weekly_series(self):
+        '''Test creating a weekly series copying the event'''
+        res = self.client.post(self.url, {
+            'rrule': 'FREQ=WEEKLY;COUNT=4',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['conflicts'], [])
+        self.assertEqual(
+            [parse_datetime(data['start_date']) for data in res.data['created']],
+            [self.event.start_date + timedelta(weeks=week) for week in (1, 2, 3)],
+        )
+        for data in res.data['created']:
+            self.assertEqual(len(data['equipment']), 10)
+            self.assertEqual(len(data['crew']), 5)
+
+
+    def test_conflicts(self):
+        '''Test occurrences with booked equipment or crew are skipped'''
+        device = self.event.equipment.first()
+        member = self.event.crew.first()
+        blocked_equipment = self._book(
+            self.event.start_date + timedelta(weeks=2), equipment=[device],
+        )
+        blocked_crew = self._book(
+            self.event.start_date + timedelta(weeks=3), crew=[member],
+        )
+
+        res = self.client.post(self.url, {
+            'rrule': 'FREQ=WEEKLY;COUNT=5',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 2)
+        self.assertEqual(res.data['conflicts'], [
+            {
+                'start_date': self.event.start_date + timedelta(weeks=2),
+                'bookings': [
+                    {'event': blocked_equipment.id, 'equipment': device.uid},
+                ],
+            },
+            {
+                'start_date': self.event.start_date + timedelta(weeks=3),
+                'bookings': [
+                    {'event': blocked_crew.id, 'crew': member.username},
+                ],
+            },
+        ])
+        self.assertEqual(Event.objects.count(), 5)
+
+
+    def test_dry_run(self):
+        '''Test a dry run reports conflicts without creating events'''
+        self._book(
+            self.event.start_date + timedelta(weeks=1),
+            equipment=[self.event.equipment.first()],
+        )
+
+        res = self.client.post(self.url, {
+            'rrule': 'FREQ=WEEKLY;COUNT=3',
+            'dry_run': True,
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], [])
+        self.assertEqual(len(res.data['conflicts']), 1)
+        self.assertEqual(Event.objects.count(), 2)
+
+
+    def test_members_locked(self):
+        '''Test the equipment and crew are locked before the check'''
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.post(self.url, {
+                'rrule': 'FREQ=WEEKLY;COUNT=2',
+            }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        locked = [
+            query['sql'] for query in captured.captured_queries
+            if query['sql'].endswith('FOR UPDATE')
+        ]
+        self.assertEqual(len(locked), 2)
+        self.assertIn('core_equipment', locked[0])
+        self.assertIn('core_employee', locked[1])
+
+
+    def test_overlapping_occurrences(self):
+        '''Test occurrences overlapping earlier ones of the series'''
+        self.event.load_out_date = self.event.load_in_date + timedelta(days=2)
+        self.event.save()
+
+        res = self.client.post(self.url, {
+            'rrule': 'FREQ=DAILY;COUNT=5',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [parse_datetime(data['start_date']) for data in res.data['created']],
+            [self.event.start_date + timedelta(days=day) for day in (2, 4)],
+        )
+        first, second = res.data['conflicts']
+        # The first occurrence overlaps the base event itself
+        self.assertEqual(first['bookings'][0]['event'], self.event.id)
+        self.assertEqual(second['bookings'], [
+            {'occurrence': self.event.start_date + timedelta(days=2)},
+        ])
+
+
+    def test_invalid_rule(self):
+        '''Test invalid rules are rejected'''
+        res = self.client.post(self.url, {
+            'rrule': 'FREQ=HOURLY',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('rrule', res.data)
+
+
+    def test_permissions(self):
+        '''Test only sales employees create series'''
+        self.client.force_authenticate(self.tech_employee)
+        res = self.client.post(self.url, {
+            'rrule': 'FREQ=WEEKLY;COUNT=2',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    def test_recurrence_budget(self):
+        '''Test the availability check doesn't run queries per occurrence'''
+        self.event.equipment.add(*self.factory.equipment(200))
+
+        with self.assertQueryBudget('event:event-recurrence'):
+            res = self.client.post(self.url, {
+                'rrule': 'FREQ=WEEKLY;COUNT=20',
+            }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,142 @@
+"""
+Test optimistic concurrency of event updates.
+"""
+from types import SimpleNamespace
+
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from core.exceptions import PreconditionFailed
+from core.models import Event, VersionConflict
+from event.views import EventViewSet
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests
+
+
+class EventVersionTests(PrivateAPITests, TestCase):
+    """Test versioning events with ETags"""
+    data_detail_url = 'event:event-detail'
+
+    def setUp(self):
+        super().setUp()
+        self.data = DataFactory().graph(events=1)
+        self.event = self.data['events'][0]
+        self.url = self._detail_url(self.event.id)
+        self.client.force_authenticate(self.sales_employee)
+
+
+    def _payload(self, event):
+        return {
+            'name': event.name,
+            'load_in_date': event.load_in_date.isoformat(),
+            'load_out_date': event.load_out_date.isoformat(),
+            'start_date': event.start_date.isoformat(),
+            'end_date': event.end_date.isoformat(),
+            'venue': {'id': event.venue_id},
+            'customer': {'id': event.customer_id},
+            'leader': {'username': event.leader.username},
+            'crew': [{'username': e.username} for e in event.crew.all()],
+            'equipment': [{'uid': e.uid} for e in event.equipment.all()],
+            'comment': 'Updated',
+        }
+
+
+    def test_retrieve_etag(self):
+        '''Test events are returned with their version as ETag'''
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['ETag'], '"1"')
+        self.assertEqual(res.data['version'], 1)
+
+
+    def test_update_matching_version(self):
+        '''Test updating the version the client read'''
+        res = self.client.patch(
+            self.url, {'comment': 'Moved'}, format='json', HTTP_IF_MATCH='"1"',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['ETag'], '"2"')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.version, 2)
+        self.assertEqual(self.event.comment, 'Moved')
+
+
+    def test_update_stale_version(self):
+        '''Test updating a version changed by someone else fails'''
+        self.client.patch(self.url, {'comment': 'First'}, format='json')
+
+        res = self.client.patch(
+            self.url, {'comment': 'Second'}, format='json',
+            HTTP_IF_MATCH='"1"',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.comment, 'First')
+
+
+    def test_concurrent_save(self):
+        '''Test saving an event updated since it was loaded fails'''
+        first = Event.objects.get(id=self.event.id)
+        second = Event.objects.get(id=self.event.id)
+        first.comment = 'First'
+        first.save()
+        second.comment = 'Second'
+
+        with self.assertRaises(VersionConflict):
+            second.save()
+
+        self.assertEqual(second.version, 1)
+        self.assertEqual(Event.objects.get(id=self.event.id).comment, 'First')
+
+
+    def test_unchanged_lists_not_rewritten(self):
+        '''Test a full update with the same equipment and crew keeps them'''
+        payload = self._payload(self.event)
+
+        with CaptureQueriesContext(connection) as captured:
+            res = self.client.put(
+                self.url, payload, format='json', HTTP_IF_MATCH='"1"',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        through_tables = ('core_event_equipment', 'core_event_crew')
+        writes = [
+            query['sql'] for query in captured.captured_queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+            and any(table in query['sql'] for table in through_tables)
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(self.event.equipment.count(), 10)
+
+
+    def test_delete_stale_version(self):
+        '''Test deleting a version changed by someone else fails'''
+        res = self.client.delete(self.url, HTTP_IF_MATCH='"7"')
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(Event.objects.filter(id=self.event.id).exists())
+
+        res = self.client.delete(self.url, HTTP_IF_MATCH='W/"1"')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+
+    def test_delete_changed_since_read(self):
+        '''Test deleting without locks refuses a version changed since read'''
+        stale = Event.objects.get(id=self.event.id)
+        Event.objects.filter(id=self.event.id).update(version=F('version') + 1)
+        view = EventViewSet(request=SimpleNamespace(headers={}))
+
+        with CaptureQueriesContext(connection) as captured:
+            with self.assertRaises(PreconditionFailed):
+                view.perform_destroy(stale)
+
+        self.assertFalse(any(
+            'FOR UPDATE' in query['sql'] for query in captured.captured_queries
+        ))
+        self.assertTrue(Event.objects.filter(id=self.event.id).exists())
@@ -13,9 +13,18 @@ from event import views
 router = DefaultRouter()
 router.register('event', views.EventViewSet)
 router.register('event_photo', views.EventPhotoViewSet)
+router.register('event_file', views.EventFileViewSet)
+router.register('event_template', views.EventTemplateViewSet)
 
 app_name = 'event'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('calendar/employee/<str:username>.ics',
+         views.EmployeeCalendarView.as_view(),
+         name='employee-calendar',
+    ),
+    path('calendar/venue/<int:pk>.ics', views.VenueCalendarView.as_view(),
+         name='venue-calendar',
+    ),
 ]
@@ -1,29 +1,450 @@
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    extend_schema,
+    extend_schema_view,
+)
+from rest_framework import mixins, status, viewsets
+from rest_framework.authentication import (
+    BasicAuthentication,
+    TokenAuthentication,
+)
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from event import serializers
 
-from core.models import Event, EventPhoto
+from core.exceptions import PreconditionFailed
+from core.storage import direct_upload
+from core.models import (
+    Equipment,
+    Event,
+    EventFile,
+    EventPhoto,
+    EventTemplate,
+    Venue,
+    VersionConflict,
+)
+from event.calendar import (
+    cached_calendar,
+    employee_events,
+    feed_state,
+    venue_events,
+)
+from event.cloning import clone_event, instantiate_template
 from event.permissions import EventPermissions
+from event.photos import save_photos
+from event.recurrence import create_series
+from event.renderers import CalendarRenderer
 
 
+HISTORY_PARAMETER = OpenApiParameter(
+    'history', bool, description='Include the archived events.',
+)
+
+
+def event_etag(version):
+    '''Return the ETag of an event version.'''
+    return f'"{version}"'
+
+
+def check_if_match(request, event):
+    """
+    Check the `If-Match` header of a request matches the event version.
+
+    Requests without the header are always allowed.
+
+    Raises
+    ------
+    PreconditionFailed
+        If none of the ETags of the header is the current one.
+    """
+    if_match = request.headers.get('If-Match')
+    if if_match is None or if_match.strip() == '*':
+        return
+
+    etags = [
+        etag.strip().removeprefix('W/') for etag in if_match.split(',')
+    ]
+    if event_etag(event.version) not in etags:
+        raise PreconditionFailed
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=[HISTORY_PARAMETER]),
+    retrieve=extend_schema(parameters=[HISTORY_PARAMETER]),
+)
 class EventViewSet(viewsets.ModelViewSet):
-    """View for manage event API"""
+    """
+    View for manage event API
+
+    Archived events are only read with `?history=true`.
+    """
     serializer_class = serializers.EventSerializer
-    queryset = Event.objects.all()
+    queryset = Event.all_objects.select_related(
+        'venue', 'customer', 'leader',
+    ).prefetch_related('equipment', 'crew')
+    search_fields = ['name']
     authentication_classes = [TokenAuthentication]
     permission_classes = [
         IsAuthenticated,
         EventPermissions,
     ]
 
+    def get_queryset(self):
+        # Member updates and copies don't need the related rows of the event
+        if self.action in ('equipment', 'crew', 'clone', 'recurrence',
+                           'photos'):
+            return Event.objects.all()
+        queryset = super().get_queryset()
+        history = self.request.query_params.get('history', '').lower()
+        if self.request.method != 'GET' or history not in ('1', 'true'):
+            queryset = queryset.filter(archived_at__isnull=True)
+        return queryset
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and 'version' in data:
+            response['ETag'] = event_etag(data['version'])
+        return response
+
+    def perform_update(self, serializer):
+        check_if_match(self.request, serializer.instance)
+        try:
+            serializer.save()
+        except VersionConflict:
+            raise PreconditionFailed
+
+    def perform_destroy(self, instance):
+        check_if_match(self.request, instance)
+        # Deleting only the version that was read, an event updated since
+        # matches no row
+        _, deleted = Event.objects.filter(
+            pk=instance.pk, version=instance.version,
+        ).delete()
+        if not deleted.get(Event._meta.label):
+            raise PreconditionFailed
+
+    @extend_schema(request=serializers.EventMembersSerializer)
+    @action(detail=True, methods=['patch'])
+    def equipment(self, request, pk=None):
+        """Add and remove devices of the event by uid"""
+        return self._update_members(request, 'equipment', Equipment, 'uid')
+
+    @extend_schema(request=serializers.EventMembersSerializer)
+    @action(detail=True, methods=['patch'])
+    def crew(self, request, pk=None):
+        """Add and remove crew members of the event by username"""
+        return self._update_members(
+            request, 'crew', get_user_model(), 'username'
+        )
+
+    @extend_schema(
+        request=serializers.EventCloneSerializer,
+        responses=serializers.EventSerializer(many=True),
+    )
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        """Copy the event, with its equipment and crew, to new start dates"""
+        event = self.get_object()
+        serializer = serializers.EventCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        events = clone_event(event, **serializer.validated_data)
+        return created_events_response(events)
+
+    @extend_schema(request=serializers.EventRecurrenceSerializer)
+    @action(detail=True, methods=['post'])
+    def recurrence(self, request, pk=None):
+        """
+        Repeat the event following a recurrence rule.
+
+        Occurrences conflicting with other bookings of the equipment or crew
+        are reported and the rest are created.
+        """
+        event = self.get_object()
+        serializer = serializers.EventRecurrenceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        dry_run = serializer.validated_data['dry_run']
+        events, conflicts = create_series(
+            event, serializer.validated_data['rrule'], dry_run
+        )
+        created = EventViewSet.queryset.filter(
+            id__in=[created_event.id for created_event in events],
+        ).order_by('start_date')
+        return Response(
+            {
+                'created': serializers.EventSerializer(created, many=True).data,
+                'conflicts': conflicts,
+            },
+            status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(request={
+        'multipart/form-data': serializers.EventPhotoUploadSerializer,
+    })
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
+    def photos(self, request, pk=None):
+        """
+        Upload several photos of the event at once.
+
+        Every file gets its own result, so the rejected ones can be uploaded
+        again without the rest. Responds 201 when any photo was stored.
+        """
+        event = self.get_object()
+        serializer = serializers.EventPhotoUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = []
+        for name, photo, error in save_photos(
+            event, serializer.validated_data['photos']
+        ):
+            if photo is None:
+                results.append({'file': name, 'errors': [error]})
+            else:
+                results.append({
+                    'file': name,
+                    **serializers.EventPhotoSerializer(
+                        photo, context=self.get_serializer_context(),
+                    ).data,
+                })
+
+        created = any('id' in result for result in results)
+        return Response(
+            {'results': results},
+            status=(
+                status.HTTP_201_CREATED if created
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    def _update_members(self, request, name, model, field):
+        """
+        Add and remove members of an event list without rewriting it.
+
+        Members are resolved in one query, only the missing ones are inserted
+        and only the removed ones are deleted from the through table.
+
+        Parameters
+        ----------
+        request : Request
+            Request with `add` and `remove` lists of member identifiers.
+        name : str
+            Name of the `Event` many to many field.
+        model : class
+            Model of the members.
+        field : str
+            Unique field identifying the members.
+        """
+        event = self.get_object()
+        check_if_match(request, event)
+
+        serializer = serializers.EventMembersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add = serializer.validated_data['add']
+        remove = serializer.validated_data['remove']
+
+        values = list(dict.fromkeys(add + remove))
+        ids = dict(zip(
+            values,
+            serializers.resolve_members(model, field, values, name),
+        ))
+
+        with transaction.atomic():
+            updated = Event.objects.filter(
+                pk=event.pk, version=event.version,
+            ).update(version=F('version') + 1, updated_at=timezone.now())
+            if not updated:
+                raise PreconditionFailed
+
+            members = getattr(event, name)
+            if remove:
+                members.remove(*(ids[value] for value in remove))
+            if add:
+                members.add(*(ids[value] for value in add))
+
+        return Response({
+            'id': event.id,
+            'version': event.version + 1,
+            'add': add,
+            'remove': remove,
+        })
+
+def created_events_response(events):
+    '''Return the response listing newly created events.'''
+    queryset = EventViewSet.queryset.filter(
+        id__in=[event.id for event in events],
+    ).order_by('start_date')
+    return Response(
+        serializers.EventSerializer(queryset, many=True).data,
+        status=status.HTTP_201_CREATED,
+    )
+
+
+class EventTemplateViewSet(mixins.CreateModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    View for saved event templates.
+
+    Templates are created from an existing event and used to create events
+    at any start date.
+    """
+    serializer_class = serializers.EventTemplateSerializer
+    queryset = EventTemplate.objects.prefetch_related('equipment', 'crew')
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [
+        IsAuthenticated,
+        EventPermissions,
+    ]
+
+    @extend_schema(
+        request=serializers.EventStartDatesSerializer,
+        responses=serializers.EventSerializer(many=True),
+    )
+    @action(detail=True, methods=['post'])
+    def instantiate(self, request, pk=None):
+        """Create an event from the template at every start date"""
+        template = self.get_object()
+        serializer = serializers.EventStartDatesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        events = instantiate_template(
+            template, serializer.validated_data['start_dates']
+        )
+        return created_events_response(events)
+
+
 class EventPhotoViewSet(viewsets.ModelViewSet):
     """View for manage event API"""
     serializer_class = serializers.EventPhotoSerializer
-    queryset = EventPhoto.objects.all()
+    queryset = EventPhoto.objects.select_related('event')
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [
+        IsAuthenticated,
+        EventPermissions,
+    ]
+
+
+
+class EventFileViewSet(viewsets.ModelViewSet):
+    """View for manage event files API"""
+    serializer_class = serializers.EventFileSerializer
+    queryset = EventFile.objects.all()
     authentication_classes = [TokenAuthentication]
     permission_classes = [
         IsAuthenticated,
         EventPermissions,
     ]
 
+    @extend_schema(request=serializers.EventFileUploadSerializer)
+    @action(detail=False, methods=['post'])
+    def presign(self, request):
+        """
+        Prepare uploading a file straight to the object storage.
+
+        The client sends the returned request with the file, then creates
+        the event file with the `upload` token. Needs object storage.
+        """
+        serializer = serializers.EventFileUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        field = EventFile._meta.get_field('file')
+        upload = direct_upload(
+            field.storage,
+            field.generate_filename(None, data['filename']),
+            data['content_type'],
+            data['size'],
+            event=data['event'].id,
+        )
+        if upload is None:
+            return Response(
+                {'detail': 'Direct uploads need object storage.'},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+
+class CalendarFeedView(APIView):
+    """
+    Base view of the iCalendar feeds.
+
+    Calendar apps can subscribe with HTTP basic authentication. Responses
+    carry an ETag and Last-Modified, so polling apps get a 304 while the
+    feed doesn't change.
+    """
+    authentication_classes = [BasicAuthentication, TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CalendarRenderer]
+
+    def feed_response(self, request, key, name, events):
+        '''
+        Return a feed, or a 304 if the client has the current one.
+
+        Parameters
+        ----------
+        request : Request
+            Request of the feed.
+        key : str
+            Identifier of the feed, for the cache.
+        name : str
+            Name of the calendar.
+        events : QuerySet
+            Events of the feed.
+        '''
+        etag, last_modified = feed_state(events)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp,
+        )
+        if response is None:
+            response = HttpResponse(
+                cached_calendar(key, etag, name, events),
+                content_type='text/calendar; charset=utf-8',
+            )
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class EmployeeCalendarView(CalendarFeedView):
+    """Calendar of the events an employee is crew or leader of"""
+
+    @extend_schema(responses={(200, 'text/calendar'): OpenApiTypes.STR})
+    def get(self, request, username):
+        employee = get_object_or_404(get_user_model(), username=username)
+        return self.feed_response(
+            request,
+            f'employee:{employee.id}',
+            f'{employee.first_name} {employee.fathers_name}',
+            employee_events(employee),
+        )
+
+
+class VenueCalendarView(CalendarFeedView):
+    """Calendar of the events of a venue"""
+
+    @extend_schema(responses={(200, 'text/calendar'): OpenApiTypes.STR})
+    def get(self, request, pk):
+        venue = get_object_or_404(Venue, pk=pk)
+        return self.feed_response(
+            request, f'venue:{venue.id}', venue.name, venue_events(venue),
+        )
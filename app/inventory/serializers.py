@@ -3,14 +3,18 @@ Serializers for inventory APIs
 """
 
 from rest_framework import serializers
+from core.metrics import TimedSerializerMixin
 from core.models import (
     EquipmentType, 
     EquipmentBrand, 
     EquipmentModel,
-    Equipment
+    Equipment,
+    EquipmentMovement,
+    EquipmentStatus,
+    Event,
 )
 
-class EquipmentTypeSerializer(serializers.ModelSerializer):
+class EquipmentTypeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Equipment Type."""
 
     class Meta:
@@ -24,7 +28,7 @@ class EquipmentTypeSerializer(serializers.ModelSerializer):
         return instance
 
 
-class EquipmentBrandSerializer(serializers.ModelSerializer):
+class EquipmentBrandSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Equipment Brand."""
 
     class Meta:
@@ -38,7 +42,7 @@ class EquipmentBrandSerializer(serializers.ModelSerializer):
         return instance
 
 
-class EquipmentModelSerializer(serializers.ModelSerializer):
+class EquipmentModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Equipment Model."""
 
     class Meta:
@@ -57,7 +61,7 @@ class EquipmentDataSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=50)
 
 
-class EquipmentSerializer(serializers.ModelSerializer):
+class EquipmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     model = EquipmentDataSerializer()
     brand = EquipmentDataSerializer()
@@ -65,7 +69,7 @@ class EquipmentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Equipment
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['id', 'uid']
 
     def create(self, validated_data):
@@ -105,3 +109,85 @@ class EquipmentSerializer(serializers.ModelSerializer):
         instance.save()
 
         return instance
+
+
+class EquipmentScanSerializer(serializers.Serializer):
+    """Serializer for a batch of scanned equipment uids."""
+    uids = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class EquipmentMovementSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for equipment movements."""
+    equipment = serializers.SlugRelatedField(slug_field='uid', read_only=True)
+    employee = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+
+    class Meta:
+        model = EquipmentMovement
+        fields = ['id', 'equipment', 'kind', 'timestamp', 'employee', 'event']
+        read_only_fields = fields
+
+
+class EquipmentMovementBatchSerializer(serializers.Serializer):
+    """Serializer for a batch of scanned equipment movements."""
+    kind = serializers.ChoiceField(choices=EquipmentMovement.KIND_CHOICES)
+    event = serializers.PrimaryKeyRelatedField(
+        queryset=Event.objects.all(),
+        required=False,
+        allow_null=True,
+    )
+    uids = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+    def create(self, validated_data):
+        uids = list(dict.fromkeys(validated_data['uids']))
+        equipment_ids = dict(
+            Equipment.objects.filter(uid__in=uids).values_list('uid', 'id')
+        )
+        movements = EquipmentMovement.objects.record(
+            equipment_ids=[equipment_ids[u] for u in uids if u in equipment_ids],
+            kind=validated_data['kind'],
+            employee=validated_data.get('employee'),
+            event=validated_data.get('event'),
+        )
+
+        return {
+            'created': len(movements),
+            'not_found': [u for u in uids if u not in equipment_ids],
+        }
+
+    def to_representation(self, instance):
+        return instance
+
+
+class EquipmentStatusSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for the current status of a device."""
+    equipment = serializers.SlugRelatedField(slug_field='uid', read_only=True)
+
+    class Meta:
+        model = EquipmentStatus
+        fields = ['equipment', 'kind', 'event', 'timestamp', 'movement']
+        read_only_fields = fields
+
+
+class UtilizationQuerySerializer(serializers.Serializer):
+    """Serializer for the utilization report query parameters."""
+    group_by = serializers.ChoiceField(
+        choices=['equipment', 'type', 'brand', 'model'],
+        default='type',
+    )
+    start = serializers.DateField(input_formats=['%Y-%m'], required=False)
+    end = serializers.DateField(input_formats=['%Y-%m'], required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('start must be before end')
+        return attrs
@@ -0,0 +1,135 @@
+"""
+Equipment movement API tests
+"""
+from datetime import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import (
+    Customer,
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentMovement,
+    EquipmentStatus,
+    EquipmentType,
+    Event,
+)
+from tests.mixin_tests import PublicAPITests, PrivateAPITests
+
+
+class PublicEquipmentMovementAPITests(PublicAPITests, TestCase):
+    data_url = 'inventory:equipmentmovement-list'
+
+    def test_auth_required(self):
+        '''Test auth is required to call API'''
+        self.authRequired()
+
+
+class PrivateEquipmentMovementAPITests(PrivateAPITests, TestCase):
+    """Test authenticated API requests"""
+    model_class = EquipmentMovement
+    data_url = 'inventory:equipmentmovement-list'
+    data_detail_url = 'inventory:equipmentmovement-detail'
+
+    def setUp(self):
+        super().setUp()
+        equipment_model = EquipmentModel.objects.create(name="qlxd")
+        equipment_brand = EquipmentBrand.objects.create(name="shure")
+        equipment_type = EquipmentType.objects.create(name="microphone")
+        self.equipment_list = [
+            Equipment.objects.create(
+                model=equipment_model,
+                brand=equipment_brand,
+                type=equipment_type,
+                number=number,
+            )
+            for number in range(1, 4)
+        ]
+        self.event = Event.objects.create(
+            name='Foo Concert',
+            load_in_date=timezone.make_aware(datetime(2023, 7, 18, 13, 0)),
+            load_out_date=timezone.make_aware(datetime(2023, 7, 20, 13, 0)),
+            start_date=timezone.make_aware(datetime(2023, 7, 18, 13, 0)),
+            end_date=timezone.make_aware(datetime(2023, 7, 18, 13, 0)),
+            customer=Customer.objects.create(name="John Doe"),
+            comment="",
+        )
+
+
+    def test_record_batch(self):
+        '''Test recording a batch of scans updates the current status'''
+        payload = {
+            'kind': 'out',
+            'event': self.event.id,
+            'uids': [e.uid for e in self.equipment_list] + ['999999-1'],
+        }
+
+        res = self._http_request('post', 'inventory', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(res.data['not_found'], ['999999-1'])
+        self.assertEqual(
+            EquipmentStatus.objects.filter(kind='out', event=self.event).count(),
+            3,
+        )
+        movement = EquipmentMovement.objects.first()
+        self.assertEqual(movement.employee, self.inventory_employee)
+
+
+    def test_status_follows_last_movement(self):
+        '''Test the status table keeps only the last movement per device'''
+        device = self.equipment_list[0]
+        EquipmentMovement.objects.record([device.id], 'out', event=self.event)
+        last, = EquipmentMovement.objects.record([device.id], 'in')
+
+        self.assertEqual(EquipmentMovement.objects.count(), 2)
+        device_status = EquipmentStatus.objects.get(equipment=device)
+        self.assertEqual(device_status.kind, 'in')
+        self.assertEqual(device_status.movement, last)
+        self.assertIsNone(device_status.event)
+
+
+    def test_movements_are_append_only(self):
+        '''Test movements can't be modified'''
+        movement, = EquipmentMovement.objects.record(
+            [self.equipment_list[0].id], 'damaged'
+        )
+        movement.kind = 'in'
+
+        with self.assertRaises(ValueError):
+            movement.save()
+
+        res = self._http_request(
+            'patch', 'inventory', {'kind': 'in'}, self._detail_url(movement.id)
+        )
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+    def test_record_batch_without_permissions(self):
+        '''Test recording movements requires the inventory role'''
+        payload = {'kind': 'in', 'uids': [self.equipment_list[0].uid]}
+
+        res = self._http_request('post', 'tech', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+    def test_list_equipment_status(self):
+        '''Test listing devices that are currently out'''
+        ids = [e.id for e in self.equipment_list]
+        EquipmentMovement.objects.record(ids, 'out', event=self.event)
+        EquipmentMovement.objects.record(ids[:1], 'in')
+        url = f"{reverse('inventory:equipmentstatus-list')}?kind=out"
+
+        res = self._http_request('get', 'tech', url=url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            [s['equipment'] for s in res.data],
+            [e.uid for e in self.equipment_list[1:]],
+        )
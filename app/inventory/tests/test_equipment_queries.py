@@ -0,0 +1,87 @@
+"""
+Test the query budgets of the equipment API.
+"""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+class EquipmentQueryBudgetTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test the number of queries run by the equipment API"""
+    data_url = 'inventory:equipment-list'
+    data_detail_url = 'inventory:equipment-detail'
+
+    def setUp(self):
+        super().setUp()
+        self.factory = DataFactory()
+        self.catalog = self.factory.catalog(types=3, brands=3, models=5)
+
+
+    def _create_equipment(self, count):
+        return self.factory.equipment(count, self.catalog)
+
+
+    def _payload(self):
+        return {
+            'model': {'name': self.catalog[2][0].name},
+            'brand': {'name': self.catalog[1][0].name},
+            'type': {'name': self.catalog[0][0].name},
+            'number': 100,
+            'serial_number': 'BUDGET1',
+        }
+
+
+    def test_list_queries_constant(self):
+        '''Test listing equipment doesn't run a query per device'''
+        self.assertConstantQueries(
+            reverse(self.data_url), 'tech', self._create_equipment
+        )
+
+
+    def test_list_budget(self):
+        '''Test listing equipment stays within its query budget'''
+        self._create_equipment(10)
+        with self.assertQueryBudget('inventory:equipment-list'):
+            res = self._http_request('get', 'tech')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_retrieve_budget(self):
+        '''Test retrieving a device stays within its query budget'''
+        equipment = self._create_equipment(1)[0]
+        with self.assertQueryBudget('inventory:equipment-detail'):
+            res = self._http_request(
+                'get', 'tech', url=self._detail_url(equipment.id)
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_create_budget(self):
+        '''Test creating a device stays within its query budget'''
+        with self.assertQueryBudget('inventory:equipment-create'):
+            res = self._http_request('post', 'inventory', self._payload())
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+
+    def test_update_budget(self):
+        '''Test updating a device stays within its query budget'''
+        equipment = self._create_equipment(1)[0]
+        with self.assertQueryBudget('inventory:equipment-update'):
+            res = self._http_request(
+                'put', 'inventory', self._payload(),
+                self._detail_url(equipment.id),
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_delete_budget(self):
+        '''Test deleting a device stays within its query budget'''
+        equipment = self._create_equipment(1)[0]
+        with self.assertQueryBudget('inventory:equipment-delete'):
+            res = self._http_request(
+                'delete', 'inventory', url=self._detail_url(equipment.id)
+            )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
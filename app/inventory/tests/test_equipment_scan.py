@@ -0,0 +1,117 @@
+"""
+Equipment scan API tests
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import (
+    Customer,
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentType,
+    Event,
+)
+from tests.mixin_tests import PublicAPITests, PrivateAPITests
+
+
+class PublicEquipmentScanAPITests(PublicAPITests, TestCase):
+    data_url = 'inventory:equipment-scan'
+
+    def test_auth_required(self):
+        '''Test auth is required to call API'''
+        self.authRequired()
+
+
+class PrivateEquipmentScanAPITests(PrivateAPITests, TestCase):
+    """Test authenticated API requests"""
+    data_url = 'inventory:equipment-scan'
+
+    def setUp(self):
+        super().setUp()
+        equipment_model = EquipmentModel.objects.create(name="qlxd")
+        equipment_brand = EquipmentBrand.objects.create(name="shure")
+        equipment_type = EquipmentType.objects.create(name="microphone")
+        self.equipment_one = Equipment.objects.create(
+            model=equipment_model,
+            brand=equipment_brand,
+            type=equipment_type,
+            number=1,
+        )
+        self.equipment_two = Equipment.objects.create(
+            model=equipment_model,
+            brand=equipment_brand,
+            type=equipment_type,
+            number=2,
+        )
+        self.customer = Customer.objects.create(name="John Doe")
+
+
+    def _create_event(self, name, starts_in, equipment):
+        '''Create an event starting `starts_in` from now lasting a day'''
+        load_in_date = timezone.now() + starts_in
+        event = Event.objects.create(
+            name=name,
+            load_in_date=load_in_date,
+            load_out_date=load_in_date + timedelta(days=1),
+            start_date=load_in_date,
+            end_date=load_in_date + timedelta(days=1),
+            customer=self.customer,
+            comment="",
+        )
+        event.equipment.set(equipment)
+        return event
+
+
+    def test_scan_current_and_next_event(self):
+        '''Test scanned devices return their current and next event'''
+        current = self._create_event(
+            "Current", timedelta(hours=-1), [self.equipment_one]
+        )
+        upcoming = self._create_event(
+            "Upcoming", timedelta(days=3), [self.equipment_one]
+        )
+        self._create_event(
+            "Later", timedelta(days=10), [self.equipment_one]
+        )
+        self._create_event(
+            "Past", timedelta(days=-10), [self.equipment_two]
+        )
+        payload = {'uids': [self.equipment_one.uid, self.equipment_two.uid]}
+
+        with self.assertNumQueries(1):
+            res = self._http_request('post', 'tech', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first, second = res.data['results']
+        self.assertTrue(first['found'])
+        self.assertEqual(first['id'], self.equipment_one.id)
+        self.assertEqual(first['current_event']['id'], current.id)
+        self.assertEqual(first['next_event']['id'], upcoming.id)
+        self.assertEqual(second['uid'], self.equipment_two.uid)
+        self.assertIsNone(second['current_event'])
+        self.assertIsNone(second['next_event'])
+
+
+    def test_scan_unknown_uid(self):
+        '''Test unknown uids are reported and keep the scanned order'''
+        payload = {'uids': ['999999-1', self.equipment_one.uid, '999999-1']}
+
+        res = self._http_request('post', 'inventory', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(
+            res.data['results'][0], {'found': False, 'uid': '999999-1'}
+        )
+        self.assertEqual(res.data['results'][1]['uid'], self.equipment_one.uid)
+
+
+    def test_scan_requires_uids(self):
+        '''Test an empty batch returns a bad request'''
+        res = self._http_request('post', 'tech', {'uids': []})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,183 @@
+"""
+Equipment utilization tests
+"""
+from datetime import date, datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import (
+    Customer,
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentType,
+    EquipmentUtilization,
+    Event,
+)
+from tests.mixin_tests import PublicAPITests, PrivateAPITests
+
+
+def make_date(*args):
+    '''Return an aware datetime'''
+    return timezone.make_aware(datetime(*args))
+
+
+class PublicUtilizationAPITests(PublicAPITests, TestCase):
+    data_url = 'inventory:utilization'
+
+    def test_auth_required(self):
+        '''Test auth is required to call API'''
+        self.authRequired()
+
+
+class PrivateUtilizationAPITests(PrivateAPITests, TestCase):
+    """Test authenticated API requests"""
+    data_url = 'inventory:utilization'
+
+    def setUp(self):
+        super().setUp()
+        equipment_model = EquipmentModel.objects.create(name="qlxd")
+        equipment_brand = EquipmentBrand.objects.create(name="shure")
+        self.microphone = EquipmentType.objects.create(name="microphone")
+        self.speaker = EquipmentType.objects.create(name="speaker")
+        self.mic_one, self.mic_two = [
+            Equipment.objects.create(
+                model=equipment_model,
+                brand=equipment_brand,
+                type=self.microphone,
+                number=number,
+            )
+            for number in (1, 2)
+        ]
+        self.speaker_one = Equipment.objects.create(
+            model=equipment_model,
+            brand=equipment_brand,
+            type=self.speaker,
+            number=1,
+        )
+        self.customer = Customer.objects.create(name="John Doe")
+
+
+    def _create_event(self, load_in_date, load_out_date, equipment):
+        '''Create an event booking `equipment` between two dates'''
+        event = Event.objects.create(
+            name='Foo Concert',
+            load_in_date=load_in_date,
+            load_out_date=load_out_date,
+            start_date=load_in_date,
+            end_date=load_out_date,
+            customer=self.customer,
+            comment="",
+        )
+        event.equipment.set(equipment)
+        return event
+
+
+    def _hours(self, equipment, month):
+        return EquipmentUtilization.objects.get(
+            equipment=equipment, month=month
+        ).booked_hours
+
+
+    def test_booking_split_across_months(self):
+        '''Test an event crossing months is split between them'''
+        self._create_event(
+            make_date(2023, 7, 31, 12), make_date(2023, 8, 1, 12), [self.mic_one]
+        )
+
+        self.assertEqual(self._hours(self.mic_one, date(2023, 7, 1)), 12)
+        self.assertEqual(self._hours(self.mic_one, date(2023, 8, 1)), 12)
+
+
+    def test_utilization_follows_event_changes(self):
+        '''Test the summary is refreshed when events change'''
+        event = self._create_event(
+            make_date(2023, 7, 1), make_date(2023, 7, 2), [self.mic_one]
+        )
+        event.load_in_date = make_date(2023, 9, 1)
+        event.load_out_date = make_date(2023, 9, 3)
+        event.save()
+        event.equipment.add(self.mic_two)
+
+        self.assertFalse(
+            EquipmentUtilization.objects.filter(month=date(2023, 7, 1)).exists()
+        )
+        self.assertEqual(self._hours(self.mic_one, date(2023, 9, 1)), 48)
+        self.assertEqual(self._hours(self.mic_two, date(2023, 9, 1)), 48)
+
+        event.equipment.remove(self.mic_one)
+        self.assertFalse(
+            EquipmentUtilization.objects.filter(equipment=self.mic_one).exists()
+        )
+
+        event.delete()
+        self.assertFalse(EquipmentUtilization.objects.exists())
+
+
+    def test_utilization_kept_when_dates_unchanged(self):
+        '''Test saving an event without moving it skips the refresh'''
+        event = self._create_event(
+            make_date(2023, 7, 1), make_date(2023, 7, 2), [self.mic_one]
+        )
+        EquipmentUtilization.objects.update(booked_hours=1)
+
+        event.name = 'Bar Concert'
+        event.save()
+        event = Event.objects.get(id=event.id)
+        event.save()
+        self.assertEqual(self._hours(self.mic_one, date(2023, 7, 1)), 1)
+
+        event.load_out_date = make_date(2023, 7, 3)
+        event.save()
+        self.assertEqual(self._hours(self.mic_one, date(2023, 7, 1)), 48)
+
+
+    def test_utilization_report_by_type(self):
+        '''Test the report aggregates devices of the same type'''
+        self._create_event(
+            make_date(2023, 6, 1), make_date(2023, 6, 16), [self.mic_one]
+        )
+        self._create_event(
+            make_date(2023, 6, 1), make_date(2023, 6, 2),
+            [self.mic_two, self.speaker_one],
+        )
+        url = f"{reverse(self.data_url)}?group_by=type&start=2023-01&end=2023-12"
+
+        with self.assertNumQueries(2):
+            res = self._http_request('get', 'finance', url=url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        microphones, speakers = res.data
+        self.assertEqual(microphones['name'], 'microphone')
+        self.assertEqual(microphones['month'], '2023-06')
+        self.assertEqual(microphones['booked_hours'], 16 * 24)
+        self.assertEqual(microphones['devices'], 2)
+        self.assertAlmostEqual(microphones['utilization'], 16 / 60)
+        self.assertEqual(speakers['booked_hours'], 24)
+        self.assertAlmostEqual(speakers['utilization'], 1 / 30)
+
+
+    def test_utilization_report_invalid_range(self):
+        '''Test the report rejects an inverted date range'''
+        url = f"{reverse(self.data_url)}?start=2023-12&end=2023-01"
+
+        res = self._http_request('get', 'finance', url=url)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_refresh_utilization_command(self):
+        '''Test the command rebuilds the summary table'''
+        self._create_event(
+            make_date(2023, 6, 1), make_date(2023, 6, 2), [self.mic_one]
+        )
+        EquipmentUtilization.objects.all().delete()
+
+        call_command('refresh_utilization', stdout=StringIO())
+
+        self.assertEqual(self._hours(self.mic_one, date(2023, 6, 1)), 24)
@@ -15,9 +15,13 @@ router.register('equipment_type', views.EquipmentTypeViewSet)
 router.register('equipment_model', views.EquipmentModelViewSet)
 router.register('equipment_brand', views.EquipmentBrandViewSet)
 router.register('equipment', views.EquipmentViewSet)
+router.register('movement', views.EquipmentMovementViewSet)
+router.register('equipment_status', views.EquipmentStatusViewSet)
 
 app_name = 'inventory'
 
 urlpatterns = [
+    path('scan/', views.EquipmentScanView.as_view(), name='equipment-scan'),
+    path('utilization/', views.UtilizationView.as_view(), name='utilization'),
     path('', include(router.urls)),
 ]
@@ -2,11 +2,27 @@
 Views for the inventory API.
 '''
 
-from rest_framework import viewsets
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema
+from rest_framework import mixins, status, viewsets
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import EquipmentType, EquipmentModel, EquipmentBrand, Equipment
+from core.models import (
+    EquipmentType,
+    EquipmentModel,
+    EquipmentBrand,
+    Equipment,
+    EquipmentMovement,
+    EquipmentStatus,
+    EquipmentUtilization,
+    Event,
+)
+from core.utilization import month_hours, month_start
 from inventory.permissions import InventoryPermissions
 
 from inventory import serializers
@@ -47,10 +63,184 @@ class EquipmentBrandViewSet(viewsets.ModelViewSet):
 class EquipmentViewSet(viewsets.ModelViewSet):
     """View for manage equipment APIs"""
     serializer_class = serializers.EquipmentSerializer
-    queryset = Equipment.objects.all()
+    queryset = Equipment.objects.select_related('model', 'brand', 'type')
+    search_fields = ['uid', 'serial_number']
     authentication_classes = [TokenAuthentication]
     permission_classes = [
         IsAuthenticated,
         InventoryPermissions,
     ]
 
+
+
+class EquipmentMovementViewSet(mixins.CreateModelMixin,
+                               mixins.ListModelMixin,
+                               mixins.RetrieveModelMixin,
+                               viewsets.GenericViewSet):
+    """
+    View for the append-only equipment movement ledger.
+
+    Movements are created in batches of scanned uids and can't be modified.
+    """
+    serializer_class = serializers.EquipmentMovementSerializer
+    queryset = EquipmentMovement.objects.select_related(
+        'equipment', 'employee',
+    ).order_by('-timestamp', '-id')
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [
+        IsAuthenticated,
+        InventoryPermissions,
+    ]
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return serializers.EquipmentMovementBatchSerializer
+        return self.serializer_class
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        uid = self.request.query_params.get('equipment')
+        if uid:
+            queryset = queryset.filter(equipment__uid=uid)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(employee=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class EquipmentStatusViewSet(viewsets.ReadOnlyModelViewSet):
+    """View for the current location of every device"""
+    serializer_class = serializers.EquipmentStatusSerializer
+    queryset = EquipmentStatus.objects.select_related('equipment')
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [
+        IsAuthenticated,
+        InventoryPermissions,
+    ]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        kind = self.request.query_params.get('kind')
+        event = self.request.query_params.get('event')
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        if event and event.isdigit():
+            queryset = queryset.filter(event_id=event)
+        return queryset
+
+
+class EquipmentScanView(APIView):
+    """
+    Resolve a batch of scanned equipment uids.
+
+    Returns, for every scanned uid, the event the device is currently
+    assigned to and the next one it is booked for.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=serializers.EquipmentScanSerializer)
+    def post(self, request):
+        serializer = serializers.EquipmentScanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uids = list(dict.fromkeys(serializer.validated_data['uids']))
+
+        now = timezone.now()
+        events = Event.objects.filter(equipment=OuterRef('pk')).values(
+            data=JSONObject(
+                id='id',
+                name='name',
+                load_in_date='load_in_date',
+                load_out_date='load_out_date',
+            )
+        )
+        current_event = events.filter(
+            load_in_date__lte=now,
+            load_out_date__gte=now,
+        ).order_by('load_in_date')
+        next_event = events.filter(
+            load_in_date__gt=now,
+        ).order_by('load_in_date')
+
+        equipment = Equipment.objects.filter(uid__in=uids).annotate(
+            current_event=Subquery(current_event[:1]),
+            next_event=Subquery(next_event[:1]),
+        ).values('id', 'uid', 'current_event', 'next_event')
+        found = {e['uid']: e for e in equipment}
+
+        results = []
+        for uid in uids:
+            if uid in found:
+                results.append({'found': True, **found[uid]})
+            else:
+                results.append({'found': False, 'uid': uid})
+
+        return Response({'results': results})
+
+
+# Report group: (group id lookup, group name lookup, equipment fleet lookup)
+UTILIZATION_GROUPS = {
+    'equipment': ('equipment_id', 'equipment__uid', None),
+    'type': ('equipment__type_id', 'equipment__type__name', 'type_id'),
+    'brand': ('equipment__brand_id', 'equipment__brand__name', 'brand_id'),
+    'model': ('equipment__model_id', 'equipment__model__name', 'model_id'),
+}
+
+
+class UtilizationView(APIView):
+    """
+    Booked hours and utilization per month.
+
+    Utilization is the share of the month the devices of a group were booked.
+    Reads the pre-aggregated `EquipmentUtilization` table.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [
+        IsAuthenticated,
+        InventoryPermissions,
+    ]
+
+    @extend_schema(parameters=[serializers.UtilizationQuerySerializer])
+    def get(self, request):
+        query = serializers.UtilizationQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        end = month_start(params.get('end', timezone.now().date()))
+        start = params.get('start', end.replace(year=end.year - 1))
+        group_id, group_name, fleet = UTILIZATION_GROUPS[params['group_by']]
+
+        rows = EquipmentUtilization.objects.filter(
+            month__gte=start,
+            month__lte=end,
+        ).values(group_id, group_name, 'month').annotate(
+            booked_hours=Sum('booked_hours'),
+        ).order_by('month', group_name)
+
+        devices = {}
+        if fleet:
+            devices = dict(
+                Equipment.objects.values(fleet).annotate(
+                    devices=Count('id'),
+                ).values_list(fleet, 'devices')
+            )
+
+        results = []
+        for row in rows:
+            fleet_size = devices.get(row[group_id], 1)
+            results.append({
+                'id': row[group_id],
+                'name': row[group_name],
+                'month': row['month'].strftime('%Y-%m'),
+                'booked_hours': row['booked_hours'],
+                'devices': fleet_size,
+                'utilization': (
+                    row['booked_hours']
+                    / (fleet_size * month_hours(row['month']))
+                ),
+            })
+
+        return Response(results)
@@ -0,0 +1,148 @@
+"""
+Test for search APIs.
+"""
+from datetime import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import (
+    Customer,
+    Venue,
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentType,
+    Event,
+)
+from tests.mixin_tests import PublicAPITests, PrivateAPITests
+
+
+def search_url(query):
+    '''Return the global search url for a query'''
+    return f"{reverse('search:search')}?q={query}"
+
+
+class PublicSearchAPITests(PublicAPITests, TestCase):
+    data_url = 'search:search'
+
+    def test_auth_required(self):
+        '''Test auth is required to call API'''
+        self.authRequired()
+
+
+class PrivateSearchAPITests(PrivateAPITests, TestCase):
+    """Test authenticated API requests"""
+
+    def setUp(self):
+        super().setUp()
+        self.customer = Customer.objects.create(
+            name="Naomi Nagata",
+            phone="3356748592",
+            email="naomi@example.com",
+            company="Rocinante Inc."
+        )
+        Customer.objects.create(
+            name="James Holden",
+            phone="1234567890",
+            email="james@example.com",
+            company="Barr Co."
+        )
+        self.venue = Venue.objects.create(
+            name="National Auditorium",
+            address="First Av #500",
+            city="Ba Sing Se",
+            state="Earth Nation",
+        )
+        Venue.objects.create(
+            name="Sample Place Name",
+            address="Foo #350",
+            city="Barr",
+            state="Ham",
+        )
+        self.equipment = Equipment.objects.create(
+            model=EquipmentModel.objects.create(name="qlxd"),
+            brand=EquipmentBrand.objects.create(name="shure"),
+            type=EquipmentType.objects.create(name="microphone"),
+            number=1,
+            serial_number="SN-998877",
+        )
+        self.event = Event.objects.create(
+            name='Rocinante Launch Party',
+            load_in_date=timezone.make_aware(datetime(2023, 7, 18, 13, 0)),
+            load_out_date=timezone.make_aware(datetime(2023, 7, 20, 13, 0)),
+            start_date=timezone.make_aware(datetime(2023, 7, 18, 13, 0)),
+            end_date=timezone.make_aware(datetime(2023, 7, 18, 13, 0)),
+            venue=self.venue,
+            customer=self.customer,
+            leader=self.tech_employee,
+            comment="Lorem ipsum dolor sit amet",
+        )
+
+
+    def test_search_requires_query(self):
+        '''Test search without a query returns a bad request'''
+        res = self._http_request('get', 'tech', url=reverse('search:search'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_search_partial_match(self):
+        '''Test searching with a partial word across all models'''
+        res = self._http_request('get', 'tech', url=search_url('rocin'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [c['id'] for c in res.data['customers']], [self.customer.id]
+        )
+        self.assertEqual([e['id'] for e in res.data['events']], [self.event.id])
+        self.assertEqual(res.data['venues'], [])
+        self.assertEqual(res.data['equipment'], [])
+
+
+    def test_search_equipment_by_serial_number(self):
+        '''Test searching equipment by serial number'''
+        res = self._http_request('get', 'inventory', url=search_url('998877'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [e['id'] for e in res.data['equipment']], [self.equipment.id]
+        )
+
+
+    def test_search_results_ranked(self):
+        '''Test better matches are returned first'''
+        exact = Venue.objects.create(
+            name="Auditorium",
+            address="Second Av #12",
+            city="Ba Sing Se",
+            state="Earth Nation",
+        )
+
+        res = self._http_request('get', 'tech', url=search_url('Auditorium'))
+
+        self.assertEqual(res.data['venues'][0]['id'], exact.id)
+        self.assertEqual(len(res.data['venues']), 2)
+
+
+    def test_viewset_search_parameter(self):
+        '''Test list endpoints filter with the search parameter'''
+        url = f"{reverse('venue:venue-list')}?search=sing"
+        res = self._http_request('get', 'tech', url=url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([v['id'] for v in res.data], [self.venue.id])
+
+
+    def test_search_vector_updated_on_save(self):
+        '''Test the search vector follows changes to the row'''
+        self.customer.company = "Tycho Station"
+        self.customer.save()
+
+        res = self._http_request('get', 'sales', url=search_url('tycho'))
+
+        self.assertEqual(
+            [c['id'] for c in res.data['customers']], [self.customer.id]
+        )
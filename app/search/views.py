@@ -0,0 +1,79 @@
+'''
+Views for the search API.
+'''
+
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.filters import search_queryset
+from core.models import Customer, Venue, Equipment, Event
+from customer.serializers import CustomerSerializer
+from event.serializers import EventSerializer
+from inventory.serializers import EquipmentSerializer
+from venue.serializers import VenueSerializer
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Result group name: (queryset, search fields, serializer)
+SEARCH_GROUPS = {
+    'customers': (
+        Customer.objects.all(),
+        ['name', 'company'],
+        CustomerSerializer,
+    ),
+    'venues': (
+        Venue.objects.all(),
+        ['name', 'city'],
+        VenueSerializer,
+    ),
+    'equipment': (
+        Equipment.objects.select_related('model', 'brand', 'type'),
+        ['uid', 'serial_number'],
+        EquipmentSerializer,
+    ),
+    'events': (
+        Event.objects.select_related(
+            'venue', 'customer', 'leader',
+        ).prefetch_related('equipment', 'crew'),
+        ['name'],
+        EventSerializer,
+    ),
+}
+
+
+class SearchView(APIView):
+    """Search customers, venues, equipment and events at once"""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'q': ['This query parameter is required.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {'limit': ['A valid integer is required.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        results = {}
+        for group, (queryset, fields, serializer_class) in SEARCH_GROUPS.items():
+            matches = search_queryset(queryset, query, fields)[:limit]
+            results[group] = serializer_class(
+                matches,
+                many=True,
+                context={'request': request},
+            ).data
+
+        return Response(results)
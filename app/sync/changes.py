@@ -0,0 +1,203 @@
+'''
+Changes of the synced models since a cursor.
+
+Offline clients keep the cursor of their last sync and fetch the rows created
+or updated since, and the ids of the rows deleted since, in pages. Changes
+are ordered by timestamp, source and id, read through the `updated_at`
+indexes of the models and the `deleted_at` index of the tombstones, so every
+page is a keyset query per source.
+
+Rows saved in the last `SYNC_SETTLE_SECONDS` are left for the next sync, so
+a transaction committing after a client synced doesn't hide rows stamped
+before its cursor.
+
+Cursors also carry the time the client is synced up to, which moves forward
+on every sync even when nothing changed. Cursors expire once that time is
+older than the tombstones kept, so idle clients keep their cursor.
+'''
+
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Customer, Equipment, Event, Tombstone, Venue
+from customer.serializers import CustomerSerializer
+from event.serializers import EventSerializer
+from inventory.serializers import EquipmentSerializer
+from venue.serializers import VenueSerializer
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Sources of changes: (name, queryset, timestamp field, serializer). Related
+# rows come first, so clients get them before the rows pointing to them.
+SOURCES = [
+    ('customers', Customer.objects.all(), 'updated_at', CustomerSerializer),
+    ('venues', Venue.objects.all(), 'updated_at', VenueSerializer),
+    (
+        'equipment',
+        Equipment.objects.select_related('model', 'brand', 'type'),
+        'updated_at',
+        EquipmentSerializer,
+    ),
+    (
+        'events',
+        Event.objects.select_related(
+            'venue', 'customer', 'leader',
+        ).prefetch_related('equipment', 'crew'),
+        'updated_at',
+        EventSerializer,
+    ),
+    ('deleted', Tombstone.objects.all(), 'deleted_at', None),
+]
+
+
+class CursorExpired(Exception):
+    """Raised when the tombstones needed by a cursor were pruned."""
+
+
+def _microseconds(timestamp):
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def encode_cursor(position, synced_at=None):
+    '''
+    Return the opaque cursor of a (timestamp, source, id) position.
+
+    `synced_at` is the time the client has every change up to, the time of
+    the position by default.
+    '''
+    timestamp, source, pk = position
+    synced_at = timestamp if synced_at is None else synced_at
+    text = '.'.join(str(part) for part in (
+        _microseconds(timestamp), source, pk, _microseconds(synced_at),
+    ))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    '''
+    Return the position and sync time of a cursor.
+
+    Cursors without sync time, of older versions, are synced up to their
+    position.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is invalid.
+    '''
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        text = base64.urlsafe_b64decode(padded.encode()).decode()
+        parts = [int(part) for part in text.split('.')]
+        if len(parts) == 3:
+            parts.append(parts[0])
+        microseconds, source, pk, synced = parts
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor.')
+    if not 0 <= source < len(SOURCES):
+        raise ValueError('Invalid cursor.')
+    return (
+        (EPOCH + timedelta(microseconds=microseconds), source, pk),
+        EPOCH + timedelta(microseconds=synced),
+    )
+
+
+def _after(field, source, position):
+    '''Return the filter of the rows of a source after a position.'''
+    timestamp, cursor_source, pk = position
+    if source > cursor_source:
+        return Q(**{f'{field}__gte': timestamp})
+    if source < cursor_source:
+        return Q(**{f'{field}__gt': timestamp})
+    return Q(**{f'{field}__gt': timestamp}) | Q(
+        **{field: timestamp, 'id__gt': pk}
+    )
+
+
+def changes(cursor=None, limit=500, context=None):
+    '''
+    Return a page of changes.
+
+    Parameters
+    ----------
+    cursor : str, optional
+        Cursor returned by the previous page. All rows by default.
+    limit : int
+        Maximum number of changes.
+    context : dict, optional
+        Serializer context.
+
+    Returns
+    -------
+    dict
+        Serialized rows by source in `changes`, ids of deleted rows by model
+        in `deleted`, the `cursor` of the next page and whether there are
+        `more` changes.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is invalid.
+    CursorExpired
+        If rows were deleted since the cursor and their tombstones pruned.
+    '''
+    now = timezone.now()
+    position, synced_at = decode_cursor(cursor) if cursor else (None, EPOCH)
+    if position is not None:
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+        if synced_at < now - retention:
+            raise CursorExpired
+
+    # Keys of the first changes of every source, merged afterwards
+    settled = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    keys = []
+    for source, (_, queryset, field, _) in enumerate(SOURCES):
+        rows = queryset.model.objects.filter(**{f'{field}__lte': settled})
+        if position is not None:
+            rows = rows.filter(_after(field, source, position))
+        keys.extend(
+            (timestamp, source, pk)
+            for timestamp, pk in rows.order_by(field, 'id').values_list(
+                field, 'id',
+            )[:limit + 1]
+        )
+    keys.sort()
+    more = len(keys) > limit
+    keys = keys[:limit]
+    if keys:
+        position = keys[-1]
+    # Without more pages, the client has every change up to the settled ones
+    synced_at = max(synced_at, position[0] if more else settled)
+
+    result = {
+        'changes': {name: [] for name, _, _, _ in SOURCES[:-1]},
+        'deleted': {},
+        'cursor': (
+            encode_cursor(position, synced_at) if position is not None
+            else None
+        ),
+        'more': more,
+    }
+    for source, (name, queryset, _, serializer_class) in enumerate(SOURCES):
+        ids = [pk for _, key_source, pk in keys if key_source == source]
+        if not ids:
+            continue
+        order = {pk: index for index, pk in enumerate(ids)}
+        rows = sorted(
+            queryset.filter(id__in=ids).order_by(),
+            key=lambda row: order[row.id],
+        )
+        if serializer_class is None:
+            for tombstone in rows:
+                result['deleted'].setdefault(tombstone.model, []).append(
+                    tombstone.object_id
+                )
+        else:
+            result['changes'][name] = serializer_class(
+                rows, many=True, context=context,
+            ).data
+    return result
@@ -0,0 +1,23 @@
+"""
+Django command to delete the tombstones older than the sync retention
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    """Django command to prune tombstones."""
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        deleted, _ = Tombstone.objects.filter(
+            deleted_at__lt=timezone.now() - timedelta(
+                days=settings.SYNC_TOMBSTONE_DAYS
+            ),
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones!'))
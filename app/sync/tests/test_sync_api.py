@@ -0,0 +1,237 @@
+"""
+Test the delta sync API.
+"""
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Customer, Equipment, Event, Tombstone, Venue
+from sync.changes import encode_cursor
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+SYNC_URL = reverse('sync:sync')
+
+
+class PublicSyncAPITests(TestCase):
+    """Test unauthenticated sync requests"""
+
+    def test_auth_required(self):
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncAPITests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test syncing changes since a cursor"""
+
+    def setUp(self):
+        super().setUp()
+        self.factory = DataFactory(
+            now=timezone.make_aware(datetime(2023, 7, 1, 12)),
+        )
+        self.data = self.factory.graph(
+            customers=2, venues=2, equipment=5, events=2,
+            devices_per_event=3, crew_size=2,
+        )
+        self.client.force_authenticate(self.tech_employee)
+
+
+    def _sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+
+    def _ids(self, page, name):
+        return [row['id'] for row in page['changes'][name]]
+
+
+    def test_full_sync(self):
+        '''Test syncing without cursor returns every row'''
+        page = self._sync()
+
+        self.assertFalse(page['more'])
+        self.assertEqual(len(page['changes']['customers']), 2)
+        self.assertEqual(len(page['changes']['venues']), 2)
+        self.assertEqual(len(page['changes']['equipment']), 5)
+        self.assertEqual(len(page['changes']['events']), 2)
+        self.assertEqual(len(page['changes']['events'][0]['equipment']), 3)
+        self.assertEqual(page['deleted'], {})
+
+        page = self._sync(page['cursor'])
+        self.assertEqual(
+            page['changes'],
+            {'customers': [], 'venues': [], 'equipment': [], 'events': []},
+        )
+
+
+    def test_changes_since_cursor(self):
+        '''Test only rows updated since the cursor are returned'''
+        cursor = self._sync()['cursor']
+        venue = self.data['venues'][0]
+        venue.name = 'Renamed'
+        venue.save()
+        event = self.data['events'][0]
+        event.crew.remove(event.crew.first())
+
+        page = self._sync(cursor)
+
+        self.assertEqual(self._ids(page, 'venues'), [venue.id])
+        self.assertEqual(page['changes']['venues'][0]['name'], 'Renamed')
+        self.assertEqual(self._ids(page, 'events'), [event.id])
+        self.assertEqual(self._ids(page, 'customers'), [])
+
+
+    def test_deleted_rows(self):
+        '''Test deleted rows are returned as tombstones'''
+        cursor = self._sync()['cursor']
+        event = self.data['events'][0]
+        device = Equipment.objects.exclude(event=event).first()
+        event_id, device_id = event.id, device.id
+        event.delete()
+        device.delete()
+
+        page = self._sync(cursor)
+
+        self.assertEqual(
+            page['deleted'], {'event': [event_id], 'equipment': [device_id]},
+        )
+
+
+    def test_deleting_venue_updates_events(self):
+        '''Test events losing their venue are synced again'''
+        cursor = self._sync()['cursor']
+        venue = Venue.objects.filter(event__isnull=False).first()
+        event_ids = set(venue.event_set.values_list('id', flat=True))
+        venue_id = venue.id
+        venue.delete()
+
+        page = self._sync(cursor)
+
+        self.assertEqual(page['deleted'], {'venue': [venue_id]})
+        self.assertEqual(set(self._ids(page, 'events')), event_ids)
+
+
+    def test_pages(self):
+        '''Test paging through changes with the same timestamp'''
+        now = timezone.now() - timedelta(minutes=1)
+        Customer.objects.update(updated_at=now)
+        Equipment.objects.update(updated_at=now)
+
+        seen = []
+        page = {'cursor': None, 'more': True}
+        while page['more']:
+            page = self._sync(page['cursor'], limit=2)
+            for name, rows in page['changes'].items():
+                seen.extend((name, row['id']) for row in rows)
+            self.assertLessEqual(len(seen), 11)
+
+        self.assertEqual(len(seen), 11)
+        self.assertEqual(len(set(seen)), 11)
+
+
+    def test_settling_rows(self):
+        '''Test rows saved in the last seconds are left for the next sync'''
+        with override_settings(SYNC_SETTLE_SECONDS=60):
+            page = self._sync()
+
+        self.assertIsNone(page['cursor'])
+        self.assertEqual(page['changes']['events'], [])
+
+
+    def test_invalid_cursor(self):
+        '''Test invalid cursors are rejected'''
+        res = self.client.get(SYNC_URL, {'since': 'not a cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since', res.data)
+
+
+    @override_settings(SYNC_TOMBSTONE_DAYS=30)
+    def test_expired_cursor(self):
+        '''Test cursors older than the tombstones need a full sync'''
+        cursor = encode_cursor((timezone.now() - timedelta(days=31), 0, 1))
+
+        res = self.client.get(SYNC_URL, {'since': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+
+    @override_settings(SYNC_TOMBSTONE_DAYS=30)
+    def test_idle_cursor(self):
+        '''Test cursors of clients syncing without changes don't expire'''
+        cursor = self._sync()['cursor']
+        now = timezone.now()
+
+        # The last change gets older than the tombstones while the client
+        # keeps syncing
+        for days in (20, 40):
+            with patch('sync.changes.timezone.now') as mock_now:
+                mock_now.return_value = now + timedelta(days=days)
+                page = self._sync(cursor)
+            self.assertEqual(page['changes']['events'], [])
+            cursor = page['cursor']
+
+
+    def test_catalog_renames(self):
+        '''Test renaming a catalog entry syncs its devices again'''
+        cursor = self._sync()['cursor']
+        device = Equipment.objects.first()
+        device.brand.name = 'Renamed'
+        device.brand.save()
+
+        page = self._sync(cursor)
+
+        self.assertIn(device.id, self._ids(page, 'equipment'))
+        self.assertEqual(
+            Equipment.objects.filter(brand=device.brand).count(),
+            len(page['changes']['equipment']),
+        )
+
+
+    def test_employee_renames(self):
+        '''Test renaming a crew member syncs their events again'''
+        cursor = self._sync()['cursor']
+        event = self.data['events'][0]
+        member = event.crew.first()
+        member.username = 'renamed'
+        member.save()
+
+        page = self._sync(cursor)
+
+        self.assertIn(event.id, self._ids(page, 'events'))
+
+
+    def test_prune_tombstones(self):
+        '''Test the command deletes the tombstones past the retention'''
+        Customer.objects.create(name='Gone').delete()
+        Event.objects.first().delete()
+        Tombstone.objects.filter(model='customer').update(
+            deleted_at=timezone.now() - timedelta(days=365),
+        )
+
+        call_command('prune_tombstones', stdout=StringIO())
+
+        self.assertEqual(
+            list(Tombstone.objects.values_list('model', flat=True)),
+            ['event'],
+        )
+
+
+    def test_sync_budget(self):
+        '''Test syncing doesn't run queries per row'''
+        self.factory.graph(equipment=50, events=20)
+
+        with self.assertQueryBudget('sync:sync'):
+            self._sync()
@@ -0,0 +1,57 @@
+'''
+Views for the sync API.
+'''
+
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.routers import primary_reads
+from sync.changes import CursorExpired, changes
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+class SyncView(APIView):
+    """
+    Rows created, updated or deleted since the `since` cursor.
+
+    Without `since` every row is returned, in pages. Clients request pages
+    with the returned `cursor` while `more` is true and keep the last cursor
+    for the next sync.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {'limit': ['A valid integer is required.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        try:
+            # A lagging replica would return cursors past rows it misses yet
+            with primary_reads():
+                page = changes(
+                    request.query_params.get('since') or None,
+                    limit,
+                    context={'request': request},
+                )
+        except ValueError as error:
+            return Response(
+                {'since': [str(error)]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except CursorExpired:
+            return Response(
+                {'detail': 'The cursor expired, sync again without it.'},
+                status=status.HTTP_410_GONE,
+            )
+        return Response(page)
@@ -0,0 +1,271 @@
+"""
+Bulk data factories for tests and benchmarks.
+
+Objects are written with `bulk_create` and passwords are hashed once per
+process, so large graphs of consistent data can be created quickly. The
+generated data only depends on the seed of the factory.
+"""
+import functools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import (
+    Customer,
+    Equipment,
+    EquipmentBrand,
+    EquipmentModel,
+    EquipmentType,
+    Event,
+    Venue,
+)
+from core.stats import invalidate_event_stats
+from core.utilization import months_between, refresh_utilization
+
+DEFAULT_PASSWORD = 'test123'
+ROLES = ['sales', 'tech', 'admin', 'finance', 'inventory']
+BATCH_SIZE = 5000
+
+
+@functools.lru_cache(maxsize=None)
+def password_hash(password):
+    '''
+    Return the hash of a password, computed once per process.
+    '''
+    return make_password(password)
+
+
+def create_employees(*employees_data):
+    '''
+    Create employees in a single query.
+
+    Parameters
+    ----------
+    *employees_data : dict
+        Employee fields. `password` is the raw password, 'test123' by default.
+
+    Returns
+    -------
+    list
+        Created employees, in the same order.
+    '''
+    employees = []
+    for data in employees_data:
+        data = dict(data)
+        password = data.pop('password', DEFAULT_PASSWORD)
+        employees.append(
+            get_user_model()(password=password_hash(password), **data)
+        )
+    return get_user_model().objects.bulk_create(employees)
+
+
+class DataFactory:
+    """
+    Create consistent Employees, Customers, Venues, Equipment and Events.
+
+    Parameters
+    ----------
+    seed : int
+        Seed of the random generator. The same seed produces the same data.
+    now : datetime, optional
+        Date events are spread around. The current hour by default.
+    """
+
+    def __init__(self, seed=0, now=None):
+        self.rng = random.Random(seed)
+        self.sequence = 0
+        self.now = now or timezone.now().replace(
+            minute=0, second=0, microsecond=0
+        )
+
+    def _next(self):
+        '''Return a number to build unique names'''
+        self.sequence += 1
+        return self.sequence
+
+    def employees(self, count, role=None, password=DEFAULT_PASSWORD):
+        '''Create `count` employees, cycling through every role by default.'''
+        employees = []
+        for _ in range(count):
+            n = self._next()
+            employees.append({
+                'username': f'employee_{n}',
+                'first_name': 'Employee',
+                'fathers_name': f'{n}',
+                'email': f'employee_{n}@example.com',
+                'role': role or ROLES[n % len(ROLES)],
+                'password': password,
+            })
+        return create_employees(*employees)
+
+    def customers(self, count):
+        '''Create `count` customers.'''
+        customers = []
+        for _ in range(count):
+            n = self._next()
+            customers.append(Customer(
+                name=f'Customer {n}',
+                phone=f'{n:010}',
+                email=f'customer_{n}@example.com',
+                company=f'Company {n % 100}',
+            ))
+        return Customer.objects.bulk_create(customers, batch_size=BATCH_SIZE)
+
+    def venues(self, count):
+        '''Create `count` venues.'''
+        venues = []
+        for _ in range(count):
+            n = self._next()
+            venues.append(Venue(
+                name=f'Venue {n}',
+                address=f'Street {n}',
+                city=f'City {n % 20}',
+                state=f'State {n % 5}',
+            ))
+        return Venue.objects.bulk_create(venues, batch_size=BATCH_SIZE)
+
+    def catalog(self, types=20, brands=20, models=99):
+        '''
+        Create equipment types, brands and models.
+
+        Returns
+        -------
+        tuple
+            Lists of created types, brands and models.
+        '''
+        n = self._next()
+        return (
+            EquipmentType.objects.bulk_create([
+                EquipmentType(name=f'type {n}-{i}') for i in range(types)
+            ]),
+            EquipmentBrand.objects.bulk_create([
+                EquipmentBrand(name=f'brand {n}-{i}') for i in range(brands)
+            ]),
+            EquipmentModel.objects.bulk_create([
+                EquipmentModel(name=f'model {n}-{i}') for i in range(models)
+            ]),
+        )
+
+    def equipment(self, count, catalog=None):
+        '''
+        Create `count` devices spread over the models of a catalog.
+
+        Every model belongs to one brand and type and devices are numbered
+        per model after the devices that already exist.
+        '''
+        types, brands, models = catalog or self.catalog()
+        numbers = dict(
+            Equipment.objects.filter(model__in=models).values(
+                'model_id',
+            ).annotate(last=Max('number')).values_list('model_id', 'last')
+        )
+
+        equipment = []
+        for i in range(count):
+            model = models[i % len(models)]
+            brand = brands[i % len(models) % len(brands)]
+            equipment_type = types[i % len(models) % len(types)]
+            number = numbers.get(model.id, 0) + 1
+            numbers[model.id] = number
+            equipment.append(Equipment(
+                model=model,
+                brand=brand,
+                type=equipment_type,
+                number=number,
+                serial_number=f'SN{self._next():08}',
+            ))
+        return Equipment.objects.bulk_create(equipment, batch_size=BATCH_SIZE)
+
+    def events(self, count, customers, venues, employees, equipment,
+               devices_per_event=10, crew_size=5, spread_days=365):
+        '''
+        Create `count` events with their equipment and crew.
+
+        Events start within `spread_days` around the current hour. The
+        utilization and statistics derived from events are refreshed, since
+        bulk inserts skip the signals maintaining them.
+        '''
+        events = []
+        for _ in range(count):
+            n = self._next()
+            load_in_date = self.now + timedelta(
+                hours=self.rng.randint(-24 * spread_days, 24 * spread_days)
+            )
+            events.append(Event(
+                name=f'Event {n}',
+                load_in_date=load_in_date,
+                load_out_date=load_in_date + timedelta(
+                    days=self.rng.randint(1, 4)
+                ),
+                start_date=load_in_date + timedelta(hours=6),
+                end_date=load_in_date + timedelta(hours=18),
+                venue=self.rng.choice(venues),
+                customer=self.rng.choice(customers),
+                leader=self.rng.choice(employees),
+                comment=f'Event {n}',
+            ))
+        events = Event.objects.bulk_create(events, batch_size=BATCH_SIZE)
+
+        equipment_ids = [e.id for e in equipment]
+        employee_ids = [e.id for e in employees]
+        devices_per_event = min(devices_per_event, len(equipment_ids))
+        crew_size = min(crew_size, len(employee_ids))
+        EventEquipment = Event.equipment.through
+        EventCrew = Event.crew.through
+
+        for start in range(0, len(events), 500):
+            chunk = events[start:start + 500]
+            EventEquipment.objects.bulk_create([
+                EventEquipment(event_id=event.id, equipment_id=equipment_id)
+                for event in chunk
+                for equipment_id in self.rng.sample(
+                    equipment_ids, devices_per_event
+                )
+            ], batch_size=BATCH_SIZE)
+            EventCrew.objects.bulk_create([
+                EventCrew(event_id=event.id, employee_id=employee_id)
+                for event in chunk
+                for employee_id in self.rng.sample(employee_ids, crew_size)
+            ], batch_size=BATCH_SIZE)
+
+        if events:
+            refresh_utilization(months_between(
+                min(e.load_in_date for e in events),
+                max(e.load_out_date for e in events),
+            ))
+            invalidate_event_stats(
+                {e.customer_id for e in events},
+                {e.venue_id for e in events},
+            )
+        return events
+
+    def graph(self, employees=5, customers=3, venues=2, equipment=30,
+              events=4, devices_per_event=10, crew_size=5):
+        '''
+        Create a complete data set.
+
+        Returns
+        -------
+        dict
+            Created objects by name.
+        '''
+        data = {
+            'employees': self.employees(employees),
+            'customers': self.customers(customers),
+            'venues': self.venues(venues),
+            'equipment': self.equipment(equipment),
+        }
+        data['events'] = self.events(
+            events,
+            customers=data['customers'],
+            venues=data['venues'],
+            employees=data['employees'],
+            equipment=data['equipment'],
+            devices_per_event=devices_per_event,
+            crew_size=crew_size,
+        )
+        return data
@@ -1,13 +1,23 @@
 """
 Common tests for API's
 """
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from tests.factories import create_employees
+
 
 def create_user(**params):
     '''
@@ -15,6 +25,41 @@ def create_user(**params):
     '''
     return get_user_model().objects.create_user(**params)
 
+
+QUERY_BUDGETS_PATH = Path(__file__).resolve().parent / 'query_budgets.json'
+
+
+def load_query_budgets():
+    '''
+    Return the content of the query budgets file.
+    '''
+    with open(QUERY_BUDGETS_PATH) as budgets_file:
+        return json.load(budgets_file)
+
+
+def record_query_budget(name, queries, elapsed):
+    '''
+    Write the query count and latency measured for a request to the query
+    budgets file.
+    '''
+    budgets = load_query_budgets()
+    budget = budgets['budgets'].setdefault(name, {})
+    budget['queries'] = queries
+    budget['recorded_ms'] = round(elapsed, 1)
+    budgets['budgets'] = dict(sorted(budgets['budgets'].items()))
+
+    with open(QUERY_BUDGETS_PATH, 'w') as budgets_file:
+        json.dump(budgets, budgets_file, indent=2)
+        budgets_file.write('\n')
+
+
+def _counted_queries(captured):
+    '''Return the captured queries, ignoring savepoints.'''
+    return [
+        query['sql'] for query in captured.captured_queries
+        if 'SAVEPOINT' not in query['sql']
+    ]
+
 # PUBLIC TESTS
 class PublicAPITests(TestCase):
     """
@@ -60,54 +105,53 @@ class PrivateAPITests(TestCase):
 
     def setUp(self):
         self.client = APIClient()
-        self.sales_employee = create_user(
-            username = "john_doe",
-            first_name = "John",
-            fathers_name = "Doe",
-            mothers_name = "Foo",
-            email='john@example.com', 
-            password='test123',
-            role='sales',
-        )
-
-        self.tech_employee = create_user(
-            username = "foo_barr",
-            first_name = "Foo",
-            fathers_name = "Barr",
-            mothers_name = "Qux",
-            email='foo@example.com', 
-            password='test123',
-            role='tech',
-        )
-
-        self.finance_employee = create_user(
-            username = "jack_smith",
-            first_name = "Jack",
-            fathers_name = "Smith",
-            mothers_name = "Don",
-            email='jack@example.com', 
-            password='test123',
-            role='finance',
-        )
-
-        self.admin_employee = create_user(
-            username = "tosin_abasi",
-            first_name = "Tosin",
-            fathers_name = "Abasi",
-            mothers_name = "Nando",
-            email='tosin@example.com', 
-            password='test123',
-            role='admin',
-        )
-
-        self.inventory_employee = create_user(
-            username = "harry_potter",
-            first_name = "Harry",
-            fathers_name = "Potter",
-            mothers_name = "Evans",
-            email='harry@example.com', 
-            password='test123',
-            role='inventory',
+        (
+            self.sales_employee,
+            self.tech_employee,
+            self.finance_employee,
+            self.admin_employee,
+            self.inventory_employee,
+        ) = create_employees(
+            {
+                'username': "john_doe",
+                'first_name': "John",
+                'fathers_name': "Doe",
+                'mothers_name': "Foo",
+                'email': 'john@example.com',
+                'role': 'sales',
+            },
+            {
+                'username': "foo_barr",
+                'first_name': "Foo",
+                'fathers_name': "Barr",
+                'mothers_name': "Qux",
+                'email': 'foo@example.com',
+                'role': 'tech',
+            },
+            {
+                'username': "jack_smith",
+                'first_name': "Jack",
+                'fathers_name': "Smith",
+                'mothers_name': "Don",
+                'email': 'jack@example.com',
+                'role': 'finance',
+            },
+            {
+                'username': "tosin_abasi",
+                'first_name': "Tosin",
+                'fathers_name': "Abasi",
+                'mothers_name': "Nando",
+                'email': 'tosin@example.com',
+                'role': 'admin',
+            },
+            {
+                'username': "harry_potter",
+                'first_name': "Harry",
+                'fathers_name': "Potter",
+                'mothers_name': "Evans",
+                'email': 'harry@example.com',
+                'role': 'inventory',
+            },
         )
 
 
@@ -429,3 +473,136 @@ class PrivateAPITests(TestCase):
         res = self._http_request('delete', role, url=url)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(self.model_class.objects.filter(id=data.id).exists())
+
+
+# PERFORMANCE TESTS
+class QueryBudgetMixin:
+    """
+    Check API requests against the budgets of `tests/query_budgets.json`.
+
+    Every budget has a name (usually the url name and the action, like
+    `event:event-list`), the number of queries the request may run and,
+    optionally, its maximum latency in milliseconds (`max_ms`). Requests
+    without their own `max_ms` use the file default.
+
+    Set the `RECORD_QUERY_BUDGETS` environment variable to write the measured
+    query counts and latencies to the file instead of checking them.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, name):
+        """
+        Check the queries run inside the block against a recorded budget.
+
+        Parameters
+        ----------
+        name : str
+            Budget name in the query budgets file.
+
+        Raises
+        ------
+        AssertionError
+            If the block runs more queries than the budget allows, takes longer
+            than its maximum latency or if the budget doesn't exist.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            yield captured
+            elapsed = (time.perf_counter() - start) * 1000
+
+        queries = _counted_queries(captured)
+
+        if os.environ.get('RECORD_QUERY_BUDGETS'):
+            record_query_budget(name, len(queries), elapsed)
+            return
+
+        budgets = load_query_budgets()
+        budget = budgets['budgets'].get(name)
+        if budget is None:
+            self.fail(
+                f'No query budget for {name}, run the tests with '
+                'RECORD_QUERY_BUDGETS=1 to record it'
+            )
+
+        self.assertLessEqual(
+            len(queries),
+            budget['queries'],
+            f'{name} ran {len(queries)} queries, budget is '
+            f'{budget["queries"]}:\n' + '\n'.join(queries),
+        )
+        max_ms = budget.get('max_ms', budgets['max_ms'])
+        self.assertLessEqual(
+            elapsed, max_ms, f'{name} took {elapsed:.1f} ms, budget is {max_ms}'
+        )
+
+
+    def assertConstantQueries(self, url, role, create_data, sizes=(1, 10)):
+        """
+        Check the queries of a list request don't depend on the number of rows.
+
+        Parameters
+        ----------
+        url : str
+            List url.
+        role : str
+            Employee role that will be used for the authentication in the test.
+            Available roles are: tech, sales, finance, admin, inventory
+        create_data : callable
+            Function creating the number of rows it receives.
+        sizes : tuple
+            Number of rows listed in each request.
+
+        Raises
+        ------
+        AssertionError
+            If the number of queries differs between the requests, which
+            usually means a related object is fetched once per row (N+1).
+        """
+        self.client.force_authenticate(self._rol_selection(role))
+        counts = {}
+        created = 0
+
+        for size in sizes:
+            create_data(size - created)
+            created = size
+            with CaptureQueriesContext(connection) as captured:
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts[f'Listing {size} rows'] = _counted_queries(captured)
+
+        self._assertSameCounts(counts)
+
+
+    def assertSameQueries(self, requests):
+        """
+        Check requests run the same number of queries.
+
+        Parameters
+        ----------
+        requests : dict
+            Functions running a request, by description. They run in order.
+
+        Raises
+        ------
+        AssertionError
+            If the number of queries differs between the requests, which
+            usually means a query runs once per nested row (N+1).
+        """
+        counts = {}
+        for description, request in requests.items():
+            with CaptureQueriesContext(connection) as captured:
+                request()
+            counts[description] = _counted_queries(captured)
+
+        self._assertSameCounts(counts)
+
+
+    def _assertSameCounts(self, counts):
+        first = next(iter(counts.values()))
+        for description, queries in counts.items():
+            self.assertEqual(
+                len(queries),
+                len(first),
+                f'{description} ran {len(queries)} queries instead of '
+                f'{len(first)}:\n' + '\n'.join(queries),
+            )
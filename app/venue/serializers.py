@@ -3,9 +3,10 @@ Serializers for venue APIs
 """
 
 from rest_framework import serializers
+from core.metrics import TimedSerializerMixin
 from core.models import Venue
 
-class VenueSerializer(serializers.ModelSerializer):
+class VenueSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for venues."""
 
     class Meta:
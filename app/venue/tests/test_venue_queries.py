@@ -0,0 +1,42 @@
+"""
+Test the query budgets of the venue API.
+"""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from tests.factories import DataFactory
+from tests.mixin_tests import PrivateAPITests, QueryBudgetMixin
+
+
+class VenueQueryBudgetTests(QueryBudgetMixin, PrivateAPITests, TestCase):
+    """Test the number of queries run by the venue API"""
+    data_url = 'venue:venue-list'
+    data_detail_url = 'venue:venue-detail'
+
+    def setUp(self):
+        super().setUp()
+        self.factory = DataFactory()
+
+
+    def test_list_queries_constant(self):
+        '''Test listing venues doesn't run a query per venue'''
+        self.assertConstantQueries(
+            reverse(self.data_url), 'tech', self.factory.venues
+        )
+
+
+    def test_list_budget(self):
+        '''Test listing venues stays within its query budget'''
+        self.factory.venues(10)
+        with self.assertQueryBudget('venue:venue-list'):
+            res = self._http_request('get', 'tech')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+    def test_retrieve_budget(self):
+        '''Test retrieving a venue stays within its query budget'''
+        venue = self.factory.venues(1)[0]
+        with self.assertQueryBudget('venue:venue-detail'):
+            res = self._http_request('get', 'tech', url=self._detail_url(venue.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,65 @@
+"""
+Test for venue statistics API.
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from core.models import Customer, Event, Venue
+from tests.mixin_tests import PrivateAPITests
+
+
+def stats_url(venue_id):
+    '''Return the statistics url of a venue'''
+    return reverse('venue:venue-stats', args=[venue_id])
+
+
+class PrivateVenueStatsAPITests(PrivateAPITests, TestCase):
+    """Test authenticated API requests"""
+
+    def setUp(self):
+        super().setUp()
+        self.venue = Venue.objects.create(
+            name="National Auditorium",
+            address="First Av #500",
+            city="Ba Sing Se",
+            state="Earth Nation",
+        )
+        self.customer = Customer.objects.create(name="Naomi Nagata")
+
+
+    def _create_event(self, starts_in):
+        '''Create an event at the venue starting `starts_in` from now'''
+        start_date = timezone.now() + starts_in
+        return Event.objects.create(
+            name="Foo Concert",
+            load_in_date=start_date,
+            load_out_date=start_date + timedelta(days=1),
+            start_date=start_date,
+            end_date=start_date + timedelta(hours=6),
+            venue=self.venue,
+            customer=self.customer,
+            comment="",
+        )
+
+
+    def test_venue_stats(self):
+        '''Test retrieving the event statistics of a venue'''
+        self._create_event(timedelta(days=-30))
+        last = self._create_event(timedelta(days=-3))
+        url = stats_url(self.venue.id)
+
+        res = self._http_request('get', 'tech', url=url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['event_count'], 2)
+        self.assertAlmostEqual(res.data['booked_days'], 2)
+        self.assertEqual(res.data['last_event']['id'], last.id)
+        self.assertIsNone(res.data['next_event'])
+
+        last.delete()
+        res = self._http_request('get', 'tech', url=url)
+        self.assertEqual(res.data['event_count'], 1)
@@ -2,11 +2,15 @@
 Views for the venues API.
 '''
 
+from django.http import Http404
 from rest_framework import viewsets
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from core.models import Venue
+from core.stats import venue_stats
 from venue.permissions import VenuePermissions
 
 from venue import serializers
@@ -15,12 +19,21 @@ class VenueViewSet(viewsets.ModelViewSet):
     """View for manage venue APIs"""
     serializer_class = serializers.VenueSerializer
     queryset = Venue.objects.all()
+    search_fields = ['name', 'city']
     authentication_classes = [TokenAuthentication]
     permission_classes = [
         IsAuthenticated,
         VenuePermissions
     ]
 
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """Event statistics of the venue"""
+        stats = venue_stats(pk) if pk.isdigit() else None
+        if stats is None:
+            raise Http404
+        return Response(stats)
+
     
     # def get_permissions(self):
     #     '''